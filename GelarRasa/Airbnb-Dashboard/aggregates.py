@@ -0,0 +1,819 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from data_access import (DATA_DIR, DATASETS, PARTITIONING, cached_frame, dataset_fingerprint, dataset_path,
+                         load_dataset, load_district, merged_fingerprint, partitioned_dir)
+from ingest import add_date_columns
+from schema import compact
+from sketches import HLL_PRECISION, DistinctSketch, QuantileSketch, bucket_keys, hll_registers
+
+# Nilai dimensi khusus: ALL = roll-up seluruh distrik / room type,
+# ALL_MONTHS = roll-up seluruh bulan, BASELINE = periode pembanding (awal data s.d. BASELINE_END).
+# year_month disimpan sebagai integer yyyymm (lihat ingest.month_key)
+ALL = '*'
+ALL_MONTHS = 0
+BASELINE = -1
+BASELINE_END = pd.Timestamp('2020-02-05')
+
+REVIEW_CATEGORIES = ['accuracy', 'cleanliness', 'checkin', 'communication', 'location', 'value']
+PRICE_GROUPS = [f'Group {i}' for i in range(1, 6)]
+
+SOURCE_COLUMNS = [
+    'listing_id', 'host_id', 'review_id', 'review_date', 'district', 'neighbourhood', 'room_type',
+    'price', 'host_is_superhost', 'host_response_rate', 'host_acceptance_rate', 'review_scores_rating',
+] + [f'review_scores_{cat}' for cat in REVIEW_CATEGORIES]
+
+# Sketsa kuantil disimpan per sel distrik x bulan x room type x superhost, lalu digabung untuk seleksi apa pun.
+# baseline = review_date <= BASELINE_END, jadi BASELINE juga bisa digabung meski berakhir di tengah bulan
+SKETCH_METRICS = ['price', 'review_scores_rating'] + [f'review_scores_{cat}' for cat in REVIEW_CATEGORIES]
+SKETCH_CELL = ['district', 'year_month', 'room_type', 'host_is_superhost', 'baseline']
+# Sketsa HyperLogLog jumlah listing/host unik per distrik x bulan x room type x baseline
+# (sumber Active Listings/Hosts halaman Exploration, lihat active_counts)
+DISTINCT_COLUMNS = ['listing_id', 'host_id']
+DISTINCT_CELL = ['district', 'year_month', 'room_type', 'baseline']
+# Skor review yang dijumlahkan per listing (listing_totals)
+SCORE_COLUMNS = ['review_scores_rating'] + [f'review_scores_{cat}' for cat in REVIEW_CATEGORIES]
+# Mode eksak untuk validasi: distinct_count menghitung nunique dari baris, bukan dari sketsa
+DISTINCT_EXACT = os.environ.get('DISTINCT_EXACT', '0') not in ('', '0', 'false')
+
+AGGREGATES_DIR = os.path.join(DATA_DIR, 'aggregates')
+TABLES = ['cube', 'neighbourhoods', 'price_groups', 'hosts', 'sketches', 'distinct', 'listing_totals']
+# Tabel yang bisa digabung: update_tables menggulung tabel lain darinya, bukan dari seluruh baris data.
+# Jika belum ada (agregat dibangun dengan versi lama) tabel ini dibangun penuh sekali
+MERGEABLE_TABLES = ['sketches', 'distinct', 'listing_totals']
+# Kolom sel yang harus ada di tabel sketsa; tata letak lama dibangun ulang penuh
+CELL_COLUMNS = {'sketches': SKETCH_CELL, 'distinct': DISTINCT_CELL, 'listing_totals': ['last_review_id']}
+# pandas = agregasi di memori proses; duckdb = SQL langsung atas file Parquet (sql_backend.py),
+# tanpa memuat seluruh data ke memori
+BACKENDS = ['pandas', 'duckdb']
+BACKEND = os.environ.get('AGGREGATE_BACKEND', 'pandas')
+
+
+def _measures(df, keys):
+    # Ukuran untuk satu grouping set; semua ukuran non-aditif (nunique, median,
+    # persentil) dihitung langsung di sini, bukan dijumlahkan dari sel lain
+    grouped = df.groupby(keys, sort=False, observed=True)
+    out = grouped.agg(
+        reviews=('review_id', 'count'),
+        listings=('listing_id', 'nunique'),
+        hosts=('host_id', 'nunique'),
+        price_sum=('price', 'sum'),
+        price_count=('price', 'count'),
+        price_median=('price', 'median'),
+        rating_mean=('review_scores_rating', 'mean'),
+        rating_median=('review_scores_rating', 'median'),
+        **{f'{cat}_mean': (f'review_scores_{cat}', 'mean') for cat in REVIEW_CATEGORIES},
+    )
+    out['price_mean'] = out['price_sum'] / out['price_count']
+    out['price_p90'] = grouped['price'].quantile(0.9)
+
+    # host_is_superhost boolean (lihat schema.py); nilai kosong tidak masuk ke kedua kelompok
+    superhost = df[df['host_is_superhost'].eq(True)].groupby(keys, sort=False, observed=True).agg(
+        superhost_price_median=('price', 'median'),
+        superhost_rating_mean=('review_scores_rating', 'mean'),
+        **{f'superhost_{cat}_mean': (f'review_scores_{cat}', 'mean') for cat in REVIEW_CATEGORIES},
+    )
+    non_superhost = df[df['host_is_superhost'].eq(False)].groupby(keys, sort=False, observed=True).agg(
+        **{f'non_superhost_{cat}_mean': (f'review_scores_{cat}', 'mean') for cat in REVIEW_CATEGORIES},
+    )
+    return out.join(superhost).join(non_superhost).reset_index()
+
+
+def build_cube(df, districts=('district', ALL), periods=('month', ALL_MONTHS, BASELINE)):
+    """District x month x room_type cells, plus ALL roll-ups and the BASELINE period.
+
+    ``districts`` and ``periods`` restrict which grouping sets are built
+    (used by update_tables to recompute only the affected cells).
+    """
+    # Tanggal sudah bertipe timestamp jika ingest.py sudah dijalankan; jika belum, di-parse di sini
+    df = add_date_columns(df)
+    period_keys = {
+        'month': df['year_month'],
+        ALL_MONTHS: pd.Series(ALL_MONTHS, index=df.index, dtype='Int32'),
+        BASELINE: pd.Series(BASELINE, index=df.index, dtype='Int32').where(df['review_date'] <= BASELINE_END),
+    }
+
+    frames = []
+    for district in districts:
+        for room_type in ('room_type', ALL):
+            for period in (period_keys[key] for key in periods):
+                keys = [
+                    df['district'] if district == 'district' else pd.Series(ALL, index=df.index),
+                    period,
+                    df['room_type'] if room_type == 'room_type' else pd.Series(ALL, index=df.index),
+                ]
+                keys = [key.rename(name) for key, name in zip(keys, ['district', 'year_month', 'room_type'])]
+                mask = period.notna()
+                frames.append(_measures(df[mask], [key[mask] for key in keys]))
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_neighbourhoods(df):
+    # Neighbourhood hanya milik satu distrik, jadi "All District" cukup gabungan semua baris
+    return df.groupby(['district', 'neighbourhood'], observed=True).agg(
+        listings=('listing_id', 'nunique'),
+        price_median=('price', 'median'),
+    ).reset_index()
+
+
+def _selections(df, districts=None):
+    # (distrik, baris) untuk ALL dan setiap distrik; ``districts`` membatasi seleksi yang dibangun
+    if districts is None:
+        return [(ALL, df)] + list(df.groupby('district', observed=True))
+    selections = [(ALL, df)] if ALL in districts else []
+    return selections + list(df[df['district'].isin(districts)].groupby('district', observed=True))
+
+
+def build_price_groups(df, districts=None):
+    # Batas kuantil bergantung pada seleksi, jadi dihitung per distrik dan untuk ALL
+    frames = []
+    for district, part in _selections(df, districts):
+        price_group = pd.qcut(part['price'], q=5, labels=PRICE_GROUPS)
+        scores = part.groupby(price_group, observed=False)[[f'review_scores_{cat}' for cat in REVIEW_CATEGORIES]].mean()
+        scores.index.name = 'price_group'
+        scores = scores.reset_index()
+        scores.insert(0, 'district', district)
+        frames.append(scores)
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_hosts(df, districts=None):
+    frames = []
+    for district, part in _selections(df, districts):
+        hosts = part.groupby('host_id').agg({
+            'host_response_rate': 'mean',
+            'host_acceptance_rate': 'mean',
+            'review_scores_rating': 'mean',
+            'host_is_superhost': 'first',
+        }).reset_index()
+        hosts.insert(0, 'district', district)
+        frames.append(hosts)
+    return pd.concat(frames, ignore_index=True)
+
+
+def add_cell_columns(df):
+    """``add_date_columns`` plus the ``baseline`` flag of the sketch cells (review within BASELINE)."""
+    df = add_date_columns(df)
+    return df.assign(baseline=(df['review_date'] <= BASELINE_END).to_numpy())
+
+
+def build_sketches(df):
+    """Quantile sketch buckets (sketches.py) of each SKETCH_METRICS column per SKETCH_CELL cell.
+
+    One row per cell, metric and non-empty bucket. Rows with an empty
+    district, month, room type or superhost flag keep an NA cell, so merges
+    over all districts or months still count them.
+    """
+    df = add_cell_columns(df)
+    frames = []
+    for metric in SKETCH_METRICS:
+        present = df[metric].notna()
+        counts = df.loc[present, SKETCH_CELL].assign(key=bucket_keys(df.loc[present, metric].to_numpy())).groupby(
+            SKETCH_CELL + ['key'], dropna=False, observed=True).size()
+        counts = counts.astype('int32').rename('count').reset_index()
+        counts.insert(len(SKETCH_CELL), 'metric', metric)
+        frames.append(counts)
+    table = pd.concat(frames, ignore_index=True)
+    table['metric'] = table['metric'].astype(pd.CategoricalDtype(SKETCH_METRICS))
+    return table
+
+
+def distinct_rows(ids, column):
+    """One row per DISTINCT_CELL cell of ``ids`` with the serialized HyperLogLog sketch of its ``column`` ids."""
+    grouped = ids.groupby(DISTINCT_CELL, dropna=False, observed=True)
+    cells = grouped.size().index.to_frame(index=False)
+    register, rank = hll_registers(ids[column].to_numpy())
+    registers = np.zeros((len(cells), 1 << HLL_PRECISION), dtype=np.int8)
+    np.maximum.at(registers, (grouped.ngroup().to_numpy(), register), rank)
+    cells['column'] = column
+    cells['registers'] = [row.tobytes() for row in registers]
+    return cells
+
+
+def build_distinct(df):
+    """HyperLogLog sketches (sketches.py) of DISTINCT_COLUMNS per DISTINCT_CELL cell.
+
+    One row per cell and column; ``registers`` holds the 2**HLL_PRECISION
+    registers as bytes, so the table size depends on the number of cells,
+    not on the number of ids.
+    """
+    df = add_cell_columns(df)
+    table = pd.concat([distinct_rows(df[DISTINCT_CELL + [column]].dropna(subset=[column]).drop_duplicates(), column)
+                       for column in DISTINCT_COLUMNS], ignore_index=True)
+    table['column'] = table['column'].astype(pd.CategoricalDtype(DISTINCT_COLUMNS))
+    return table
+
+
+def build_listing_totals(df):
+    """Review count and review-score sums/counts per listing, over all months and over BASELINE.
+
+    Everything else the roll-ups of update_tables need (district, room
+    type, neighbourhood, price, host) is an attribute of the listing, joined
+    from listings/hosts. ``last_review_id`` is the newest review counted,
+    so reviews added later are counted exactly once.
+    """
+    df = add_cell_columns(df)
+    totals = df.groupby('listing_id')['review_id'].max().rename('last_review_id').to_frame()
+    for prefix, part in [('', df), ('baseline_', df[df['baseline']])]:
+        grouped = part.groupby('listing_id')
+        totals[f'{prefix}reviews'] = grouped['review_id'].count()
+        for column in SCORE_COLUMNS:
+            # Dijumlahkan dalam float64: skor disimpan float32
+            totals[f'{prefix}{column}_sum'] = grouped[column].sum().astype('float64')
+            totals[f'{prefix}{column}_count'] = grouped[column].count()
+    return _fill_totals(totals).reset_index()
+
+
+def _fill_totals(totals):
+    # Listing tanpa review BASELINE: jumlah dan hitungan 0
+    counts = [name for name in totals.columns if name == 'last_review_id' or not name.endswith('_sum')]
+    totals = totals.fillna(0)
+    totals[counts] = totals[counts].astype('int64')
+    return totals
+
+
+BUILDERS = {
+    'cube': build_cube,
+    'neighbourhoods': build_neighbourhoods,
+    'price_groups': build_price_groups,
+    'hosts': build_hosts,
+    'sketches': build_sketches,
+    'distinct': build_distinct,
+    'listing_totals': build_listing_totals,
+}
+
+
+def _write_table(table, name, dest):
+    tmp_path = os.path.join(dest, f'{name}.parquet.tmp')
+    table.to_parquet(tmp_path, index=False, compression='zstd')
+    os.replace(tmp_path, os.path.join(dest, f'{name}.parquet'))
+
+
+def build_all(df=None, dest=AGGREGATES_DIR, backend=None):
+    """Precompute every aggregate table and write it to ``dest``.
+
+    With the duckdb backend (and no ``df``) the tables are computed by SQL
+    over the merged Parquet data instead of a frame loaded into memory.
+    """
+    os.makedirs(dest, exist_ok=True)
+    if (backend or BACKEND) == 'duckdb' and df is None:
+        import sql_backend
+        for name, builder in sql_backend.BUILDERS.items():
+            _write_table(builder(), name, dest)
+        return dest
+    df = load_district(None, SOURCE_COLUMNS) if df is None else compact(df)
+    for name, builder in BUILDERS.items():
+        _write_table(builder(df), name, dest)
+    return dest
+
+
+def weighted_quantile(values, weights, q):
+    """``Series.quantile(q)`` of ``values`` with each value repeated ``weights`` times, without repeating them.
+
+    Interpolates between order statistics like pandas; NaN values and zero
+    weights are skipped. ``q`` may be a scalar or an array; NaN when
+    nothing is left.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.int64)
+    q = np.asarray(q, dtype=np.float64)
+    keep = ~np.isnan(values) & (weights > 0)
+    if not keep.any():
+        return np.full(q.shape, np.nan) if q.ndim else np.nan
+    order = np.argsort(values[keep], kind='stable')
+    values, cumulative = values[keep][order], np.cumsum(weights[keep][order])
+    # Nilai ke-k (0-based) = nilai pertama yang jumlah kumulatif bobotnya > k
+    rank = q * (cumulative[-1] - 1)
+    lower, upper = np.floor(rank), np.ceil(rank)
+    low = values[np.searchsorted(cumulative, lower, side='right')]
+    high = values[np.searchsorted(cumulative, upper, side='right')]
+    return low + (high - low) * (rank - lower)
+
+
+# Kolom rata-rata cube: (kolom cube, kolom skor, filter superhost)
+MEAN_COLUMNS = (
+    [('rating_mean', 'review_scores_rating', None)]
+    + [(f'{cat}_mean', f'review_scores_{cat}', None) for cat in REVIEW_CATEGORIES]
+    + [('superhost_rating_mean', 'review_scores_rating', True)]
+    + [(f'superhost_{cat}_mean', f'review_scores_{cat}', True) for cat in REVIEW_CATEGORIES]
+    + [(f'non_superhost_{cat}_mean', f'review_scores_{cat}', False) for cat in REVIEW_CATEGORIES]
+)
+
+
+def add_listing_totals(totals, added):
+    """``totals`` plus the rows of ``added`` newer than the last review already counted for their listing."""
+    last = totals.set_index('listing_id')['last_review_id']
+    counted = added['listing_id'].map(last)
+    new = added[counted.isna().to_numpy() | (added['review_id'].to_numpy() > counted.fillna(0).to_numpy())]
+    if new.empty:
+        return totals
+    current = totals.set_index('listing_id')
+    delta = build_listing_totals(new).set_index('listing_id')
+    summed = current.add(delta, fill_value=0)
+    summed['last_review_id'] = pd.concat([current['last_review_id'], delta['last_review_id']], axis=1).max(axis=1)
+    return _fill_totals(summed).reset_index().astype({'listing_id': totals['listing_id'].dtype})
+
+
+def _listing_attributes():
+    # Atribut listing dan host persis seperti yang digabung ke setiap baris review (etl.listing_dimension)
+    from etl import listing_dimension
+    return compact(listing_dimension(dataset_path('listings'), dataset_path('hosts')).to_pandas())
+
+
+def _listing_measures(listings, prefix):
+    # Ukuran cube satu seleksi dari total per listing; bobot harga = jumlah review listing itu
+    weights = listings[f'{prefix}reviews'].to_numpy()
+    price = listings['price'].to_numpy(np.float64, na_value=np.nan)
+    priced = ~np.isnan(price)
+    superhost = listings['host_is_superhost'].eq(True).fillna(False).to_numpy(bool)
+    non_superhost = listings['host_is_superhost'].eq(False).fillna(False).to_numpy(bool)
+    row = {
+        'reviews': int(weights.sum()),
+        'listings': len(listings),
+        'hosts': listings['host_id'].nunique(),
+        'price_sum': int((price[priced] * weights[priced]).sum()),
+        'price_count': int(weights[priced].sum()),
+        'price_median': weighted_quantile(price, weights, 0.5),
+        'price_p90': weighted_quantile(price, weights, 0.9),
+        'superhost_price_median': weighted_quantile(price[superhost], weights[superhost], 0.5),
+    }
+    row['price_mean'] = row['price_sum'] / row['price_count'] if row['price_count'] else np.nan
+    columns = [f'{prefix}{column}_{part}' for column in SCORE_COLUMNS for part in ('sum', 'count')]
+    values = listings[columns].to_numpy(np.float64)
+    sums = {flag: dict(zip(columns, part.sum(axis=0)))
+            for flag, part in [(None, values), (True, values[superhost]), (False, values[non_superhost])]}
+    for name, column, flag in MEAN_COLUMNS:
+        count = sums[flag][f'{prefix}{column}_count']
+        row[name] = sums[flag][f'{prefix}{column}_sum'] / count if count else np.nan
+    return row
+
+
+def _period_rollup(listings, sketches, districts):
+    # Sel ALL_MONTHS dan BASELINE (semua room type dan per room type) dari total per listing;
+    # rating_median dari sketsa (median skor review tidak bisa diturunkan dari jumlah)
+    rating = sketches[sketches['metric'] == 'review_scores_rating']
+    rows = []
+    for district in districts:
+        selected = listings if district == ALL else listings[listings['district'] == district]
+        cells = rating if district == ALL else rating[rating['district'] == district]
+        for room_type in [ALL] + sorted(selected['room_type'].dropna().unique()):
+            typed = selected if room_type == ALL else selected[selected['room_type'] == room_type]
+            typed_cells = cells if room_type == ALL else cells[cells['room_type'] == room_type]
+            for period, prefix in [(ALL_MONTHS, ''), (BASELINE, 'baseline_')]:
+                part = typed[typed[f'{prefix}reviews'] > 0]
+                if part.empty:
+                    continue
+                part_cells = typed_cells if period == ALL_MONTHS else typed_cells[typed_cells['baseline']]
+                row = {'district': district, 'year_month': period, 'room_type': room_type}
+                row.update(_listing_measures(part, prefix))
+                row['rating_median'] = QuantileSketch.from_buckets(part_cells['key'], part_cells['count']).quantile(0.5)
+                rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _cell_counts(sketches, column, flag):
+    # Jumlah nilai (tidak kosong) ``column`` per sel distrik x bulan x room type, dan untuk room type ALL
+    part = sketches[sketches['metric'] == column]
+    if flag is not None:
+        part = part[part['host_is_superhost'].eq(flag).fillna(False)]
+    part = part.assign(district=part['district'].astype(str), room_type=part['room_type'].astype(str))
+    by_type = part[part['room_type'] != 'nan'].groupby(['district', 'year_month', 'room_type'])['count'].sum()
+    overall = part.groupby(['district', 'year_month'])['count'].sum().reset_index().assign(room_type=ALL)
+    return pd.concat([by_type.reset_index(), overall], ignore_index=True)
+
+
+def _month_rollup(monthly, sketches, hosts, months):
+    # Sel ALL per bulan dari sel distrik bulan itu: jumlah dan listing (satu listing = satu distrik) dijumlahkan,
+    # rata-rata ditimbang dengan jumlah nilai per sel, median dari sketsa. Host bisa aktif di beberapa distrik,
+    # jadi jumlah host unik dihitung exact dari ``hosts`` (host_id bulan-bulan itu di semua distrik)
+    keys = ['district', 'year_month', 'room_type']
+    monthly = monthly.assign(district=monthly['district'].astype(str), room_type=monthly['room_type'].astype(str))
+    sketches = sketches[sketches['year_month'].isin(months)]
+    weighted = monthly[['year_month', 'room_type', 'reviews', 'listings', 'price_sum', 'price_count']].copy()
+    for name, column, flag in MEAN_COLUMNS:
+        counts = monthly[keys].merge(_cell_counts(sketches, column, flag), on=keys, how='left')['count']
+        values = monthly[name].to_numpy(np.float64)
+        weights = np.where(np.isnan(values), 0, counts.fillna(0).to_numpy())
+        weighted[f'{name}_sum'] = np.where(weights > 0, values, 0) * weights
+        weighted[f'{name}_count'] = weights
+    totals = weighted.groupby(['year_month', 'room_type']).sum()
+
+    host_counts = hosts.groupby(['year_month', hosts['room_type'].astype(str)])['host_id'].nunique().to_dict()
+    host_counts.update({(month, ALL): count for month, count in hosts.groupby('year_month')['host_id'].nunique().items()})
+    rows = []
+    # Per bulan sekali ke array NumPy: seleksi per room type cukup mask kecil, bukan filter DataFrame
+    for month, cells in sketches.groupby('year_month'):
+        metric = cells['metric'].astype(str).to_numpy()
+        room = cells['room_type'].astype(str).to_numpy()
+        superhost = cells['host_is_superhost'].eq(True).fillna(False).to_numpy(bool)
+        key, count = cells['key'].to_numpy(), cells['count'].to_numpy()
+
+        def quantile(mask, q):
+            return QuantileSketch.from_buckets(key[mask], count[mask]).quantile(q)
+
+        for room_type, total in totals.loc[month].iterrows():
+            typed = np.ones(len(cells), bool) if room_type == ALL else room == room_type
+            price = typed & (metric == 'price')
+            row = {'district': ALL, 'year_month': month, 'room_type': room_type}
+            row.update({name: total[name] for name in ['reviews', 'listings', 'price_sum', 'price_count']})
+            row['hosts'] = host_counts.get((month, room_type), 0)
+            row['price_median'], row['price_p90'] = quantile(price, [0.5, 0.9])
+            row['rating_median'] = quantile(typed & (metric == 'review_scores_rating'), 0.5)
+            row['superhost_price_median'] = quantile(price & superhost, 0.5)
+            row['price_mean'] = total['price_sum'] / total['price_count'] if total['price_count'] else np.nan
+            for name, _, _ in MEAN_COLUMNS:
+                weight = total[f'{name}_count']
+                row[name] = total[f'{name}_sum'] / weight if weight else np.nan
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _listing_neighbourhoods(listings, districts):
+    rows = []
+    selected = listings[listings['district'].isin(districts) & (listings['reviews'] > 0)]
+    for (district, neighbourhood), part in selected.groupby(['district', 'neighbourhood'], observed=True):
+        rows.append({'district': district, 'neighbourhood': neighbourhood, 'listings': len(part),
+                     'price_median': weighted_quantile(part['price'].to_numpy(np.float64, na_value=np.nan),
+                                                       part['reviews'], 0.5)})
+    return pd.DataFrame(rows)
+
+
+def _listing_price_groups(listings, districts):
+    # Seperti build_price_groups: batas kuintil harga dihitung atas semua review seleksi (bobot = review per listing)
+    frames = []
+    for district, part in _selections(listings[listings['reviews'] > 0], districts):
+        edges = weighted_quantile(part['price'].to_numpy(np.float64, na_value=np.nan), part['reviews'], np.linspace(0, 1, 6))
+        price_group = pd.cut(part['price'], edges, labels=PRICE_GROUPS, include_lowest=True)
+        grouped = part.groupby(price_group, observed=False)
+        scores = pd.DataFrame({f'review_scores_{cat}': grouped[f'review_scores_{cat}_sum'].sum()
+                               / grouped[f'review_scores_{cat}_count'].sum() for cat in REVIEW_CATEGORIES})
+        scores.index.name = 'price_group'
+        scores = scores.reset_index()
+        scores.insert(0, 'district', district)
+        frames.append(scores)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _listing_hosts(listings, districts):
+    # Seperti build_hosts: tingkat respons/penerimaan dan status superhost adalah atribut host
+    frames = []
+    for district, part in _selections(listings[listings['reviews'] > 0], districts):
+        grouped = part.groupby('host_id')
+        hosts = grouped.agg({'host_response_rate': 'first', 'host_acceptance_rate': 'first', 'host_is_superhost': 'first'})
+        hosts.insert(2, 'review_scores_rating',
+                     grouped['review_scores_rating_sum'].sum() / grouped['review_scores_rating_count'].sum())
+        hosts = hosts.reset_index()
+        hosts.insert(0, 'district', district)
+        frames.append(hosts)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _like(frame, table):
+    # Tipe angka mengikuti tabel yang sudah ada, supaya concat tidak mengubah tipe kolomnya
+    return frame.astype({name: table[name].dtype for name in frame.columns if name in table.columns
+                         and pd.api.types.is_numeric_dtype(table[name]) and not pd.api.types.is_bool_dtype(table[name])})
+
+
+def _read_rows(columns, filters):
+    # Filter didorong ke pembacaan Parquet (partisi distrik dilewati utuh jika tidak cocok)
+    path = partitioned_dir()
+    if path is not None:
+        return compact(pd.read_parquet(path, columns=columns, filters=filters, partitioning=PARTITIONING))
+    return compact(pd.read_parquet(dataset_path('all'), columns=columns, filters=filters))
+
+
+def _cell_rows(affected):
+    # Hanya baris sel (district, year_month) yang terdampak
+    df = add_date_columns(_read_rows(SOURCE_COLUMNS, [
+        ('district', 'in', sorted({district for district, _ in affected})),
+        ('year_month', 'in', sorted({month for _, month in affected}))]))
+    return df[pd.MultiIndex.from_arrays([df['district'], df['year_month']]).isin(list(affected))]
+
+
+def update_tables(affected, added=None, dest=AGGREGATES_DIR):
+    """Recompute the aggregate rows touched by ``affected`` (district, year_month) pairs.
+
+    Only the rows of the affected district-months are read; their monthly
+    cube cells and sketch cells are rebuilt from those rows. ``added`` (the
+    merged rows of newly appended reviews) is added to listing_totals,
+    skipping reviews already counted, so repeating a call is harmless.
+    Everything above a district-month is rolled up without reading the
+    reviews again:
+
+    * the all-months and BASELINE cells of the affected districts and ALL,
+      and neighbourhoods, price_groups and hosts, from listing_totals
+      joined with the current listing and host attributes (exact, except
+      rating_median, which is estimated from the sketches);
+    * the monthly ALL cells of the affected months from the district cells
+      of those months (sums, counts and means exact; medians estimated
+      from the sketches). A host can be active in several districts, so
+      the host count is recounted exactly from the host ids of those
+      months (three columns of those months, read across all districts).
+
+    Does nothing when the aggregates have not been built (``load_table``
+    then rebuilds them from the new data on its own).
+    """
+    affected = set(affected)
+    paths = {name: os.path.join(dest, f'{name}.parquet') for name in TABLES}
+    built = {name for name in TABLES if os.path.exists(paths[name])}
+    if not affected or set(TABLES) - built - set(MERGEABLE_TABLES):
+        return False
+    tables = {name: pd.read_parquet(paths[name]) for name in built}
+    # Tabel gabungan yang belum ada atau bertata letak lama dibangun penuh sekali dari seluruh data
+    outdated = [name for name in MERGEABLE_TABLES
+                if name not in built or not set(CELL_COLUMNS[name]) <= set(pq.read_schema(paths[name]).names)]
+    if outdated:
+        df = load_district(None, SOURCE_COLUMNS)
+        for name in outdated:
+            tables[name] = BUILDERS[name](df)
+            _write_table(tables[name], name, dest)
+
+    rows = _cell_rows(affected)
+    districts = {district for district, _ in affected}
+    months = {month for _, month in affected}
+
+    # Sketsa bisa digabung, jadi cukup sel yang terdampak yang dihitung ulang
+    for name in ('sketches', 'distinct'):
+        if name in outdated:
+            continue
+        table = tables[name]
+        stale = pd.MultiIndex.from_arrays([table['district'], table['year_month']]).isin(list(affected))
+        tables[name] = pd.concat([table[~stale], BUILDERS[name](rows)], ignore_index=True)
+        _write_table(tables[name], name, dest)
+
+    if added is not None and len(added):
+        totals = add_listing_totals(tables['listing_totals'], added)
+        if totals is not tables['listing_totals']:
+            tables['listing_totals'] = totals
+            _write_table(totals, 'listing_totals', dest)
+    listings = tables['listing_totals'].merge(_listing_attributes(), on='listing_id')
+
+    cube = tables['cube']
+    stale = (
+        pd.MultiIndex.from_arrays([cube['district'], cube['year_month']]).isin(list(affected))
+        | (cube['district'].isin(districts) & cube['year_month'].isin([ALL_MONTHS, BASELINE]))
+        | ((cube['district'] == ALL) & cube['year_month'].isin(list(months) + [ALL_MONTHS, BASELINE]))
+    )
+    cells = build_cube(rows, ('district',), ('month',))
+    hosts = _read_rows(['year_month', 'room_type', 'host_id'], [('year_month', 'in', sorted(months))])
+    kept = cube[~stale]
+    monthly = pd.concat([kept[(kept['district'] != ALL) & kept['year_month'].isin(months)], cells], ignore_index=True)
+    _write_table(pd.concat([
+        kept,
+        _like(cells, cube),
+        _like(_period_rollup(listings, tables['sketches'], districts | {ALL}), cube),
+        _like(_month_rollup(monthly, tables['sketches'], hosts, months), cube),
+    ], ignore_index=True), 'cube', dest)
+
+    neighbourhoods = tables['neighbourhoods']
+    _write_table(pd.concat([
+        neighbourhoods[~neighbourhoods['district'].isin(districts)],
+        _like(_listing_neighbourhoods(listings, districts), neighbourhoods),
+    ], ignore_index=True), 'neighbourhoods', dest)
+
+    for name, builder in [('price_groups', _listing_price_groups), ('hosts', _listing_hosts)]:
+        table = tables[name]
+        _write_table(pd.concat([
+            table[~table['district'].isin(districts | {ALL})],
+            _like(builder(listings, districts | {ALL}), table),
+        ], ignore_index=True), name, dest)
+    return True
+
+
+def _is_built(name):
+    return os.path.exists(os.path.join(DATA_DIR, DATASETS[f'agg_{name}']))
+
+
+def load_table(name):
+    """Load a precomputed aggregate table.
+
+    Falls back to building it in-process (once per source version) when the
+    offline build step has not been run yet.
+    """
+    if _is_built(name):
+        return load_dataset(f'agg_{name}')
+    if BACKEND == 'duckdb':
+        import sql_backend
+        return cached_frame(('aggregates', name), merged_fingerprint(), sql_backend.BUILDERS[name])
+    return cached_frame(('aggregates', name), merged_fingerprint(),
+                        lambda: BUILDERS[name](load_district(None, SOURCE_COLUMNS)))
+
+
+def table_version(name):
+    """Version marker of aggregate table ``name``; changes whenever the table would change."""
+    if _is_built(name):
+        return dataset_fingerprint(f'agg_{name}')
+    return merged_fingerprint()
+
+
+def _district_key(district):
+    return ALL if district in (None, "All District") else district
+
+
+def district_table(name, district):
+    """Rows of aggregate table ``name`` for one district (ALL for "All District").
+
+    Without precomputed tables the duckdb backend queries only the requested
+    district (filter pushed down to the Parquet scan) instead of building
+    the whole table.
+    """
+    key = _district_key(district)
+    if not _is_built(name) and BACKEND == 'duckdb':
+        import sql_backend
+        return cached_frame(('aggregates', name, key), merged_fingerprint(),
+                            lambda: sql_backend.BUILDERS[name]([key]))
+    table = load_table(name)
+    # Tabel neighbourhoods tidak punya baris ALL: "All District" = semua distrik
+    if name == 'neighbourhoods' and key == ALL:
+        return table
+    return table[table['district'] == key]
+
+
+def cell(district, period=ALL_MONTHS, room_type=ALL):
+    """Return one cube cell as a Series (all NaN when the cell is empty)."""
+    cube = district_table('cube', district)
+    match = cube[(cube['year_month'] == period) & (cube['room_type'] == room_type)]
+    if match.empty:
+        return pd.Series(np.nan, index=cube.columns)
+    return match.iloc[0]
+
+
+def monthly(district, until=None):
+    """Monthly cells (all room types) up to and including the ``until`` yyyymm key."""
+    cube = district_table('cube', district)
+    months = cube[(cube['room_type'] == ALL) & (cube['year_month'] > ALL_MONTHS)]
+    if until is not None:
+        months = months[months['year_month'] <= until]
+    return months.sort_values('year_month').reset_index(drop=True)
+
+
+def room_types(district, period=ALL_MONTHS):
+    cube = district_table('cube', district)
+    return cube[(cube['year_month'] == period) & (cube['room_type'] != ALL)].sort_values('room_type').reset_index(drop=True)
+
+
+def neighbourhoods(district):
+    return district_table('neighbourhoods', district).reset_index(drop=True)
+
+
+def price_groups(district):
+    return district_table('price_groups', district).drop(columns='district').reset_index(drop=True)
+
+
+def host_scores(district):
+    return district_table('hosts', district).drop(columns='district').reset_index(drop=True)
+
+
+def sketch(metric, district=None, period=ALL_MONTHS, superhost=None):
+    """Merged quantile sketch of ``metric`` over any selection of sketch cells.
+
+    ``district`` is None ("All District"), one district or a list of them;
+    ``period`` is ALL_MONTHS, BASELINE, one yyyymm key or an inclusive
+    ``(first, last)`` range of keys; ``superhost`` None means all hosts. The
+    cost depends on the number of cells and buckets, not on the number of rows.
+    """
+    return _merge_sketch(load_table('sketches'), metric, district, period, superhost)
+
+
+def _cell_mask(table, district=None, period=ALL_MONTHS):
+    # district: None/"All District" = semua, satu nama atau list; period: ALL_MONTHS, BASELINE, yyyymm atau (awal, akhir).
+    # BASELINE berakhir di tengah bulan, jadi dipilih lewat flag baseline sel, bukan rentang bulan
+    mask = pd.Series(True, index=table.index)
+    if isinstance(district, (list, tuple, set)):
+        mask &= table['district'].isin(list(district))
+    elif _district_key(district) != ALL:
+        mask &= table['district'] == district
+    if period == BASELINE:
+        mask &= table['baseline'].to_numpy(bool)
+    elif period != ALL_MONTHS:
+        first, last = period if isinstance(period, tuple) else (period, period)
+        mask &= table['year_month'].between(first, last).fillna(False)
+    return mask
+
+
+def _merge_sketch(table, metric, district=None, period=ALL_MONTHS, superhost=None):
+    mask = (table['metric'] == metric) & _cell_mask(table, district, period)
+    if superhost is not None:
+        mask &= table['host_is_superhost'].eq(superhost).fillna(False)
+    return QuantileSketch.from_buckets(table.loc[mask, 'key'].to_numpy(), table.loc[mask, 'count'].to_numpy())
+
+
+def percentile(metric, q, district=None, period=ALL_MONTHS, superhost=None):
+    """Approximate ``quantile(q)`` of ``metric`` for the selection (see sketch); q may be a list."""
+    return sketch(metric, district, period, superhost).quantile(q)
+
+
+def price_edges(district=None, period=ALL_MONTHS):
+    """Approximate boundaries between the five price groups (20/40/60/80% price quantiles)."""
+    return percentile('price', [0.2, 0.4, 0.6, 0.8], district, period)
+
+
+def distinct_count(column, district=None, period=ALL_MONTHS, exact=None):
+    """Approximate number of distinct ``column`` values (listing_id or host_id) among the reviews of a selection.
+
+    Selections are as in sketch(); the HyperLogLog registers of the cells
+    are merged, so the error bound of sketches.DistinctSketch holds for any
+    union of districts and months. ``exact=True`` (default: DISTINCT_EXACT)
+    counts the rows instead, for validation.
+    """
+    if DISTINCT_EXACT if exact is None else exact:
+        rows = add_cell_columns(load_district(None, ['district', 'review_date', column]))
+        return int(rows.loc[_cell_mask(rows, district, period), column].nunique())
+    table = load_table('distinct')
+    return DistinctSketch.from_bytes(table.loc[(table['column'] == column) & _cell_mask(table, district, period),
+                                               'registers'].to_numpy()).count()
+
+
+def active_counts(district, period=ALL_MONTHS):
+    """Active listings and hosts (distinct ids among the reviews) of a district and period, from the sketches.
+
+    Cached per version of the distinct table, so a rerun of the page only
+    looks the two counts up.
+    """
+    key = _district_key(district)
+    counts = cached_frame(('active_counts', key, period), table_version('distinct'), lambda: pd.DataFrame(
+        {column: [distinct_count(column, key, period)] for column in DISTINCT_COLUMNS}))
+    return int(counts['listing_id'].iloc[0]), int(counts['host_id'].iloc[0])
+
+
+def distinct_errors(df=None):
+    """Relative error of the HyperLogLog counts against exact ``nunique`` for cells and unions of cells.
+
+    Selections: every district-month cell, every district over all months
+    and over BASELINE, every year over all districts, and everything.
+    """
+    df = add_cell_columns(load_district(None, SOURCE_COLUMNS) if df is None else compact(df))
+    table = build_distinct(df)
+    districts = sorted(df['district'].dropna().unique())
+    cells = df[['district', 'year_month']].dropna().drop_duplicates().itertuples(index=False)
+    years = sorted(int(year) for year in df['year'].dropna().unique())
+    selections = {
+        'district-month': [(district, month) for district, month in cells],
+        'district': [(district, ALL_MONTHS) for district in districts],
+        'baseline': [(district, BASELINE) for district in [None] + districts],
+        'year': [(None, (year * 100 + 1, year * 100 + 12)) for year in years],
+        'all': [(None, ALL_MONTHS)],
+    }
+    rows = []
+    for column in DISTINCT_COLUMNS:
+        sketches = table[table['column'] == column]
+        for kind, selected in selections.items():
+            errors = []
+            for district, period in selected:
+                exact = df.loc[_cell_mask(df, district, period), column].nunique()
+                estimate = DistinctSketch.from_bytes(
+                    sketches.loc[_cell_mask(sketches, district, period), 'registers'].to_numpy()).count()
+                errors.append(abs(estimate - exact) / exact if exact else float(estimate != 0))
+            rows.append({'column': column, 'selection': kind, 'selections': len(errors),
+                         'mean_relative_error': float(np.mean(errors)), 'max_relative_error': float(np.max(errors))})
+    return pd.DataFrame(rows)
+
+
+def sketch_errors(df=None, quantiles=(0.2, 0.5, 0.8, 0.9)):
+    """Largest relative error of the sketch quantiles against exact pandas quantiles.
+
+    Checked per metric over every district and ALL, for all hosts and each
+    superhost group; should stay within sketches.ACCURACY.
+    """
+    df = add_date_columns(load_district(None, SOURCE_COLUMNS) if df is None else compact(df))
+    table = build_sketches(df)
+    rows = []
+    for metric in SKETCH_METRICS:
+        worst = 0.0
+        for district in [ALL] + sorted(df['district'].dropna().unique()):
+            for superhost in (None, True, False):
+                part = df if district == ALL else df[df['district'] == district]
+                if superhost is not None:
+                    part = part[part['host_is_superhost'].eq(superhost)]
+                exact = part[metric].astype('float64').quantile(list(quantiles)).to_numpy()
+                estimate = _merge_sketch(table, metric, district, superhost=superhost).quantile(quantiles)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    error = np.abs(estimate - exact) / np.abs(exact)
+                worst = max(worst, float(np.nanmax(np.where(exact == 0, np.abs(estimate), error), initial=0.0)))
+        rows.append({'metric': metric, 'max_relative_error': worst})
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute the Exploration page aggregates.")
+    parser.add_argument('--dest', default=AGGREGATES_DIR, help="output directory")
+    parser.add_argument('--backend', choices=BACKENDS, default=BACKEND, help="aggregation engine")
+    parser.add_argument('--check-sketches', action='store_true',
+                        help="only compare sketch quantiles with exact quantiles and print the errors")
+    parser.add_argument('--check-distinct', action='store_true',
+                        help="only compare HyperLogLog distinct counts with exact counts and print the errors")
+    args = parser.parse_args()
+    if args.check_sketches:
+        from sketches import ACCURACY
+        print(sketch_errors().to_string(index=False))
+        print(f"Bound: {ACCURACY}")
+    elif args.check_distinct:
+        from sketches import HLL_PRECISION
+        print(distinct_errors().to_string(index=False))
+        print(f"Standard error: {1.04 / np.sqrt(1 << HLL_PRECISION):.4f}")
+    else:
+        print(f"Aggregates written to {build_all(dest=args.dest, backend=args.backend)}")
@@ -0,0 +1,91 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from model_registry import MODEL_FEATURES, MODEL_NAMES, get_model
+
+BATCH_SIZE = 100_000
+
+
+def _set_threads(model, n_threads):
+    # Setiap chunk di-score paralel oleh beberapa worker; thread per prediksi
+    # dibagi supaya total thread tidak melebihi jumlah core
+    estimators = getattr(model, 'estimators_', None) or [model]
+    for estimator in estimators:
+        # Atribut diset langsung: get_params() gagal pada model pickle dari versi XGBoost lama
+        if hasattr(estimator, 'n_jobs'):
+            estimator.n_jobs = n_threads
+
+
+def score_parquet(source, dest, model='xgb', batch_size=BATCH_SIZE, workers=None, keep=('listing_id',)):
+    """Score every row of ``source`` and write ``keep`` columns + ``predicted_price`` to ``dest``.
+
+    The file is streamed in ``batch_size`` row chunks; up to ``workers``
+    chunks are scored concurrently (the model libraries release the GIL) and
+    at most ``workers + 1`` chunks are held in memory at any time. Returns a
+    dict with the row count, elapsed seconds and rows per second.
+    """
+    workers = workers or os.cpu_count() or 1
+    estimator = get_model(model) if isinstance(model, str) else model
+    _set_threads(estimator, max(1, (os.cpu_count() or 1) // workers))
+
+    source_file = pq.ParquetFile(source)
+    missing = [name for name in MODEL_FEATURES if name not in source_file.schema_arrow.names]
+    if missing:
+        raise ValueError(f"{source} is missing model feature(s): {', '.join(missing)}")
+    keep = [name for name in keep if name in source_file.schema_arrow.names]
+
+    def score(batch):
+        features = batch.select(MODEL_FEATURES).to_pandas()
+        prediction = estimator.predict(features)
+        return pa.table(
+            [batch.column(name) for name in keep] + [pa.array(prediction, type=pa.float32())],
+            names=keep + ['predicted_price'],
+        )
+
+    rows = 0
+    start = time.perf_counter()
+    writer = None
+    pending = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            batches = source_file.iter_batches(batch_size=batch_size, columns=list(dict.fromkeys(keep + MODEL_FEATURES)))
+            for batch in batches:
+                pending.append(pool.submit(score, batch))
+                # Hasil ditulis sesuai urutan input; antrean dibatasi agar memori tetap terbatas
+                while len(pending) > workers:
+                    writer, rows = _write(pending.popleft().result(), dest, writer, rows)
+            while pending:
+                writer, rows = _write(pending.popleft().result(), dest, writer, rows)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {'rows': rows, 'seconds': elapsed, 'rows_per_second': rows / elapsed if elapsed else 0.0}
+
+
+def _write(table, dest, writer, rows):
+    if writer is None:
+        writer = pq.ParquetWriter(dest, table.schema, compression='zstd')
+    writer.write_table(table)
+    return writer, rows + table.num_rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Batch-score a Parquet file of listing features.")
+    parser.add_argument('source', help="Parquet file with the nine model features")
+    parser.add_argument('dest', help="output Parquet file")
+    parser.add_argument('--model', choices=MODEL_NAMES, default='xgb')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=None, help="concurrent chunks (default: CPU count)")
+    parser.add_argument('--keep', nargs='*', default=['listing_id'], help="columns copied to the output")
+    args = parser.parse_args()
+
+    stats = score_parquet(args.source, args.dest, args.model, args.batch_size, args.workers, args.keep)
+    print(f"Scored {stats['rows']:,} rows in {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)")
@@ -0,0 +1,303 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+import aggregates
+import charts
+from data_access import DATA_DIR
+from model_registry import MODEL_FEATURES, get_model, model_info
+from schema import compact
+from sketches import DistinctSketch
+
+# Data sintetis per skala disimpan di sini dan dipakai ulang antar run (tidak di-commit)
+BENCHMARK_DATA_DIR = os.path.join(DATA_DIR, 'benchmark_data')
+SCALES = [1, 10, 100]
+SUITES = ['load', 'exploration', 'sql', 'map', 'prediction', 'shap']
+REPEAT = 5
+MAP_SIZES = [1_000, 3_000, 10_000]
+BATCH_ROWS = 10_000
+SHAP_BATCH_ROWS = 1_000
+# Perubahan median lebih dari 10% dianggap regresi saat membandingkan dua hasil
+REGRESSION_THRESHOLD = 0.10
+
+
+def measure(func, repeat=REPEAT, warmup=1):
+    """Run ``func`` ``warmup + repeat`` times; timings (ms) of the measured runs."""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': float(np.median(times)),
+        'min_ms': float(np.min(times)),
+        'max_ms': float(np.max(times)),
+        'repeat': repeat,
+    }
+
+
+def ensure_data(scale, data_dir=None):
+    """Directory with the synthetic files for ``scale``, generated on first use."""
+    data_dir = data_dir or os.path.join(BENCHMARK_DATA_DIR, f'scale_{scale:g}')
+    if not os.path.exists(os.path.join(data_dir, 'all.parquet')):
+        from synthetic_data import generate
+        generate(scale, data_dir)
+    return data_dir
+
+
+def bench_load(data_dir, repeat):
+    paths = {name: os.path.join(data_dir, f'{name}.parquet') for name in ('listings', 'all')}
+    district = pd.read_parquet(paths['listings'], columns=['district'])['district'].mode()[0]
+    return {
+        'load.listings': measure(lambda: compact(pd.read_parquet(paths['listings'])), repeat),
+        'load.all': measure(lambda: compact(pd.read_parquet(paths['all'])), repeat),
+        'load.all_aggregate_columns': measure(
+            lambda: compact(pd.read_parquet(paths['all'], columns=aggregates.SOURCE_COLUMNS)), repeat),
+        'load.all_model_features': measure(lambda: pd.read_parquet(paths['all'], columns=MODEL_FEATURES), repeat),
+        'load.all_one_district': measure(lambda: compact(pd.read_parquet(
+            paths['all'], columns=aggregates.SOURCE_COLUMNS, filters=[('district', '==', district)])), repeat),
+    }
+
+
+def _figure(build, repeat):
+    # Waktu membangun figure plus ukuran JSON yang dikirim ke browser
+    result = measure(build, repeat)
+    result['payload_bytes'] = len(build().to_json())
+    return result
+
+
+def bench_exploration(data_dir, repeat):
+    df = aggregates.add_date_columns(compact(pd.read_parquet(
+        os.path.join(data_dir, 'all.parquet'), columns=aggregates.SOURCE_COLUMNS)))
+    district = df['district'].mode()[0]
+    part = df[df['district'] == district]
+    sketches = aggregates.build_sketches(df)
+    distinct = aggregates.build_distinct(df)
+    hosts = aggregates.build_hosts(df)
+    hosts = hosts[hosts['district'] == aggregates.ALL]
+    neighbourhoods = aggregates.build_neighbourhoods(df)
+    return {
+        # Perhitungan yang dulu dijalankan halaman Exploration setiap rerun
+        'exploration.monthly_nunique': measure(lambda: df.groupby('year_month', observed=True).agg(
+            listings=('listing_id', 'nunique'), hosts=('host_id', 'nunique')), repeat),
+        'exploration.monthly_nunique_one_district': measure(lambda: part.groupby('year_month', observed=True).agg(
+            listings=('listing_id', 'nunique'), hosts=('host_id', 'nunique')), repeat),
+        'exploration.price_groups_qcut': measure(lambda: aggregates.build_price_groups(df), repeat),
+        'exploration.neighbourhoods': measure(lambda: aggregates.build_neighbourhoods(df), repeat),
+        'exploration.hosts': measure(lambda: aggregates.build_hosts(df), repeat),
+        # Build offline seluruh cube (distrik x bulan x room type + roll-up)
+        'exploration.cube': measure(lambda: aggregates.build_cube(df), max(1, repeat // 2)),
+        'exploration.sketches': measure(lambda: aggregates.build_sketches(df), repeat),
+        # Batas kelompok harga dari sketsa (gabungan sel) dibanding qcut atas semua baris
+        'exploration.price_edges_sketch': measure(
+            lambda: aggregates._merge_sketch(sketches, 'price').quantile([0.2, 0.4, 0.6, 0.8]), repeat * 20),
+        'exploration.price_edges_exact': measure(lambda: df['price'].quantile([0.2, 0.4, 0.6, 0.8]), repeat * 20),
+        'exploration.distinct': measure(lambda: aggregates.build_distinct(df), repeat),
+        # Jumlah listing unik seluruh data: gabungan sketsa HyperLogLog per sel dibanding nunique atas semua baris
+        'exploration.distinct_count_sketch': measure(
+            lambda: DistinctSketch.from_bytes(distinct.loc[distinct['column'] == 'listing_id', 'registers'].to_numpy()).count(),
+            repeat * 20),
+        'exploration.distinct_count_exact': measure(lambda: df['listing_id'].nunique(), repeat * 20),
+        # Figure: scatter semua host (sampel di atas charts.MAX_POINTS) dibanding semua titik, dan bar top-N neighbourhood
+        'exploration.host_scatter_figure': _figure(lambda: charts.scatter(
+            hosts, 'host_response_rate', 'review_scores_rating', 'host_is_superhost', 'hosts'), repeat),
+        'exploration.host_scatter_figure_all_points': _figure(lambda: charts.scatter(
+            hosts, 'host_response_rate', 'review_scores_rating', 'host_is_superhost', 'hosts', max_points=len(hosts)),
+            repeat),
+        'exploration.neighbourhood_bar_figure': _figure(lambda: charts.bar(
+            charts.top_n(neighbourhoods, 'neighbourhood', 'listings'), 'neighbourhood', 'listings', 'listings',
+            px.colors.qualitative.Vivid_r), repeat),
+    }
+
+
+def bench_sql(data_dir, repeat):
+    import sql_backend
+
+    path = os.path.join(data_dir, 'all.parquet')
+    district = pd.read_parquet(os.path.join(data_dir, 'listings.parquet'), columns=['district'])['district'].mode()[0]
+    # Sama dengan suite exploration, tetapi dihitung DuckDB langsung dari file (termasuk waktu baca)
+    return {
+        'sql.price_groups': measure(lambda: sql_backend.build_price_groups(path=path), repeat),
+        'sql.neighbourhoods': measure(lambda: sql_backend.build_neighbourhoods(path=path), repeat),
+        'sql.hosts': measure(lambda: sql_backend.build_hosts(path=path), repeat),
+        'sql.cube_one_district': measure(lambda: sql_backend.build_cube([district], path), max(1, repeat // 2)),
+        'sql.cube': measure(lambda: sql_backend.build_cube(path=path), max(1, repeat // 2)),
+        'sql.sketches': measure(lambda: sql_backend.build_sketches(path), repeat),
+        'sql.distinct': measure(lambda: sql_backend.build_distinct(path), repeat),
+    }
+
+
+def bench_map(data_dir, repeat):
+    from map_render import build_marker_map
+    from spatial_index import cell_aggregates, cell_size_for_zoom
+    from tiles import bin_listings, build_pyramid
+
+    listings = compact(pd.read_parquet(os.path.join(data_dir, 'listings.parquet'))).dropna(
+        subset=['listings_name', 'price', 'latitude', 'longitude'])
+    # HTML peta tidak bergantung pada isi store detail; descriptor tiruan cukup
+    store = {'version': 'benchmark', 'shards': 1, 'url': ''}
+    results = {}
+    for size in MAP_SIZES:
+        if size > len(listings):
+            continue
+        sample = listings.sample(size, random_state=43)
+        # Termasuk render HTML, seperti yang dilakukan st_folium sebelum dikirim ke browser
+        render = lambda: build_marker_map(sample, store=store).get_root().render()
+        results[f'map.markers_{size}'] = measure(render, repeat)
+        results[f'map.markers_{size}']['payload_bytes'] = len(render())
+        results[f'map.cells_{size}'] = measure(lambda: cell_aggregates(sample, cell_size_for_zoom(11)), repeat)
+    # Pyramid tile offline: binning satu zoom dan seluruh pyramid (termasuk menulis PNG)
+    results['map.tile_bins_z13'] = measure(
+        lambda: bin_listings(listings['latitude'], listings['longitude'], listings['price'], 13), repeat)
+    with tempfile.TemporaryDirectory() as dest:
+        results['map.tile_pyramid'] = measure(lambda: build_pyramid(listings, dest, 'benchmark'), 1)
+    return results
+
+
+def _model_inputs(data_dir, rows):
+    X = pd.read_parquet(os.path.join(data_dir, 'all.parquet'), columns=MODEL_FEATURES).dropna()
+    return X.sample(min(rows, len(X)), random_state=43).astype('float64').reset_index(drop=True)
+
+
+def bench_prediction(data_dir, repeat):
+    import prediction_cache
+    from tree_predictor import get_predictor
+
+    X = _model_inputs(data_dir, BATCH_ROWS)
+    row = X.iloc[[0]]
+    features = row.iloc[0].to_dict()
+    results = {}
+    for name in ('xgb', 'ensemble'):
+        model, predictor = get_model(name), get_predictor(name)
+
+        def uncached():
+            prediction_cache.cache.clear()
+            prediction_cache.predict(features, name)
+
+        results[f'prediction.{name}.row_model_predict'] = measure(lambda: model.predict(row), repeat * 20)
+        results[f'prediction.{name}.row_uncached'] = measure(uncached, repeat * 20)
+        results[f'prediction.{name}.row_cached'] = measure(lambda: prediction_cache.predict(features, name), repeat * 20)
+        if predictor is not None:
+            values = row.to_numpy()[0]
+            results[f'prediction.{name}.row_compiled'] = measure(lambda: predictor.predict_row(values), repeat * 20)
+            results[f'prediction.{name}.batch_compiled'] = measure(lambda: predictor.predict(X.to_numpy()), repeat)
+        results[f'prediction.{name}.batch_model_predict'] = measure(lambda: model.predict(X), repeat)
+    prediction_cache.cache.clear()
+    return results
+
+
+def bench_shap(data_dir, repeat):
+    from explain import contributions
+
+    X = _model_inputs(data_dir, SHAP_BATCH_ROWS)
+    return {
+        'shap.xgb.row': measure(lambda: contributions(X.iloc[[0]], 'xgb'), repeat * 20),
+        'shap.xgb.batch': measure(lambda: contributions(X, 'xgb'), repeat),
+    }
+
+
+BENCHMARKS = {
+    'load': bench_load,
+    'exploration': bench_exploration,
+    'sql': bench_sql,
+    'map': bench_map,
+    'prediction': bench_prediction,
+    'shap': bench_shap,
+}
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DATA_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    import duckdb
+    import pyarrow
+    import xgboost
+
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'duckdb': duckdb.__version__,
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pyarrow': pyarrow.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def run(scale=1, suites=SUITES, repeat=REPEAT, data_dir=None):
+    """Run the benchmark ``suites`` on synthetic data at ``scale``; returns the report dict."""
+    data_dir = ensure_data(scale, data_dir)
+    rows = {name: pd.read_parquet(os.path.join(data_dir, f'{name}.parquet'), columns=[]).shape[0]
+            for name in ('listings', 'hosts', 'reviews', 'all')}
+    results = {}
+    for suite in suites:
+        results.update(BENCHMARKS[suite](data_dir, repeat))
+    return {
+        'commit': _commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'scale': scale,
+        'rows': rows,
+        'models': {name: model_info(name)['version'] for name in ('xgb', 'ensemble')},
+        'environment': _environment(),
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Median ratio current/baseline per benchmark present in both reports, slowest first."""
+    if baseline['scale'] != current['scale']:
+        raise ValueError(f"Cannot compare scale {baseline['scale']:g}x with scale {current['scale']:g}x")
+    rows = []
+    for name, result in current['results'].items():
+        if name in baseline['results']:
+            before, after = baseline['results'][name]['median_ms'], result['median_ms']
+            ratio = after / before if before else float('inf')
+            rows.append({'benchmark': name, 'baseline_ms': before, 'current_ms': after, 'ratio': ratio,
+                         'regression': ratio > 1 + threshold})
+    return pd.DataFrame(rows).sort_values('ratio', ascending=False).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark loading, aggregation, map, prediction and SHAP on "
+                                                 "synthetic data.")
+    parser.add_argument('--scale', type=float, default=1, help="data size relative to the real data (1, 10, 100)")
+    parser.add_argument('--suite', action='append', choices=SUITES, help="suites to run (default: all)")
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--data', default=None, help="directory with synthetic data "
+                                                     "(default: benchmark_data/scale_<scale>, generated if missing)")
+    parser.add_argument('--output', default=None, help="JSON file for the results (default: print only)")
+    parser.add_argument('--compare', default=None, help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    report = run(args.scale, args.suite or SUITES, args.repeat, args.data)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f"Scale {args.scale:g}x ({report['rows']['all']:,} merged rows), commit {report['commit']}")
+    for name, result in report['results'].items():
+        print(f"  {name:<48} {result['median_ms']:>10.3f} ms (min {result['min_ms']:.3f})")
+    if args.compare:
+        with open(args.compare) as f:
+            comparison = compare(json.load(f), report)
+        print(comparison.round(3).to_string(index=False))
+        if comparison['regression'].any():
+            raise SystemExit(f"{int(comparison['regression'].sum())} benchmark(s) slower by more than "
+                             f"{REGRESSION_THRESHOLD:.0%}")
@@ -0,0 +1,126 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Jumlah figure yang disimpan per proses (LRU); satu entri per chart x filter x versi data
+CACHE_SIZE = int(os.environ.get('CHART_CACHE_SIZE', 256))
+# Scatter dengan titik lebih banyak dari ini digambar dengan WebGL (scattergl), bukan SVG
+WEBGL_THRESHOLD = int(os.environ.get('CHART_WEBGL_THRESHOLD', 1_000))
+# Di atas jumlah titik ini scatter hanya menampilkan sampel (ukuran payload tetap, berapapun datanya)
+MAX_POINTS = int(os.environ.get('CHART_MAX_POINTS', 10_000))
+# Jumlah kategori bar yang ditampilkan; sisanya digabung menjadi satu bar "Other"
+TOP_N = int(os.environ.get('CHART_TOP_N', 25))
+SEED = 43
+
+
+class FigureCache:
+    """Thread-safe LRU cache of built figures shared by every session in the process.
+
+    Figures are keyed by chart, filter state and data version, so a figure
+    is rebuilt only when its inputs change. Cached figures are shared:
+    callers must not modify them.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version, build):
+        """Figure cached under ``key`` for ``version``, built with ``build()`` on a miss (may be None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # Dibangun di luar lock: rerun sesi lain tidak menunggu figure yang tidak mereka perlukan
+        figure = build()
+        with self._lock:
+            self._entries[key] = (version, figure)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return figure
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+cache = FigureCache()
+
+
+def figure(key, version, build):
+    """Shortcut for ``cache.get``; ``key`` is the chart name plus its filter state."""
+    return cache.get(key, version, build)
+
+
+def top_n(frame, label, value, n=TOP_N, other='Other', how='sum'):
+    """The ``n`` rows with the largest ``value``, plus one row combining the rest.
+
+    ``how`` combines the remaining values: 'sum' for counts, 'median' for
+    values that cannot be added, such as median prices (the extra bar is
+    then the median over the remaining categories). The extra row is
+    labelled ``other`` with the number of categories it holds.
+    """
+    frame = frame.sort_values(value, ascending=False)
+    if len(frame) <= n + 1:
+        return frame
+    head, rest = frame.iloc[:n], frame.iloc[n:]
+    row = pd.DataFrame({label: [f'{other} ({len(rest)})'], value: [rest[value].agg(how)]})
+    return pd.concat([head[[label, value]], row], ignore_index=True)
+
+
+def bar(frame, x, y, title, colors):
+    """Bar chart drawn as a single trace; bar colours cycle through ``colors``."""
+    # Satu trace untuk semua bar (bukan satu trace per kategori seperti px.bar(color=...))
+    marker_colors = [colors[i % len(colors)] for i in range(len(frame))]
+    fig = go.Figure(go.Bar(x=frame[x], y=frame[y], marker_color=marker_colors))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+def downsample(frame, max_points=MAX_POINTS, by=None):
+    """At most ``max_points`` rows: a fixed-seed random sample, stratified by ``by`` if given."""
+    if len(frame) <= max_points:
+        return frame
+    if by is None:
+        return frame.sample(max_points, random_state=SEED)
+    # Sampel bertingkat: proporsi setiap warna tetap sama seperti di data lengkap
+    return frame.groupby(by, group_keys=False, dropna=False, observed=True).sample(
+        frac=max_points / len(frame), random_state=SEED)
+
+
+def scatter(frame, x, y, color, title, max_points=MAX_POINTS):
+    """Scatter plot whose size no longer grows with the data.
+
+    Rows missing ``x`` or ``y`` are dropped. Above ``max_points`` a sample
+    stratified by ``color`` is drawn (the title says so), and above
+    WEBGL_THRESHOLD points the browser renders them with WebGL.
+    """
+    frame = frame.dropna(subset=[x, y])
+    shown = downsample(frame, max_points, by=color)
+    if len(shown) < len(frame):
+        title = f'{title} (sample of {len(shown):,} of {len(frame):,})'
+    return px.scatter(shown, x=x, y=y, color=color, title=title,
+                      render_mode='webgl' if len(shown) > WEBGL_THRESHOLD else 'svg')
@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from schema import compact
+
+# Semua file data berada di folder yang sama dengan modul ini,
+# jadi path tidak bergantung pada direktori tempat streamlit dijalankan
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+# File untuk browser (detail listing, tile peta) dilayani Streamlit dari folder static/ di samping
+# 🏠_Home.py (server.enableStaticServing) pada URL /app/static; ubah STATIC_URL jika memakai baseUrlPath
+STATIC_DIR = os.environ.get('DASHBOARD_STATIC_DIR', os.path.join(DATA_DIR, 'static'))
+STATIC_URL = os.environ.get('DASHBOARD_STATIC_URL', '/app/static')
+
+DATASETS = {
+    'listings': 'listings.parquet',
+    'reviews': 'reviews.parquet',
+    'hosts': 'hosts.parquet',
+    'all': 'all.parquet',
+    # Agregat hasil aggregates.py
+    'agg_cube': os.path.join('aggregates', 'cube.parquet'),
+    'agg_neighbourhoods': os.path.join('aggregates', 'neighbourhoods.parquet'),
+    'agg_price_groups': os.path.join('aggregates', 'price_groups.parquet'),
+    'agg_hosts': os.path.join('aggregates', 'hosts.parquet'),
+    'agg_sketches': os.path.join('aggregates', 'sketches.parquet'),
+    'agg_distinct': os.path.join('aggregates', 'distinct.parquet'),
+    'agg_listing_totals': os.path.join('aggregates', 'listing_totals.parquet'),
+}
+
+# Review baru dari refresh.py ditambahkan sebagai file segmen, bukan dengan menulis ulang file dataset:
+# segments/<dataset>/<versi file dataset>/<review_id pertama>-<review_id terakhir>.parquet.
+# Segmen hanya berlaku untuk versi file tempat ia ditambahkan; file yang diganti (mis. dump lengkap baru)
+# sudah memuat barisnya sendiri
+SEGMENTS_DIR = os.path.join(DATA_DIR, 'segments')
+
+# Dataset gabungan yang dipartisi ala hive: city=.../district=.../*.parquet
+PARTITIONED_DIR = os.path.join(DATA_DIR, 'all_by_district')
+PARTITION_COLUMNS = ['city', 'district']
+PARTITIONING = ds.partitioning(
+    pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]), flavor='hive')
+
+# Cache tingkat proses: dipakai bersama oleh semua sesi dan semua halaman.
+# RLock karena sebuah loader boleh memuat dataset lain (mis. agregat dari load_district)
+_cache = {}
+_lock = threading.RLock()
+
+
+def dataset_path(name):
+    if name not in DATASETS:
+        raise KeyError(f"Unknown dataset '{name}'. Available: {', '.join(DATASETS)}")
+    return os.path.join(DATA_DIR, DATASETS[name])
+
+
+def _file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fingerprint(path, use_hash):
+    # mtime + ukuran sudah cukup untuk mendeteksi file yang ditulis ulang;
+    # hash isi file dipakai jika mtime tidak bisa dipercaya (mis. hasil checkout git)
+    stat = os.stat(path)
+    fingerprint = (stat.st_mtime_ns, stat.st_size)
+    if use_hash:
+        fingerprint += (_file_hash(path),)
+    return fingerprint
+
+
+def segment_dir(name):
+    """Directory of the segment files appended to the current version of dataset ``name``."""
+    mtime, size = _fingerprint(dataset_path(name), False)
+    return os.path.join(SEGMENTS_DIR, name, f'{mtime:x}-{size:x}')
+
+
+def dataset_files(name):
+    """The file of dataset ``name`` followed by its segment files, in the order they were appended."""
+    directory = segment_dir(name)
+    if not os.path.isdir(directory):
+        return [dataset_path(name)]
+    segments = sorted(file for file in os.listdir(directory) if file.endswith('.parquet'))
+    return [dataset_path(name)] + [os.path.join(directory, file) for file in segments]
+
+
+def dataset_fingerprint(name, use_hash=False):
+    """Version marker of a dataset file and its segments; changes whenever the file is rewritten or appended to."""
+    files = dataset_files(name)
+    if len(files) == 1:
+        return _fingerprint(files[0], use_hash)
+    return tuple(_fingerprint(path, use_hash) for path in files)
+
+
+def _freeze(df):
+    # Bangun ulang frame dari array numpy read-only agar perubahan in-place
+    # dari halaman tidak bisa merusak data yang ada di cache.
+    # Kolom extension (string Arrow, kategori) memang sudah immutable.
+    columns = {}
+    for name in df.columns:
+        column = df[name]
+        if isinstance(column.dtype, np.dtype):
+            values = column.to_numpy(copy=True)
+            values.flags.writeable = False
+            columns[name] = values
+        else:
+            columns[name] = column
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def cached_frame(key, fingerprint, loader):
+    """Return the frame cached under ``key``, rebuilding it with ``loader()``
+    whenever ``fingerprint`` differs from the one it was built with."""
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] != fingerprint:
+            entry = (fingerprint, _freeze(loader()))
+            _cache[key] = entry
+
+    # Salinan dangkal: halaman boleh menambah/mengganti kolom tanpa menyentuh cache
+    return entry[1].copy(deep=False)
+
+
+def _read_files(files, columns):
+    frames = [pd.read_parquet(path, columns=columns) for path in files]
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def load_dataset(name, columns=None, use_hash=False):
+    """Load a dataset once per process and return a read-only view of it.
+
+    The cached frame is reloaded when the file's mtime/size (or content hash,
+    with ``use_hash=True``) changes or a segment is appended (see
+    segment_dir). ``columns`` reads only those columns.
+    Columns get the compact dtypes of schema.py, also for files written
+    before ingest.py was run.
+    """
+    columns = list(columns) if columns is not None else None
+    key = (name, tuple(columns) if columns is not None else None)
+    return cached_frame(key, dataset_fingerprint(name, use_hash), lambda: compact(_read_files(dataset_files(name), columns)))
+
+
+def _dataset_fingerprint(path):
+    # Fingerprint dataset berpartisi = fingerprint semua file di dalamnya
+    fingerprint = []
+    for root, _, files in os.walk(path):
+        for file in sorted(files):
+            full = os.path.join(root, file)
+            fingerprint.append((os.path.relpath(full, path),) + _fingerprint(full, False))
+    return tuple(sorted(fingerprint))
+
+
+def partitioned_dir(dest=PARTITIONED_DIR):
+    """Directory of the current version of the partitioned dataset, or None if it has not been built.
+
+    partition_dataset.py publishes every rewrite as ``dest/<version>/`` and
+    then switches ``dest/manifest.json`` to it; a dataset written before
+    versioning (partitions directly under ``dest``) is still read.
+    """
+    manifest = published_manifest(dest)
+    if manifest is not None:
+        return os.path.join(dest, manifest['version'])
+    if os.path.isdir(dest) and any(name.startswith('city=') for name in os.listdir(dest)):
+        return dest
+    return None
+
+
+def merged_fingerprint():
+    # Sumber data gabungan yang dipakai load_district
+    path = partitioned_dir()
+    if path is None:
+        return _fingerprint(dataset_path('all'), False)
+    # Setiap versi partisi ditulis sekali dan tidak pernah diubah: namanya cukup sebagai fingerprint
+    if path != PARTITIONED_DIR:
+        return ('all_by_district', os.path.basename(path))
+    return _dataset_fingerprint(path)
+
+
+def load_district(district=None, columns=None):
+    """Load the merged data for one district with filter and column pushdown.
+
+    Reads only the ``district=...`` partition of the hive-partitioned
+    ``all_by_district`` dataset (see partition_dataset.py). ``district=None``
+    reads every partition. Falls back to filtering ``all.parquet`` when the
+    partitioned dataset has not been built yet.
+    """
+    columns = list(columns) if columns is not None else None
+    key = ('all_by_district', district, tuple(columns) if columns is not None else None)
+    filters = [('district', '==', district)] if district is not None else None
+
+    # Kolom partisi terbaca sebagai string; compact() menjadikannya kategori lagi
+    path = partitioned_dir()
+    if path is not None:
+        return cached_frame(key, merged_fingerprint(), lambda: compact(pd.read_parquet(
+            path, columns=columns, filters=filters, partitioning=PARTITIONING)))
+
+    return cached_frame(key, merged_fingerprint(), lambda: compact(pd.read_parquet(
+        dataset_path('all'), columns=columns, filters=filters)))
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def load_listings(columns=None):
+    return load_dataset('listings', columns)
+
+
+def load_reviews(columns=None):
+    return load_dataset('reviews', columns)
+
+
+def load_hosts(columns=None):
+    return load_dataset('hosts', columns)
+
+
+def load_merged(columns=None):
+    return load_dataset('all', columns)
+
+
+MANIFEST = 'manifest.json'
+
+
+def publish_version(dest, version, write, manifest):
+    """Write ``dest/<version>/`` with ``write(directory)`` and make it the current version.
+
+    The directory is written under a temporary name and renamed into place,
+    so readers never see a partial version. ``manifest`` (a dict with at
+    least ``version``) is then written atomically to ``dest/manifest.json``.
+    The version it replaces is kept until the next publish, so a reader that
+    resolved it just before the switch can finish; older versions are removed.
+    """
+    os.makedirs(dest, exist_ok=True)
+    tmp = os.path.join(dest, f'{version}.{os.getpid()}.tmp')
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    write(tmp)
+    try:
+        os.replace(tmp, os.path.join(dest, version))
+    except OSError:
+        # Proses lain sudah menulis versi yang sama
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    previous = published_manifest(dest)
+    keep = {version, MANIFEST}
+    if previous is not None:
+        keep.add(previous['version'])
+    tmp_manifest = os.path.join(dest, f'{MANIFEST}.{os.getpid()}.tmp')
+    with open(tmp_manifest, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_manifest, os.path.join(dest, MANIFEST))
+    for name in os.listdir(dest):
+        if name not in keep and not name.endswith('.tmp'):
+            path = os.path.join(dest, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+    return manifest
+
+
+def published_manifest(dest):
+    """Manifest of the current version under ``dest``, or None if nothing was published."""
+    try:
+        with open(os.path.join(dest, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if os.path.isdir(os.path.join(dest, manifest['version'])) else None
+
+
+def static_version(name):
+    """Version token of dataset ``name`` for static files derived from it (changes with the file)."""
+    mtime, size = _fingerprint(dataset_path(name), False)
+    return f'{mtime:x}-{size:x}'
@@ -0,0 +1,203 @@
+import argparse
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from data_access import dataset_files, dataset_path
+from schema import COMPACT_TYPES, compact_table
+
+# Tipe kerja selama join (hash join Arrow tidak menerima kolom dictionary);
+# hasil akhir ditulis dengan tipe ringkas dari schema.py. Kolom lain dari sumber dibuang
+LISTING_FIELDS = [
+    ('listing_id', pa.int64()),
+    ('listings_name', pa.string()),
+    ('host_id', pa.int64()),
+    ('neighbourhood', pa.string()),
+    ('district', pa.string()),
+    ('city', pa.string()),
+    ('latitude', pa.float64()),
+    ('longitude', pa.float64()),
+    ('property_type', pa.string()),
+    ('room_type', pa.string()),
+    ('accommodates', pa.int32()),
+    ('bedrooms', pa.int32()),
+    ('amenities', pa.string()),
+    ('price', pa.int32()),
+    ('minimum_nights', pa.int32()),
+    ('maximum_nights', pa.int32()),
+    ('instant_bookable', pa.string()),
+]
+HOST_FIELDS = [
+    ('host_id', pa.int64()),
+    ('host_since', pa.string()),
+    ('host_location', pa.string()),
+    ('host_response_time', pa.string()),
+    ('host_response_rate', pa.float64()),
+    ('host_acceptance_rate', pa.float64()),
+    ('host_is_superhost', pa.string()),
+    ('host_total_listings_count', pa.int32()),
+    ('host_has_profile_pic', pa.string()),
+    ('host_identity_verified', pa.string()),
+]
+REVIEW_FIELDS = [
+    ('review_id', pa.int64()),
+    ('listing_id', pa.int64()),
+    ('review_date', pa.timestamp('s')),
+    ('review_scores_rating', pa.float64()),
+    ('review_scores_accuracy', pa.float64()),
+    ('review_scores_cleanliness', pa.float64()),
+    ('review_scores_checkin', pa.float64()),
+    ('review_scores_communication', pa.float64()),
+    ('review_scores_location', pa.float64()),
+    ('review_scores_value', pa.float64()),
+]
+DATE_FIELDS = [
+    ('year', pa.int16()),
+    ('month', pa.int8()),
+    ('year_month', pa.int32()),
+]
+MERGED_SCHEMA = pa.schema([
+    (name, COMPACT_TYPES.get(name, dtype)) for name, dtype in
+    REVIEW_FIELDS
+    + [field for field in LISTING_FIELDS if field[0] != 'listing_id']
+    + [field for field in HOST_FIELDS if field[0] != 'host_id']
+    + DATE_FIELDS
+])
+
+BATCH_SIZE = 200_000
+ROW_GROUP_SIZE = 256_000
+# Format tanggal yang dicoba berurutan (sumber asli memakai dd/mm/yyyy)
+DATE_FORMATS = ['%d/%m/%Y', '%Y-%m-%d']
+PERCENT_COLUMNS = ['host_response_rate', 'host_acceptance_rate']
+
+
+def read_batches(path, batch_size=BATCH_SIZE):
+    """Stream record batches from a Parquet or CSV file (CSV separator auto: ';' or ',')."""
+    if path.endswith('.csv'):
+        with open(path, encoding='utf-8') as f:
+            delimiter = ';' if ';' in f.readline() else ','
+        reader = pv.open_csv(
+            path,
+            read_options=pv.ReadOptions(block_size=1 << 24),
+            parse_options=pv.ParseOptions(delimiter=delimiter),
+        )
+        yield from reader
+        return
+    yield from pq.ParquetFile(path).iter_batches(batch_size=batch_size)
+
+
+def read_table(path):
+    return pa.Table.from_batches(list(read_batches(path)))
+
+
+def normalize_percent(values):
+    """'93%' strings -> 0.93 (as in model3.ipynb); numeric fractions are kept as they are."""
+    if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+        stripped = pc.utf8_rtrim(pc.utf8_trim_whitespace(values), characters='%')
+        stripped = pc.if_else(pc.equal(stripped, ''), pa.scalar(None, values.type), stripped)
+        return pc.divide(pc.cast(stripped, pa.float64()), 100.0)
+    return pc.cast(values, pa.float64())
+
+
+def parse_dates(values):
+    if pa.types.is_timestamp(values.type) or pa.types.is_date(values.type):
+        return pc.cast(values, pa.timestamp('s'))
+    values = pc.cast(values, pa.string())
+    parsed = [pc.strptime(values, format=fmt, unit='s', error_is_null=True) for fmt in DATE_FORMATS]
+    return pc.coalesce(*parsed)
+
+
+def conform(table, fields):
+    """Select and cast ``fields`` from ``table``; raises if a required column is missing."""
+    missing = [name for name, _ in fields if name not in table.column_names]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)}")
+    columns = []
+    for name, dtype in fields:
+        column = table.column(name)
+        if name in PERCENT_COLUMNS:
+            column = normalize_percent(column)
+        elif name == 'review_date':
+            column = parse_dates(column)
+        columns.append(pc.cast(column, dtype))
+    return pa.table(columns, schema=pa.schema(fields))
+
+
+def listing_dimension(listings_path, hosts_path):
+    """Listings joined with their host: small enough to keep in memory for the whole run."""
+    listings = conform(read_table(listings_path), LISTING_FIELDS)
+    hosts = conform(read_table(hosts_path), HOST_FIELDS)
+    return listings.join(hosts, keys='host_id', join_type='left outer')
+
+
+def add_date_fields(table):
+    review_date = table.column('review_date')
+    year = pc.year(review_date)
+    month = pc.month(review_date)
+    year_month = pc.add(pc.multiply(year, 100), month)
+    for (name, dtype), values in zip(DATE_FIELDS, [year, month, year_month]):
+        table = table.append_column(name, pc.cast(values, dtype))
+    return table
+
+
+def build_merged(listings_path=None, hosts_path=None, reviews_path=None, dest=None,
+                 batch_size=BATCH_SIZE, row_group_size=ROW_GROUP_SIZE):
+    """Join reviews with listings and hosts batch by batch into ``dest`` (all.parquet).
+
+    Only the listing/host dimension and one reviews batch (plus at most one
+    row group of output) are held in memory, so peak memory does not grow
+    with the number of reviews. Returns the number of rows written.
+    """
+    listings_path = listings_path or dataset_path('listings')
+    hosts_path = hosts_path or dataset_path('hosts')
+    # reviews.parquet beserta segmen review yang ditambahkan refresh.py
+    reviews_paths = [reviews_path] if reviews_path else dataset_files('reviews')
+    dest = dest or dataset_path('all')
+
+    dimension = listing_dimension(listings_path, hosts_path)
+    tmp_dest = dest + '.tmp'
+    rows = 0
+    pending = []
+    pending_rows = 0
+    with pq.ParquetWriter(tmp_dest, MERGED_SCHEMA, compression='zstd', compression_level=3) as writer:
+        for batch in (batch for path in reviews_paths for batch in read_batches(path, batch_size)):
+            reviews = conform(pa.Table.from_batches([batch]), REVIEW_FIELDS)
+            merged = add_date_fields(reviews.join(dimension, keys='listing_id', join_type='inner'))
+            merged = compact_table(merged.select(MERGED_SCHEMA.names)).cast(MERGED_SCHEMA)
+            pending.append(merged)
+            pending_rows += merged.num_rows
+            # Batch hasil join dikumpulkan dulu supaya setiap row group berukuran ROW_GROUP_SIZE;
+            # sisanya dibawa ke row group berikutnya
+            if pending_rows >= row_group_size:
+                buffered = pa.concat_tables(pending)
+                full = pending_rows - pending_rows % row_group_size
+                writer.write_table(buffered.slice(0, full), row_group_size=row_group_size)
+                rows += full
+                pending = [buffered.slice(full)]
+                pending_rows -= full
+        if pending_rows:
+            writer.write_table(pa.concat_tables(pending), row_group_size=row_group_size)
+            rows += pending_rows
+    os.replace(tmp_dest, dest)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the merged all.parquet from listings, hosts and reviews.")
+    parser.add_argument('--listings', default=None, help="listings Parquet/CSV (default: listings.parquet)")
+    parser.add_argument('--hosts', default=None, help="hosts Parquet/CSV (default: hosts.parquet)")
+    parser.add_argument('--reviews', default=None, help="reviews Parquet/CSV (default: reviews.parquet)")
+    parser.add_argument('--dest', default=None, help="output file (default: all.parquet)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--row-group-size', type=int, default=ROW_GROUP_SIZE)
+    parser.add_argument('--partition', action='store_true', help="also rebuild the district partitions")
+    args = parser.parse_args()
+
+    rows = build_merged(args.listings, args.hosts, args.reviews, args.dest, args.batch_size, args.row_group_size)
+    print(f"Wrote {rows:,} rows to {args.dest or dataset_path('all')}")
+    if args.partition:
+        from partition_dataset import write_partitioned
+        print(f"Partitioned dataset written to {write_partitioned(args.dest)}")
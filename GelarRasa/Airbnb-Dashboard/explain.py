@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_access import load_district
+from model_registry import MODEL_FEATURES, REGISTRY_DIR, get_model, model_info
+
+# Jumlah baris data latih yang dijelaskan untuk ringkasan SHAP global
+SUMMARY_SAMPLE = 50_000
+
+_explainers = {}
+_lock = threading.Lock()
+
+
+def _version(name, version=None):
+    return model_info(name, version)['version']
+
+
+def tree_explainer(name='xgb', version=None):
+    """shap.TreeExplainer for a model version, built once per process."""
+    import shap
+
+    key = (name, _version(name, version))
+    with _lock:
+        if key not in _explainers:
+            _explainers[key] = shap.TreeExplainer(get_model(name, key[1]))
+        return _explainers[key]
+
+
+def contributions(X, name='xgb', version=None):
+    """Per-row SHAP contributions and the base value for ``X``.
+
+    Uses XGBoost's native ``pred_contribs`` (exact TreeSHAP in C++, no
+    explainer object) when the model has a booster, otherwise a cached
+    shap.TreeExplainer. Returns ``(values, base_value)`` with ``values`` of
+    shape (rows, features).
+    """
+    model = get_model(name, version)
+    if hasattr(model, 'get_booster'):
+        from xgboost import DMatrix
+
+        contribs = model.get_booster().predict(DMatrix(X[MODEL_FEATURES]), pred_contribs=True)
+        # Kolom terakhir adalah bias (expected value) model
+        return contribs[:, :-1], float(contribs[0, -1]) if len(contribs) else 0.0
+
+    explainer = tree_explainer(name, version)
+    expected_value = explainer.expected_value
+    if isinstance(expected_value, (list, np.ndarray)):
+        expected_value = expected_value[0]
+    return explainer.shap_values(X[MODEL_FEATURES]), float(expected_value)
+
+
+def _summary_path(name, version):
+    return os.path.join(REGISTRY_DIR, name, version, 'shap_summary.json')
+
+
+def build_global_summary(name='xgb', version=None, data=None, sample=SUMMARY_SAMPLE, seed=43):
+    """Mean |SHAP| per feature over (a sample of) the training data, written next to the model."""
+    version = _version(name, version)
+    if data is None:
+        data = load_district(None, MODEL_FEATURES)
+    data = data.dropna(subset=MODEL_FEATURES)
+    if len(data) > sample:
+        data = data.sample(sample, random_state=seed)
+
+    values, base_value = contributions(data, name, version)
+    summary = {
+        'rows': len(data),
+        'base_value': base_value,
+        'mean_abs_shap': dict(zip(MODEL_FEATURES, np.abs(values).mean(axis=0).tolist())),
+    }
+    path = _summary_path(name, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def global_summary(name='xgb', version=None):
+    """Precomputed global summary as a Series sorted by importance, or None if not built."""
+    path = _summary_path(name, _version(name, version))
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        summary = json.load(f)
+    return pd.Series(summary['mean_abs_shap']).sort_values()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute the global SHAP summary of a model.")
+    parser.add_argument('--model', default='xgb')
+    parser.add_argument('--version', default=None, help="model version (default: latest)")
+    parser.add_argument('--sample', type=int, default=SUMMARY_SAMPLE)
+    args = parser.parse_args()
+
+    summary = build_global_summary(args.model, args.version, sample=args.sample)
+    print(f"Global SHAP summary over {summary['rows']:,} rows:")
+    for feature, value in sorted(summary['mean_abs_shap'].items(), key=lambda item: -item[1]):
+        print(f"  {feature:<28} {value:.3f}")
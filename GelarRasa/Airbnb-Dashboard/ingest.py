@@ -0,0 +1,162 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_access import dataset_path, partitioned_dir
+from schema import BOOLEAN_COLUMNS, compact, compact_table, is_compact
+
+# Dataset sumber; yang punya kolom review_date (string dd/mm/yyyy dari sumber aslinya)
+# juga mendapat kolom periode
+INGESTED_DATASETS = ['listings', 'hosts', 'reviews', 'all']
+BATCH_SIZE = 250_000
+
+
+def month_key(year, month):
+    """Integer year-month key (e.g. 202101) so month filters are integer comparisons."""
+    return year * 100 + month
+
+
+def month_label(key):
+    return f"{int(key) // 100}-{int(key) % 100:02d}"
+
+
+def add_date_columns(df):
+    """Parse ``review_date`` once and add integer ``year``, ``month`` and ``year_month`` columns.
+
+    Already-typed frames are returned unchanged apart from missing derived columns.
+    """
+    review_date = df['review_date']
+    if not pd.api.types.is_datetime64_any_dtype(review_date):
+        review_date = pd.to_datetime(review_date, dayfirst=True, errors='coerce')
+    year = review_date.dt.year.astype('Int16')
+    month = review_date.dt.month.astype('Int8')
+    return df.assign(
+        review_date=review_date,
+        year=year,
+        month=month,
+        year_month=month_key(year.astype('Int32'), month.astype('Int32')),
+    )
+
+
+def is_ingested(schema):
+    dated = 'review_date' not in schema.names or (
+        pa.types.is_timestamp(schema.field('review_date').type) and 'year_month' in schema.names)
+    return dated and is_compact(schema)
+
+
+def ingest_file(path, batch_size=BATCH_SIZE):
+    """Rewrite ``path`` in place with the compact schema (schema.py).
+
+    Files with a ``review_date`` column also get a timestamp ``review_date``
+    and the derived period columns. Returns False if already ingested.
+    """
+    source = pq.ParquetFile(path)
+    if is_ingested(source.schema_arrow):
+        return False
+
+    dated = 'review_date' in source.schema_arrow.names
+    tmp_path = path + '.tmp'
+    writer = None
+    try:
+        for batch in source.iter_batches(batch_size=batch_size):
+            table = pa.Table.from_batches([batch])
+            if dated:
+                table = pa.Table.from_pandas(add_date_columns(table.to_pandas()), preserve_index=False)
+            table = compact_table(table)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        os.replace(tmp_path, path)
+    return writer is not None
+
+
+def run(names=INGESTED_DATASETS):
+    rewritten = [name for name in names if os.path.exists(dataset_path(name)) and ingest_file(dataset_path(name))]
+    # Partisi per distrik diturunkan dari all.parquet, jadi ikut dibangun ulang
+    if 'all' in rewritten and partitioned_dir() is not None:
+        from partition_dataset import write_partitioned
+        write_partitioned()
+    return rewritten
+
+
+def legacy(df):
+    # Representasi lama sebagai pembanding: string object, flag 't'/'f', angka 64-bit
+    changes = {}
+    for name in df.columns:
+        column = df[name]
+        if name in BOOLEAN_COLUMNS and pd.api.types.is_bool_dtype(column):
+            changes[name] = column.map({True: 't', False: 'f'}).astype(object)
+        elif isinstance(column.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(column):
+            changes[name] = column.astype(object)
+        elif pd.api.types.is_integer_dtype(column):
+            changes[name] = column.astype('Int64' if column.hasnans else 'int64')
+        elif pd.api.types.is_float_dtype(column):
+            changes[name] = column.astype('float64')
+    return df.assign(**changes)
+
+
+def _timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def _workload(df):
+    # Operasi khas halaman: filter satu distrik lalu median harga per room type
+    district = df['district'].iloc[0]
+    return {
+        'filter_ms': _timed(lambda: df[df['district'] == district]),
+        'groupby_ms': _timed(lambda: df.groupby(['district', 'room_type'], observed=True)['price'].median()),
+    }
+
+
+def memory_report(names=INGESTED_DATASETS):
+    """Per dataset: in-memory size (MB) in the legacy and compact representation.
+
+    For datasets with district/room_type/price columns, also the time of a
+    typical filter and groupby in both representations.
+    """
+    rows = []
+    for name in names:
+        if not os.path.exists(dataset_path(name)):
+            continue
+        compacted = compact(pd.read_parquet(dataset_path(name)))
+        before = legacy(compacted)
+        row = {
+            'dataset': name,
+            'rows': len(compacted),
+            'legacy_mb': before.memory_usage(deep=True).sum() / 1e6,
+            'compact_mb': compacted.memory_usage(deep=True).sum() / 1e6,
+        }
+        if {'district', 'room_type', 'price'} <= set(compacted.columns):
+            row.update({f'legacy_{key}': value for key, value in _workload(before).items()})
+            row.update({f'compact_{key}': value for key, value in _workload(compacted).items()})
+        rows.append(row)
+    report = pd.DataFrame(rows)
+    report['ratio'] = np.round(report['legacy_mb'] / report['compact_mb'], 1)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Store datasets with the compact schema and typed review dates.")
+    parser.add_argument('datasets', nargs='*', default=INGESTED_DATASETS,
+                        help="dataset names (default: listings hosts reviews all)")
+    parser.add_argument('--report', action='store_true', help="print the per-dataset memory report instead")
+    args = parser.parse_args()
+    if args.report:
+        print(memory_report(args.datasets).round(2).to_string(index=False))
+    else:
+        rewritten = run(args.datasets)
+        print(f"Rewritten: {', '.join(rewritten) if rewritten else 'nothing (already ingested)'}")
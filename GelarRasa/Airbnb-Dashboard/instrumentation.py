@@ -0,0 +1,213 @@
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from data_access import DATA_DIR
+
+# Instrumentasi mati secara default; saat mati span() hanya mengembalikan context manager kosong
+ENABLED = os.environ.get('DASHBOARD_INSTRUMENT', '0') not in ('', '0', 'false')
+# File metrik format teks Prometheus (bisa di-scrape lewat node_exporter textfile collector)
+METRICS_FILE = os.environ.get('DASHBOARD_METRICS_FILE', os.path.join(DATA_DIR, 'metrics.prom'))
+# Satu baris JSON per rerun
+RERUN_LOG = os.environ.get('DASHBOARD_RERUN_LOG', os.path.join(DATA_DIR, 'reruns.jsonl'))
+# File metrik ditulis paling sering sekali per interval ini (detik)
+METRICS_INTERVAL = float(os.environ.get('DASHBOARD_METRICS_INTERVAL', 1.0))
+
+# DASHBOARD_PROFILE=<nama halaman> (atau 'all') memprofil rerun berikutnya dari halaman itu, sekali per proses.
+# DASHBOARD_PROFILE_MODE=cprofile (default) atau sample (pyinstrument, jika terpasang)
+PROFILE_PAGE = os.environ.get('DASHBOARD_PROFILE', '')
+PROFILE_MODE = os.environ.get('DASHBOARD_PROFILE_MODE', 'cprofile')
+PROFILE_DIR = os.environ.get('DASHBOARD_PROFILE_DIR', os.path.join(DATA_DIR, 'profiles'))
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = contextlib.nullcontext()
+_local = threading.local()
+# (page, stage) -> [count, sum, jumlah per bucket]
+_metrics = {}
+_lock = threading.Lock()
+_last_write = 0.0
+_profiled = set()
+
+
+def _observe(page, stage, seconds):
+    with _lock:
+        entry = _metrics.get((page, stage))
+        if entry is None:
+            entry = _metrics[(page, stage)] = [0, 0.0, [0] * len(BUCKETS)]
+        entry[0] += 1
+        entry[1] += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                entry[2][i] += 1
+
+
+@contextlib.contextmanager
+def _timed(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        rerun = getattr(_local, 'rerun', None)
+        if rerun is not None:
+            rerun['spans'].append({'stage': stage, 'ms': round(seconds * 1000, 3)})
+        # Span di luar rerun (halaman tanpa begin_rerun) dicatat tanpa nama halaman
+        _observe(rerun['page'] if rerun is not None else '', stage, seconds)
+
+
+def span(stage):
+    """Context manager timing one stage of the current rerun (load, filter, aggregate, figure, map, inference)."""
+    return _timed(stage) if ENABLED else _NOOP
+
+
+def _start_profiler(page):
+    if not PROFILE_PAGE or PROFILE_PAGE not in (page, 'all') or page in _profiled:
+        return None
+    with _lock:
+        if page in _profiled:
+            return None
+        _profiled.add(page)
+    if PROFILE_MODE == 'sample':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+        if Profiler is not None:
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _save_profile(profiler, page):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stem = os.path.join(PROFILE_DIR, f"{page}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    if hasattr(profiler, 'output_html'):
+        profiler.stop()
+        path = stem + '.html'
+        with open(path, 'w') as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.disable()
+        # Buka dengan: python -m pstats <file> atau snakeviz <file>
+        path = stem + '.prof'
+        profiler.dump_stats(path)
+    return path
+
+
+def begin_rerun(page, fragment=None):
+    """Mark the start of a page rerun; call at the top of the page script.
+
+    ``fragment`` names the fragment when Streamlit reruns only that fragment
+    (see ``fragment_rerun``).
+    """
+    profiler = _start_profiler(page) if PROFILE_PAGE else None
+    if not ENABLED and profiler is None:
+        return
+    # Rerun sebelumnya di thread ini yang tidak selesai (exception, st.stop, rerun baru) tidak dicatat;
+    # profilnya tetap disimpan
+    previous = getattr(_local, 'rerun', None)
+    if previous is not None and previous['profiler'] is not None:
+        _save_profile(previous['profiler'], previous['page'])
+    _local.rerun = {'page': page, 'fragment': fragment, 'started': time.perf_counter(), 'spans': [],
+                    'profiler': profiler}
+
+
+def end_rerun():
+    """Mark the end of the rerun: log it, update the metrics file and save a requested profile."""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return None
+    _local.rerun = None
+    seconds = time.perf_counter() - rerun['started']
+    record = {
+        'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'page': rerun['page'],
+        'fragment': rerun['fragment'],
+        'thread': threading.current_thread().name,
+        'total_ms': round(seconds * 1000, 3),
+        'spans': rerun['spans'],
+    }
+    if rerun['profiler'] is not None:
+        record['profile'] = _save_profile(rerun['profiler'], rerun['page'])
+    if ENABLED:
+        _observe(rerun['page'], 'rerun', seconds)
+        _log(record)
+        _maybe_write_metrics()
+    return record
+
+
+@contextlib.contextmanager
+def fragment_rerun(page, fragment):
+    """Wrap the body of an ``st.fragment`` function.
+
+    Streamlit runs a fragment-only rerun on a new script thread without the
+    page's begin_rerun, so the body is then logged as its own rerun of
+    ``page``. Inside a full page rerun the fragment's spans simply belong to
+    that rerun.
+    """
+    if getattr(_local, 'rerun', None) is not None:
+        yield
+        return
+    begin_rerun(page, fragment)
+    try:
+        yield
+    finally:
+        end_rerun()
+
+
+def _log(record):
+    line = json.dumps(record) + '\n'
+    with _lock:
+        with open(RERUN_LOG, 'a') as f:
+            f.write(line)
+
+
+def metrics_text():
+    """All stage timings as Prometheus text (histogram ``dashboard_stage_seconds``)."""
+    lines = [
+        '# HELP dashboard_stage_seconds Time spent per page stage; stage="rerun" is the whole rerun.',
+        '# TYPE dashboard_stage_seconds histogram',
+    ]
+    with _lock:
+        snapshot = {key: (count, total, list(buckets)) for key, (count, total, buckets) in _metrics.items()}
+    for (page, stage), (count, total, buckets) in sorted(snapshot.items()):
+        labels = f'page="{page}",stage="{stage}"'
+        for bound, bucket in zip(BUCKETS, buckets):
+            lines.append(f'dashboard_stage_seconds_bucket{{{labels},le="{bound}"}} {bucket}')
+        lines.append(f'dashboard_stage_seconds_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f'dashboard_stage_seconds_sum{{{labels}}} {total:.6f}')
+        lines.append(f'dashboard_stage_seconds_count{{{labels}}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics(path=None):
+    path = path or METRICS_FILE
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(metrics_text())
+    os.replace(tmp_path, path)
+    return path
+
+
+def _maybe_write_metrics():
+    global _last_write
+    now = time.monotonic()
+    with _lock:
+        if now - _last_write < METRICS_INTERVAL:
+            return
+        _last_write = now
+    write_metrics()
+
+
+if ENABLED:
+    # Metrik yang tertahan oleh METRICS_INTERVAL tetap ditulis saat proses berhenti
+    atexit.register(write_metrics)
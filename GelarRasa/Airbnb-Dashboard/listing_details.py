@@ -0,0 +1,105 @@
+import argparse
+import html
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+from data_access import STATIC_DIR, STATIC_URL, load_listings, publish_version, published_manifest, static_version
+
+POPUP_FIELDS = [
+    ('price', 'Price'),
+    ('property_type', 'Property Type'),
+    ('room_type', 'Room Type'),
+    ('accommodates', 'Accommodates'),
+    ('bedrooms', 'Bedrooms'),
+    ('minimum_nights', 'Minimum Nights'),
+    ('maximum_nights', 'Maximum Nights'),
+    ('instant_bookable', 'Instant Bookable'),
+]
+
+# Jumlah listing per shard; browser hanya mengunduh shard milik listing yang popup-nya dibuka
+SHARD_SIZE = int(os.environ.get('LISTING_DETAIL_SHARD_SIZE', 250))
+STORE_NAME = 'listing_details'
+STORE_DIR = os.path.join(STATIC_DIR, STORE_NAME)
+
+_store = None
+_lock = threading.Lock()
+
+
+def _escape(values):
+    return values.astype(str).map(html.escape)
+
+
+def popup_columns(data):
+    """Return the display columns of every listing as escaped strings, built column-wise."""
+    columns = {
+        'listings_name': _escape(data['listings_name']),
+        'price': '$' + data['price'].astype(str),
+        'instant_bookable': np.where(data['instant_bookable'].fillna(False).astype(bool), 'Yes', 'No'),
+    }
+    for name, _ in POPUP_FIELDS:
+        if name not in columns:
+            columns[name] = _escape(data[name])
+    return columns
+
+
+def build_store(data=None, dest=STORE_DIR, version=None, shard_size=SHARD_SIZE):
+    """Write the popup details of every listing as JSON shards under ``dest/<version>/``.
+
+    Shard ``i`` holds the listings with ``listing_id % shards == i`` as one
+    object of columns (``listing_id`` as strings, plus the escaped popup
+    columns).
+    Published with ``publish_version``. Returns the store
+    descriptor ``{'version', 'shards'}``, also written to the manifest.
+    """
+    version = version or static_version('listings')
+    if data is None:
+        data = load_listings(['listing_id', 'listings_name'] + [name for name, _ in POPUP_FIELDS])
+    data = data.dropna(subset=['listing_id']).drop_duplicates('listing_id')
+    shards = max(1, math.ceil(len(data) / shard_size))
+
+    ids = data['listing_id'].to_numpy(np.int64)
+    columns = {'listing_id': ids}
+    columns.update({name: np.asarray(values) for name, values in popup_columns(data).items()})
+    # Posisi baris per shard: urutkan sekali menurut nomor shard, lalu potong
+    keys = ids % shards
+    order = np.argsort(keys, kind='stable')
+    bounds = np.searchsorted(keys[order], np.arange(shards + 1))
+
+    def write(directory):
+        for shard in range(shards):
+            rows = order[bounds[shard]:bounds[shard + 1]]
+            shard_columns = {name: values[rows].tolist() for name, values in columns.items()}
+            # id sebagai string: angka JSON di atas 2^53 dibulatkan oleh browser
+            shard_columns['listing_id'] = [str(listing_id) for listing_id in shard_columns['listing_id']]
+            with open(os.path.join(directory, f'{shard}.json'), 'w') as f:
+                json.dump(shard_columns, f, separators=(',', ':'))
+
+    return publish_version(dest, version, write, {'version': version, 'shards': shards})
+
+
+def detail_store():
+    """Descriptor ``{'version', 'shards', 'url'}`` of the detail store for the current listings.parquet.
+
+    The store is (re)built once per dataset version when it is missing or
+    stale; ``url`` is where the browser fetches ``<shard>.json``.
+    """
+    global _store
+    version = static_version('listings')
+    with _lock:
+        if _store is None or _store['version'] != version:
+            _store = published_manifest(STORE_DIR)
+            if _store is None or _store['version'] != version:
+                _store = build_store(version=version)
+        return dict(_store, url=f'{STATIC_URL}/{STORE_NAME}/{version}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the listing detail store served to map popups.")
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help="listings per JSON shard")
+    args = parser.parse_args()
+    store = build_store(shard_size=args.shard_size)
+    print(f"{store['shards']} shards written to {os.path.join(STORE_DIR, store['version'])}")
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from data_access import DATA_DIR
+
+# Halaman yang diuji; path relatif terhadap folder dashboard
+PAGES = {
+    'home': '🏠_Home.py',
+    'exploration': os.path.join('pages', '1_📊_Exploration.py'),
+    'map': os.path.join('pages', '2_🗺️_Map.py'),
+    'prediction': os.path.join('pages', '3_📈_Price_Prediction.py'),
+}
+SESSIONS = 8
+INTERACTIONS = 10
+TIMEOUT = 300
+# Interval sampling RSS (detik)
+RSS_INTERVAL = 0.05
+
+
+def _home(at, rng):
+    # Home tidak punya widget: interaksi = rerun biasa
+    return at
+
+
+def _exploration(at, rng):
+    district = at.selectbox[0]
+    district.set_value(rng.choice(district.options))
+    if len(at.selectbox) > 1 and rng.random() < 0.3:
+        x_variable = at.selectbox[1]
+        x_variable.set_value(rng.choice(x_variable.options))
+    return at
+
+
+def _map(at, rng):
+    # Ganti distrik, atau (lebih sering) pilih 0-3 neighbourhood di distrik yang sama
+    if rng.random() < 0.4 or not at.multiselect[0].options:
+        district = at.selectbox[0]
+        district.set_value(rng.choice(district.options))
+    else:
+        neighbourhoods = at.multiselect[0]
+        neighbourhoods.set_value(rng.sample(neighbourhoods.options, min(len(neighbourhoods.options), rng.randint(0, 3))))
+    return at
+
+
+def _prediction(at, rng):
+    # Input valid (semua > 0, minimum nights <= maximum nights) lalu klik Predict
+    minimum_nights = rng.randint(1, 30)
+    values = [rng.randint(1, 10), rng.randint(1, 5), minimum_nights, rng.randint(minimum_nights, 100),
+              rng.randint(1, 100)]
+    for widget, value in zip(at.sidebar.number_input, values):
+        widget.set_value(value)
+    for widget, value in zip(at.sidebar.slider, [rng.randint(60, 100), rng.randint(1, 10), rng.randint(1, 10),
+                                                 round(rng.uniform(0.5, 1.0), 2)]):
+        widget.set_value(value)
+    at.button[0].click()
+    return at
+
+
+INTERACTIONS_BY_PAGE = {
+    'home': _home,
+    'exploration': _exploration,
+    'map': _map,
+    'prediction': _prediction,
+}
+
+
+def _rss_mb():
+    # RSS saat ini dari /proc (Linux); di platform lain memakai puncak dari getrusage
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+class RssMonitor:
+    """Samples the process RSS in a background thread and keeps the peak."""
+
+    def __init__(self, interval=RSS_INTERVAL):
+        self.interval = interval
+        self.peak_mb = _rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-monitor', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, _rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, _rss_mb())
+
+
+def run_session(page, interactions=INTERACTIONS, seed=0, timeout=TIMEOUT):
+    """One simulated user: open ``page``, then ``interactions`` widget changes, each followed by a rerun.
+
+    Returns a list of (kind, seconds, error) per rerun; kind is 'initial'
+    for the first run and 'interaction' afterwards.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(os.path.join(DATA_DIR, PAGES[page]), default_timeout=timeout)
+    reruns = []
+    for i in range(interactions + 1):
+        started = time.perf_counter()
+        try:
+            (at if i == 0 else INTERACTIONS_BY_PAGE[page](at, rng)).run()
+            error = '; '.join(exception.message for exception in at.exception) or None
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        reruns.append(('initial' if i == 0 else 'interaction', time.perf_counter() - started, error))
+        if error and i == 0:
+            # Halaman gagal dimuat: widget tidak ada, interaksi tidak bisa dilanjutkan
+            break
+    return reruns
+
+
+def _summary(page, sessions, reruns, seconds, peak_mb):
+    times = np.array([duration for _, duration, _ in reruns]) * 1000
+    interaction_times = np.array([duration for kind, duration, _ in reruns if kind == 'interaction']) * 1000
+    errors = [error for _, _, error in reruns if error]
+    summary = {
+        'page': page,
+        'sessions': sessions,
+        'reruns': len(reruns),
+        'errors': len(errors),
+        'seconds': seconds,
+        'throughput_rps': len(reruns) / seconds if seconds else 0.0,
+        'peak_rss_mb': peak_mb,
+    }
+    for name, values in [('', times), ('interaction_', interaction_times)]:
+        for q in (50, 95, 99):
+            summary[f'{name}p{q}_ms'] = float(np.percentile(values, q)) if len(values) else None
+    if errors:
+        summary['first_error'] = errors[0]
+    return summary
+
+
+def load_test(page, sessions=SESSIONS, interactions=INTERACTIONS, seed=43, timeout=TIMEOUT):
+    """Run ``sessions`` concurrent sessions of ``page`` in this process and summarize them.
+
+    Sessions share the process like they do in a Streamlit server (same
+    data/model caches, same GIL), so latency percentiles include contention.
+    Returns a dict with rerun count, errors, p50/p95/p99 rerun latency (all
+    reruns and interactions only), throughput in reruns/s and peak RSS.
+    """
+    with RssMonitor() as monitor:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(sessions, thread_name_prefix=f'session-{page}') as pool:
+            futures = [pool.submit(run_session, page, interactions, seed + i, timeout) for i in range(sessions)]
+            reruns = [rerun for future in futures for rerun in future.result()]
+        seconds = time.perf_counter() - started
+    return _summary(page, sessions, reruns, seconds, monitor.peak_mb)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load-test the dashboard pages with concurrent headless sessions.")
+    parser.add_argument('--page', action='append', choices=list(PAGES), help="pages to test (default: all)")
+    parser.add_argument('--sessions', type=int, action='append',
+                        help=f"concurrent sessions; repeat for a sweep (default: {SESSIONS})")
+    parser.add_argument('--interactions', type=int, default=INTERACTIONS, help="widget interactions per session")
+    parser.add_argument('--seed', type=int, default=43)
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help="seconds allowed per rerun")
+    parser.add_argument('--output', default=None, help="JSON file for the results")
+    args = parser.parse_args()
+
+    results = []
+    for sessions in args.sessions or [SESSIONS]:
+        for page in args.page or list(PAGES):
+            result = load_test(page, sessions, args.interactions, args.seed, args.timeout)
+            results.append(result)
+            print(f"{page:<12} {sessions:>3} sessions  {result['reruns']:>5} reruns  "
+                  f"p50 {result['p50_ms']:>8.0f} ms  p95 {result['p95_ms']:>8.0f} ms  p99 {result['p99_ms']:>8.0f} ms  "
+                  f"{result['throughput_rps']:>6.1f} reruns/s  peak RSS {result['peak_rss_mb']:,.0f} MB  "
+                  f"errors {result['errors']}" + (f" ({result['first_error'][:80]})" if result['errors'] else ''))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
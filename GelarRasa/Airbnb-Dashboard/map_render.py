@@ -0,0 +1,263 @@
+import base64
+import json
+import os
+
+import folium
+import numpy as np
+import streamlit as st
+from folium.plugins import FastMarkerCluster
+from folium.template import Template
+from streamlit_folium import st_folium
+
+from listing_details import POPUP_FIELDS, detail_store
+from spatial_index import cell_aggregates, cell_size_for_zoom, parse_bounds, visible_listings
+
+# Di atas batas ini listing di viewport tidak digambar satu per satu, tetapi sebagai agregat per sel grid.
+# Bisa diubah lewat environment variable MAP_POINT_THRESHOLD.
+POINT_THRESHOLD = int(os.environ.get('MAP_POINT_THRESHOLD', 3000))
+
+# Mulai zoom ini listing digambar satu per satu; di bawahnya hanya agregat per sel grid
+DETAIL_ZOOM = int(os.environ.get('MAP_DETAIL_ZOOM', 14))
+
+# Satu stylesheet untuk semua popup, bukan satu blok <style> per marker
+POPUP_STYLE = """
+<style>
+    .listing-popup table { width: 100%; border-collapse: collapse; }
+    .listing-popup td { padding: 4px; border: 1px solid #ddd; }
+    .listing-popup th { background-color: #f2f2f2; text-align: left; padding: 4px; }
+</style>
+"""
+
+# Detail listing diambil dari store listing_details saat tooltip/popup pertama kali dibuka:
+# satu fetch per shard, lalu disimpan di browser
+DETAIL_SCRIPT = """
+<script>
+var listingDetails = {
+    url: %(url)s,
+    shards: %(shards)d,
+    fields: %(fields)s,
+    labels: %(labels)s,
+    loaded: {},
+    shard: function (id) {
+        // id BigInt (bisa melebihi 2^53), jadi sisa bagi dihitung sebagai BigInt
+        var key = Number(id %% BigInt(this.shards));
+        if (!this.loaded[key]) {
+            this.loaded[key] = fetch(this.url + '/' + key + '.json').then(function (response) {
+                return response.json();
+            }).then(function (shard) {
+                shard.position = {};
+                for (var i = 0; i < shard.listing_id.length; i++) {
+                    shard.position[shard.listing_id[i]] = i;
+                }
+                return shard;
+            });
+        }
+        return this.loaded[key];
+    },
+    bind: function (marker, id) {
+        var self = this;
+        marker.bindTooltip('...');
+        marker.bindPopup('Loading...');
+        var load = function () {
+            self.shard(id).then(function (shard) {
+                var i = shard.position[id.toString()];
+                if (i === undefined) {
+                    marker.setPopupContent('Listing details unavailable');
+                    return;
+                }
+                var rows = '<tr><th colspan="2">' + shard.listings_name[i] + '</th></tr>';
+                for (var j = 0; j < self.fields.length; j++) {
+                    rows += '<tr><td><strong>' + self.labels[j] + '</strong></td><td>' + shard[self.fields[j]][i] + '</td></tr>';
+                }
+                marker.setTooltipContent(shard.listings_name[i]);
+                marker.setPopupContent('<div class="listing-popup"><table>' + rows + '</table></div>');
+                marker.off('tooltipopen popupopen', load);
+            }).catch(function () {
+                marker.setPopupContent('Listing details unavailable');
+            });
+        };
+        marker.on('tooltipopen popupopen', load);
+    },
+    // Baris [lat, lon, listing_id (BigInt)] dari hasil pack_markers()
+    unpack: function (packed) {
+        var bytes = Uint8Array.from(atob(packed.points), function (c) { return c.charCodeAt(0); });
+        var view = new DataView(bytes.buffer);
+        var rows = new Array(packed.count);
+        for (var i = 0; i < packed.count; i++) {
+            rows[i] = [packed.origin[0] + view.getUint16(12 * i, true) * packed.step[0],
+                       packed.origin[1] + view.getUint16(12 * i + 2, true) * packed.step[1],
+                       view.getBigInt64(12 * i + 4, true)];
+        }
+        return rows;
+    }
+};
+</script>
+"""
+
+# Marker dibuat di browser dari baris [lat, lon, listing_id]; tanpa HTML popup per marker
+MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {
+        icon: L.AwesomeMarkers.icon({icon: 'home', prefix: 'fa', markerColor: 'blue'})
+    });
+    listingDetails.bind(marker, row[2]);
+    return marker;
+}
+"""
+# Resolusi posisi marker: 0.00001 derajat = sekitar 1 meter (lebih kasar jika area lebih luas
+# dari 65535 langkah, mis. 0.65 derajat)
+GRID_STEP = 1e-5
+# listing_id int64: id Inside Airbnb sampai 18 digit
+MARKER_DTYPE = np.dtype([('latitude', '<u2'), ('longitude', '<u2'), ('listing_id', '<i8')])
+
+
+class PackedMarkerCluster(FastMarkerCluster):
+    """FastMarkerCluster whose rows arrive as one ``pack_markers`` payload instead of a JSON list."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                {{ this.callback }}
+
+                var data = listingDetails.unpack({{ this.data|tojson }});
+                var cluster = L.markerClusterGroup({{ this.options|tojavascript }});
+                for (var i = 0; i < data.length; i++) {
+                    callback(data[i]).addTo(cluster);
+                }
+
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}""")
+
+    def __init__(self, packed, callback, **kwargs):
+        super().__init__([], callback=callback, **kwargs)
+        self.data = packed
+
+
+def pack_markers(data):
+    """Positions and ids of ``data`` as 12 bytes per listing, base64-encoded.
+
+    Latitude and longitude are uint16 steps of at least GRID_STEP from the
+    south-west corner; ``listing_id`` is int64 (-1 if missing), read as a
+    BigInt in the browser.
+    """
+    packed = np.empty(len(data), dtype=MARKER_DTYPE)
+    origin, step = [], []
+    for name in ['latitude', 'longitude']:
+        values = data[name].to_numpy(np.float64)
+        low = float(values.min()) if len(values) else 0.0
+        size = max(GRID_STEP, (float(values.max()) - low) / 65535 if len(values) else 0.0)
+        packed[name] = np.rint((values - low) / size)
+        origin.append(low)
+        step.append(size)
+    packed['listing_id'] = data['listing_id'].fillna(-1).to_numpy(np.int64)
+    return {'origin': origin, 'step': step, 'count': len(packed),
+            'points': base64.b64encode(packed.tobytes()).decode('ascii')}
+
+
+def detail_script(store):
+    """<script> defining ``listingDetails`` for the detail store descriptor ``store``."""
+    return DETAIL_SCRIPT % {
+        'url': json.dumps(store['url']),
+        'shards': store['shards'],
+        'fields': json.dumps([name for name, _ in POPUP_FIELDS]),
+        'labels': json.dumps([label for _, label in POPUP_FIELDS]),
+    }
+
+
+def _center(data):
+    return [data['latitude'].mean(), data['longitude'].mean()]
+
+
+def build_marker_map(data, zoom_start=11, location=None, store=None):
+    """Folium map with client-side clustered markers built in bulk from column arrays.
+
+    Markers only carry their position and ``listing_id`` (``pack_markers``);
+    names and popup tables are fetched from the detail store (default
+    ``detail_store()``) when a tooltip or popup is first opened.
+    """
+    m = folium.Map(location=location or _center(data), zoom_start=zoom_start)
+    m.get_root().header.add_child(folium.Element(POPUP_STYLE))
+    m.get_root().header.add_child(folium.Element(detail_script(store or detail_store())))
+
+    PackedMarkerCluster(pack_markers(data), callback=MARKER_CALLBACK).add_to(m)
+    return m
+
+
+def render_listings_map(data, width=700, height=500):
+    """Render all of ``data`` as one clustered marker map (no viewport bounding, see render_viewport_map)."""
+    st_folium(build_marker_map(data), width=width, height=height, returned_objects=[])
+
+
+def build_cell_map(cells, location, zoom_start):
+    """Folium map with one circle per grid cell showing its listing count and median price."""
+    m = folium.Map(location=location, zoom_start=zoom_start)
+    if cells.empty:
+        return m
+    radius = 4 + 3 * np.sqrt(cells['count'].to_numpy())
+    for lat, lon, count, median_price, r in zip(
+            cells['latitude'].tolist(), cells['longitude'].tolist(), cells['count'].tolist(),
+            cells['median_price'].tolist(), radius.tolist()):
+        folium.CircleMarker(
+            [lat, lon],
+            radius=r,
+            color='#2A81CB',
+            fill=True,
+            fill_opacity=0.6,
+            weight=1,
+            tooltip=f"{count:,} listings · median ${median_price:,.0f}",
+        ).add_to(m)
+    return m
+
+
+def build_tile_map(tiles, location, zoom_start):
+    """Folium map with a precomputed heatmap tile layer (see tiles.py) on top of the base map."""
+    m = folium.Map(location=location, zoom_start=zoom_start)
+    folium.TileLayer(
+        tiles=tiles['url'],
+        attr='Airbnb listings',
+        name='Listings',
+        overlay=True,
+        opacity=0.8,
+        min_native_zoom=tiles['min_zoom'],
+        max_native_zoom=tiles['max_zoom'],
+    ).add_to(m)
+    return m
+
+
+def render_viewport_map(data, key, zoom_start=11, width=700, height=500, threshold=None, tiles=None):
+    """Render only what is inside the current map viewport.
+
+    ``data`` must be a filtered ``load_listings()`` frame. The viewport comes
+    from the bounds/zoom st_folium reported on the previous rerun (stored under
+    ``key``); listings are fetched from the spatial index. Below DETAIL_ZOOM,
+    or when more than ``threshold`` listings are visible, per-cell aggregates
+    are drawn instead of individual listings. Returns the number of listings
+    in the viewport.
+
+    With ``tiles`` (a ``tiles.tile_layer`` descriptor) views below
+    DETAIL_ZOOM show the static heatmap tiles instead: the browser fetches
+    the visible tiles and no listing is touched; None is returned then.
+    """
+    threshold = POINT_THRESHOLD if threshold is None else threshold
+    state = st.session_state.get(key) or {}
+    bounds = parse_bounds(state.get('bounds'))
+    zoom = state.get('zoom') or zoom_start
+    center = state.get('center')
+    if tiles is not None and zoom < DETAIL_ZOOM:
+        south, west, north, east = tiles['bounds']
+        location = [center['lat'], center['lng']] if center else [(south + north) / 2, (west + east) / 2]
+        st_folium(build_tile_map(tiles, location, zoom), key=key, width=width, height=height,
+                  returned_objects=['bounds', 'zoom', 'center'])
+        return None
+    location = [center['lat'], center['lng']] if center else _center(data)
+
+    visible = visible_listings(data, bounds) if bounds else data
+    if zoom >= DETAIL_ZOOM and len(visible) <= threshold:
+        m = build_marker_map(visible, zoom_start=zoom, location=location)
+    else:
+        m = build_cell_map(cell_aggregates(visible, cell_size_for_zoom(zoom)), location, zoom)
+
+    st_folium(m, key=key, width=width, height=height, returned_objects=['bounds', 'zoom', 'center'])
+    return len(visible)
@@ -1,10 +1,10 @@
 import streamlit as st
 import pandas as pd
-import folium
-from streamlit_folium import st_folium
+from data_access import load_listings
+from map_render import render_listings_map
 
-# Load data (menggunakan parquet)
-data = pd.read_parquet(r"C:\Users\Aisya\Downloads\GelarRasa\Airbnb-Dashboard\listings.parquet")
+# Load data (menggunakan parquet, di-cache sekali per proses lewat data_access)
+data = load_listings()
 
 # Filter data untuk distrik dan neighbourhood tertentu (opsional)
 st.title("🌎 Explore Airbnb Listings in Your Favorite Districts")
@@ -29,49 +29,10 @@ if neighbourhood_filter:
 
 # Buat peta dengan folium
 if not filtered_data.empty:
-    m = folium.Map(location=[filtered_data['latitude'].mean(), filtered_data['longitude'].mean()], zoom_start=11)
-
-    # Tambahkan marker dengan informasi tambahan pada setiap listing
-    for idx, row in filtered_data.iterrows():
-        popup_content = f"""
-        <style>
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-            }}
-            td {{
-                padding: 4px;
-                border: 1px solid #ddd;
-            }}
-            th {{
-                background-color: #f2f2f2;
-                text-align: left;
-                padding: 4px;
-            }}
-        </style>
-        <table>
-            <tr><th colspan="2">{row['listings_name']}</th></tr>
-            <tr><td><strong>Price</strong></td><td>${row['price']}</td></tr>
-            <tr><td><strong>Property Type</strong></td><td>{row['property_type']}</td></tr>
-            <tr><td><strong>Room Type</strong></td><td>{row['room_type']}</td></tr>
-            <tr><td><strong>Accommodates</strong></td><td>{row['accommodates']}</td></tr>
-            <tr><td><strong>Bedrooms</strong></td><td>{row['bedrooms']}</td></tr>
-            <tr><td><strong>Minimum Nights</strong></td><td>{row['minimum_nights']}</td></tr>
-            <tr><td><strong>Maximum Nights</strong></td><td>{row['maximum_nights']}</td></tr>
-            <tr><td><strong>Instant Bookable</strong></td><td>{"Yes" if row['instant_bookable'] else "No"}</td></tr>
-        </table>
-        """
-
-        folium.Marker(
-            [row['latitude'], row['longitude']],
-            popup=popup_content,
-            tooltip=row['listings_name'],
-            icon=folium.Icon(icon="home", prefix="fa", color="blue")  # ikon rumah dengan warna biru
-        ).add_to(m)
-
     # Tampilkan peta di Streamlit
     st.write(f"### Showing map for district: **{district_filter}**")
-    st_folium(m, width=700, height=500)
+    # Marker dibuat dan dikelompokkan di browser dari array kolom (map_render.build_marker_map)
+    render_listings_map(filtered_data, width=700, height=500)
 
     # Tambahkan jumlah listing
     st.markdown(f"### Total Listings Found: {len(filtered_data)} 🏠")
@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import pickle
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from data_access import DATA_DIR
+
+# Urutan fitur harus sama dengan saat model dilatih (model3.ipynb)
+MODEL_FEATURES = [
+    'accommodates', 'bedrooms', 'minimum_nights', 'maximum_nights',
+    'review_scores_rating', 'review_scores_cleanliness', 'review_scores_location',
+    'host_total_listings_count', 'host_response_rate',
+]
+
+REGISTRY_DIR = os.path.join(DATA_DIR, 'models')
+
+# File .sav lama, dipakai selama registry belum berisi versi apa pun
+LEGACY_FILES = {
+    'xgb': 'airbnb_price_predictor_xgb.sav',
+    'ensemble': 'airbnb_price_predictor_ensemble.sav',
+}
+MODEL_NAMES = tuple(LEGACY_FILES)
+
+LEGACY_METRICS = {
+    'xgb': {'mse': 2656.96, 'r2': 0.8467},
+    'ensemble': {},
+}
+
+_models = {}
+_lock = threading.Lock()
+# Versi terbaru dan metadata di-cache per proses (tanpa I/O disk per prediksi);
+# reload() membaca ulang registry, mis. setelah train.py mendaftarkan versi baru di proses lain
+_latest = {}
+_infos = {}
+_versions_lock = threading.Lock()
+
+
+def _model_dir(name, version):
+    return os.path.join(REGISTRY_DIR, name, version)
+
+
+def list_versions(name):
+    """Registered versions of ``name``, oldest first (``v1``, ``v2``, ...)."""
+    root = os.path.join(REGISTRY_DIR, name)
+    if not os.path.isdir(root):
+        return []
+    versions = [v for v in os.listdir(root) if v.startswith('v') and v[1:].isdigit()
+                and os.path.exists(os.path.join(root, v, 'metadata.json'))]
+    return sorted(versions, key=lambda v: int(v[1:]))
+
+
+def latest_version(name):
+    """Newest registered version of ``name`` ('legacy' if none), read once per process until ``reload()``."""
+    with _versions_lock:
+        if name not in _latest:
+            versions = list_versions(name)
+            _latest[name] = versions[-1] if versions else 'legacy'
+        return _latest[name]
+
+
+def reload():
+    """Forget the cached latest versions and metadata so new registry versions are picked up."""
+    with _versions_lock:
+        _latest.clear()
+        _infos.clear()
+
+
+def register_model(name, model, metrics=None, features=MODEL_FEATURES, params=None, fmt='ubj', training=None):
+    """Save ``model`` as a new version of ``name`` and return the version string.
+
+    XGBoost models are stored in the native booster format (``ubj`` or
+    ``json``); other estimators (e.g. the VotingRegressor ensemble) are pickled.
+    ``training`` is an optional record of the training run (timings, search
+    trials) kept in the metadata.
+    """
+    versions = list_versions(name)
+    version = f"v{int(versions[-1][1:]) + 1 if versions else 1}"
+    path = _model_dir(name, version)
+    os.makedirs(path, exist_ok=True)
+
+    if hasattr(model, 'get_booster') and fmt in ('ubj', 'json'):
+        artifact = f'model.{fmt}'
+        model.get_booster().save_model(os.path.join(path, artifact))
+    else:
+        fmt, artifact = 'pickle', 'model.pkl'
+        with open(os.path.join(path, artifact), 'wb') as model_file:
+            pickle.dump(model, model_file)
+
+    metadata = {
+        'name': name,
+        'version': version,
+        'format': fmt,
+        'artifact': artifact,
+        'estimator': type(model).__name__,
+        'features': list(features),
+        'metrics': metrics or {},
+        'params': params or {},
+        'training': training or {},
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+    # metadata.json ditulis terakhir: versi baru baru terlihat setelah artefaknya lengkap
+    with open(os.path.join(path, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    with _versions_lock:
+        _latest.pop(name, None)
+    return version
+
+
+def model_info(name, version=None):
+    """Metadata of a model version (features, metrics, format, ...); read from disk once per version.
+
+    The returned dict is shared: callers must not modify it.
+    """
+    version = version or latest_version(name)
+    if version == 'legacy':
+        return {
+            'name': name, 'version': 'legacy', 'format': 'pickle', 'artifact': LEGACY_FILES[name],
+            'features': MODEL_FEATURES, 'metrics': LEGACY_METRICS.get(name, {}), 'params': {},
+        }
+    key = (name, version)
+    info = _infos.get(key)
+    if info is None:
+        # Metadata sebuah versi tidak pernah berubah setelah ditulis
+        with open(os.path.join(_model_dir(name, version), 'metadata.json')) as f:
+            info = json.load(f)
+        with _versions_lock:
+            _infos[key] = info
+    return info
+
+
+def _load(info):
+    if info['version'] == 'legacy':
+        path = os.path.join(DATA_DIR, info['artifact'])
+    else:
+        path = os.path.join(_model_dir(info['name'], info['version']), info['artifact'])
+
+    if info['format'] in ('ubj', 'json'):
+        from xgboost import XGBRegressor
+        model = XGBRegressor()
+        model.load_model(path)
+        return model
+    with open(path, 'rb') as model_file:
+        return pickle.load(model_file)
+
+
+def warm_up(model, features=MODEL_FEATURES):
+    # Prediksi pertama menanggung inisialisasi thread pool / cache internal library
+    model.predict(pd.DataFrame(np.ones((1, len(features))), columns=features))
+
+
+def get_model(name='xgb', version=None):
+    """Return the model, loaded and warmed up once per process per version."""
+    info = model_info(name, version)
+    key = (name, info['version'])
+    with _lock:
+        if key not in _models:
+            model = _load(info)
+            warm_up(model, info['features'])
+            _models[key] = model
+        return _models[key]
+
+
+_preload_started = threading.Event()
+
+
+def preload(names=MODEL_NAMES):
+    """Load and warm up the models in a background thread, once per process."""
+    if _preload_started.is_set():
+        return
+    _preload_started.set()
+
+    def run():
+        for name in names:
+            try:
+                get_model(name)
+            except Exception:
+                # Halaman yang memakai model akan memunculkan error yang sama saat dibuka
+                pass
+
+    threading.Thread(target=run, name='model-preload', daemon=True).start()
+
+
+def import_legacy(names=MODEL_NAMES):
+    """Register the legacy .sav files as registry versions (native format for XGBoost)."""
+    versions = {}
+    for name in names:
+        model = _load(model_info(name, 'legacy'))
+        versions[name] = register_model(name, model, metrics=LEGACY_METRICS.get(name))
+    return versions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect or populate the model registry.")
+    parser.add_argument('--import-legacy', action='store_true', help="register the .sav files as new versions")
+    args = parser.parse_args()
+
+    if args.import_legacy:
+        for name, version in import_legacy().items():
+            print(f"Registered {name} {version}")
+    for name in MODEL_NAMES:
+        info = model_info(name)
+        print(f"{name}: {info['version']} ({info['format']}) metrics={info['metrics']}")
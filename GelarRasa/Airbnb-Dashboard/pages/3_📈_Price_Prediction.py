@@ -1,10 +1,15 @@
 import streamlit as st
 import pandas as pd
-import pickle
 import shap
 import numpy as np
 import matplotlib.pyplot as plt
 import streamlit.components.v1 as components
+from model_registry import model_info
+from explain import global_summary
+from prediction_cache import predict
+from instrumentation import begin_rerun, end_rerun, span
+
+begin_rerun('prediction')
 
 # Styling
 st.set_page_config(page_title="Airbnb Price Prediction", page_icon="🏠", layout="wide")
@@ -24,9 +29,9 @@ def st_shap(plot, height=None):
     shap_html = f"<head>{shap.getjs()}</head><body>{plot.html()}</body>"
     components.html(shap_html, height=height)
 
-# Load the saved model
-with open('GelarRasa/Airbnb-Dashboard/airbnb_price_predictor_xgb.sav', 'rb') as model_file:
-    model = pickle.load(model_file)
+# Metrics of the saved model (the model itself is loaded once per process and warmed up by model_registry.preload)
+with span('load'):
+    model_metrics = model_info('xgb')['metrics']
 
 # App title
 st.markdown('<p class="main-title">Airbnb Price Prediction🏡</p>', unsafe_allow_html=True)
@@ -74,23 +79,24 @@ with tab1:
                 'host_response_rate': [host_response_rate]
             })
 
-            # Make a prediction
-            price_prediction = model.predict(input_data)
+            # Make a prediction (memoized across sessions, together with its SHAP values)
+            with span('inference'):
+                prediction = predict(input_data, 'xgb', explain=True)
             
             # Display prediction result directly below the button
             st.write("### Predicted Price")
-            st.write(f"💲 **${price_prediction[0]:,.2f}**")
+            st.write(f"💲 **${prediction['price']:,.2f}**")
 
 with tab2:
     st.markdown('<p class="sub-title">Methodology 📈</p>', unsafe_allow_html=True)
     with st.expander("Learn More About the Model"):
-        st.write("""
+        st.write(f"""
         ### Model: XGBoost Regressor
         XGBoost is a powerful and popular decision-tree-based algorithm for prediction. 
         It uses a boosting method that builds models iteratively to minimize errors and improve prediction accuracy.
         
-        - **Mean Squared Error (MSE):** 2656.96 — Lower MSE indicates a better model.
-        - **R-squared Score (R²):** 0.8467 — A score closer to 1 indicates a highly accurate model.
+        - **Mean Squared Error (MSE):** {model_metrics.get('mse', float('nan')):.2f} — Lower MSE indicates a better model.
+        - **R-squared Score (R²):** {model_metrics.get('r2', float('nan')):.4f} — A score closer to 1 indicates a highly accurate model.
         """)
 
 with tab3:
@@ -101,19 +107,25 @@ with tab3:
     """)
     # Ensure input_data is not empty before proceeding with SHAP analysis
     if not input_data.empty:
-        # SHAP analysis
-        explainer = shap.Explainer(model)
-        shap_values = explainer(input_data)
-
+        # SHAP values come with the cached prediction (native XGBoost pred_contribs)
         # Display SHAP force plot for the first prediction
         st.subheader("SHAP Force Plot for Prediction")
-        expected_value = explainer.expected_value[0] if isinstance(explainer.expected_value, (list, np.ndarray)) else explainer.expected_value
-        st_shap(shap.force_plot(expected_value, shap_values.values[0], input_data))
-
-        # Display SHAP summary plot for the input_data
-        st.subheader("SHAP Summary Plot")
-        fig_summary, ax_summary = plt.subplots()
-        shap.summary_plot(shap_values, input_data, plot_type="bar", show=False)
-        st.pyplot(fig_summary)
+        with span('figure'):
+            st_shap(shap.force_plot(prediction['base_value'], prediction['shap_values'], input_data))
     else:
         st.warning("⚠️ Please enter valid input features and run the prediction first.")
+
+    # Display the global SHAP summary, precomputed offline over the training data (explain.py)
+    st.subheader("SHAP Summary Plot")
+    with span('load'):
+        summary = global_summary('xgb')
+    if summary is not None:
+        with span('figure'):
+            fig_summary, ax_summary = plt.subplots()
+            ax_summary.barh(summary.index, summary.values, color='#1E88E5')
+            ax_summary.set_xlabel("mean(|SHAP value|) (average impact on model output)")
+            st.pyplot(fig_summary)
+    else:
+        st.info("The global SHAP summary has not been built yet. Run `python explain.py` to create it.")
+
+end_rerun()
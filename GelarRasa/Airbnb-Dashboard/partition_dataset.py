@@ -0,0 +1,151 @@
+import argparse
+import os
+import shutil
+import time
+from urllib.parse import unquote
+
+import pyarrow.dataset as ds
+
+from data_access import PARTITIONED_DIR, PARTITION_COLUMNS, PARTITIONING, dataset_path, partitioned_dir, publish_version
+
+# Row group kecil agar filter pada kolom lain (mis. tanggal) bisa melewati row group
+ROW_GROUP_SIZE = 64_000
+
+
+def _version():
+    # Setiap penulisan menjadi versi baru; nama berurutan menurut waktu
+    return f'{time.time_ns():x}'
+
+
+def _write(data, dest, name='part'):
+    ds.write_dataset(
+        data,
+        dest,
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template=name + '-{i}.parquet',
+        min_rows_per_group=ROW_GROUP_SIZE // 2,
+        max_rows_per_group=ROW_GROUP_SIZE,
+        file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'),
+        existing_data_behavior='overwrite_or_ignore',
+    )
+
+
+def _link_tree(source, target, skip=None):
+    # Hard link: partisi yang tidak berubah masuk ke versi baru tanpa disalin.
+    # File berawalan ``skip`` akan ditulis ulang, jadi tidak ikut di-link (file ter-link tidak boleh ditimpa)
+    for root, _, files in os.walk(source):
+        directory = os.path.join(target, os.path.relpath(root, source))
+        os.makedirs(directory, exist_ok=True)
+        for file in files:
+            if skip and file.startswith(skip):
+                continue
+            try:
+                os.link(os.path.join(root, file), os.path.join(directory, file))
+            except OSError:
+                shutil.copy2(os.path.join(root, file), os.path.join(directory, file))
+
+
+def _district_dirs(dest):
+    # {district: [path folder city=.../district=...]}; nama folder hive di-encode ala URI
+    dirs = {}
+    if not os.path.isdir(dest):
+        return dirs
+    for city_dir in os.listdir(dest):
+        city_path = os.path.join(dest, city_dir)
+        if not os.path.isdir(city_path):
+            continue
+        for district_dir in os.listdir(city_path):
+            district = unquote(district_dir.split('=', 1)[-1])
+            dirs.setdefault(district, []).append(os.path.join(city_path, district_dir))
+    return dirs
+
+
+def _check_source(source, dest):
+    # refresh.py hanya memperbarui dataset berpartisi ini; sumber yang lebih tua dari refresh terakhir ditolak
+    if dest == PARTITIONED_DIR:
+        from refresh import check_source
+        check_source(source)
+
+
+def write_partitioned(source=None, dest=PARTITIONED_DIR):
+    """Rewrite the merged dataset as a hive-partitioned dataset (city/district).
+
+    The dataset is written as a new version under ``dest`` and published
+    with ``publish_version``; returns the directory of that version.
+    Raises ValueError if ``source`` predates the last refresh.py run.
+    """
+    source = source or dataset_path('all')
+    _check_source(source, dest)
+    # Dataset dibaca per batch (streaming), jadi memori tidak bergantung pada ukuran file
+    dataset = ds.dataset(source, format='parquet')
+
+    missing = [name for name in PARTITION_COLUMNS if name not in dataset.schema.names]
+    if missing:
+        raise ValueError(f"{source} is missing partition column(s): {', '.join(missing)}")
+
+    # Versi baru ditulis di folder sendiri lalu manifest ditukar, jadi pembaca tidak pernah melihat dataset setengah jadi
+    version = _version()
+    publish_version(dest, version, lambda directory: _write(dataset, directory), {'version': version})
+    return os.path.join(dest, version)
+
+
+def write_rows(rows, replace=(), name=None, dest=PARTITIONED_DIR):
+    """Publish a new version of the dataset with ``rows`` written into it.
+
+    The partitions of the ``replace`` districts are replaced by the rows of
+    ``rows`` in those districts; a district without rows loses its
+    partition. Rows of the other districts are added next to the files of
+    their partition as ``<name>-<i>.parquet``. Everything else is
+    hard-linked from the current version, so only ``rows`` are written.
+    Writing the same ``name`` again replaces those files instead of adding
+    the rows twice. Returns the directory of the new version.
+    """
+    current = partitioned_dir(dest)
+    replace = set(replace)
+    version = _version()
+    name = name or f'part-{version}'
+
+    def write(directory):
+        if current is not None:
+            for district, paths in _district_dirs(current).items():
+                if district not in replace:
+                    for path in paths:
+                        _link_tree(path, os.path.join(directory, os.path.relpath(path, current)), skip=f'{name}-')
+        _write(rows, directory, name)
+
+    publish_version(dest, version, write, {'version': version})
+    return os.path.join(dest, version)
+
+
+def write_districts(districts, source=None, dest=PARTITIONED_DIR):
+    """Rewrite only the partitions of ``districts`` from ``source`` as a new version of the dataset.
+
+    Only ``districts`` are read and written (see write_rows). Districts that
+    no longer have rows in ``source`` lose their partition. Returns the
+    directory of the new version.
+    """
+    source = source or dataset_path('all')
+    if partitioned_dir(dest) is None:
+        return write_partitioned(source, dest)
+    _check_source(source, dest)
+    districts = sorted(set(districts))
+    dataset = ds.dataset(source, format='parquet')
+    return write_rows(dataset.scanner(filter=ds.field('district').isin(districts)), districts, dest=dest)
+
+
+def district_files(dest=PARTITIONED_DIR):
+    """Number of Parquet files per district in the current version of the dataset."""
+    current = partitioned_dir(dest)
+    if current is None:
+        return {}
+    return {district: sum(len(files) for path in paths for _, _, files in os.walk(path))
+            for district, paths in _district_dirs(current).items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Partition all.parquet by city and district.")
+    parser.add_argument('--source', default=None, help="merged Parquet file (default: all.parquet)")
+    parser.add_argument('--dest', default=PARTITIONED_DIR, help="output dataset directory")
+    args = parser.parse_args()
+    print(f"Partitioned dataset written to {write_partitioned(args.source, args.dest)}")
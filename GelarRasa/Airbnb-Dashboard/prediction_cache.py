@@ -0,0 +1,170 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_access import load_district
+from explain import contributions
+from model_registry import MODEL_FEATURES, get_model, model_info
+from tree_predictor import get_predictor
+
+# Input halaman prediksi terbatas (mis. accommodates 0-10, minimum nights 0-30),
+# jadi kombinasi yang sama sering berulang antar sesi
+CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 50_000))
+# Jumlah kombinasi input paling umum yang di-score saat startup (0 = tidak ada)
+PRECOMPUTE_TOP_K = int(os.environ.get('PREDICTION_CACHE_PRECOMPUTE', 0))
+INTEGER_FEATURES = [name for name in MODEL_FEATURES if name != 'host_response_rate']
+# Prediktor terkompilasi unggul untuk beberapa baris saja; batch besar (precompute) lebih cepat
+# lewat predict() model (titik impas sekitar 128 baris)
+COMPILED_MAX_ROWS = 64
+
+
+class PredictionCache:
+    """Thread-safe LRU cache shared by every session in the process."""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, fields=()):
+        """Entry of ``key``, or None; a hit only when the entry holds all ``fields``.
+
+        An entry lacking some of ``fields`` (e.g. a price cached without SHAP
+        values) is still returned so the caller can complete it, but counts
+        as a miss since the caller computes again.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if all(field in entry for field in fields):
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+cache = PredictionCache()
+
+
+def normalize(features):
+    """Feature tuple in model order: integers for count/score inputs, 2 decimals for the rate."""
+    return tuple(
+        int(features[name]) if name in INTEGER_FEATURES else round(float(features[name]), 2)
+        for name in MODEL_FEATURES
+    )
+
+
+def _frame(keys):
+    return pd.DataFrame(np.array(keys, dtype=np.float64).reshape(-1, len(MODEL_FEATURES)), columns=MODEL_FEATURES)
+
+
+def _predict_prices(keys, name, version):
+    # Prediktor pohon terkompilasi jika model mendukung; selain itu predict() model aslinya
+    predictor = get_predictor(name, version) if len(keys) <= COMPILED_MAX_ROWS else None
+    if predictor is None:
+        return [float(price) for price in get_model(name, version).predict(_frame(keys))]
+    if len(keys) == 1:
+        return [predictor.predict_row(keys[0])]
+    return [float(price) for price in predictor.predict(np.array(keys, dtype=np.float64))]
+
+
+def predict(features, name='xgb', explain=False):
+    """Predicted price (and SHAP values when ``explain``) for one input, memoized.
+
+    ``features`` is a dict (or one-row DataFrame) with the nine model
+    features. Returns a dict with ``price`` and, when requested,
+    ``shap_values`` (1-D array) and ``base_value``.
+    """
+    if isinstance(features, pd.DataFrame):
+        features = features.iloc[0].to_dict()
+    key = (name, model_info(name)['version'], normalize(features))
+
+    entry = cache.get(key, ('shap_values',) if explain else ())
+    if entry is not None and (not explain or 'shap_values' in entry):
+        return entry
+
+    entry = dict(entry or {})
+    if 'price' not in entry:
+        entry['price'] = _predict_prices([key[2]], name, key[1])[0]
+    if explain:
+        values, base_value = contributions(_frame([key[2]]), name, key[1])
+        entry['shap_values'] = values[0]
+        entry['base_value'] = base_value
+    cache.put(key, entry)
+    return entry
+
+
+def precompute(rows, name='xgb', explain=True):
+    """Score ``rows`` (DataFrame of model features) in one batch and insert them into the cache."""
+    version = model_info(name)['version']
+    keys = list(dict.fromkeys(normalize(row) for row in rows[MODEL_FEATURES].to_dict('records')))
+    prices = _predict_prices(keys, name, version)
+    values, base_value = contributions(_frame(keys), name, version) if explain else (None, None)
+    for i, key in enumerate(keys):
+        entry = {'price': prices[i]}
+        if explain:
+            entry['shap_values'] = values[i]
+            entry['base_value'] = base_value
+        cache.put((name, version, key), entry)
+    return len(keys)
+
+
+def common_inputs(data, top_k=10_000):
+    """The ``top_k`` most frequent normalized feature combinations in ``data``."""
+    data = data[MODEL_FEATURES].dropna()
+    normalized = data.assign(host_response_rate=data['host_response_rate'].round(2))
+    counts = normalized.astype({name: 'int64' for name in INTEGER_FEATURES}).value_counts()
+    return counts.head(top_k).index.to_frame(index=False)
+
+
+_warm_started = threading.Event()
+
+
+def warm_in_background(top_k=PRECOMPUTE_TOP_K, name='xgb'):
+    """Precompute the most common input region in a background thread, once per process."""
+    if top_k <= 0 or _warm_started.is_set():
+        return
+    _warm_started.set()
+
+    def run():
+        try:
+            precompute(common_inputs(load_district(None, MODEL_FEATURES), top_k), name)
+        except (OSError, KeyError):
+            # Data gabungan belum tersedia; cache tetap terisi seiring pemakaian
+            pass
+
+    threading.Thread(target=run, name='prediction-cache-warm', daemon=True).start()
@@ -1,11 +1,10 @@
 # Import library yang diperlukan
 import streamlit as st
 import pandas as pd
-import pickle
+from prediction_cache import predict
+from instrumentation import begin_rerun, end_rerun, span
 
-# Muat model yang telah disimpan
-with open(r"C:\Users\Aisya\Downloads\GelarRasa\Airbnb-Dashboard\airbnb_price_predictor_ensemble.sav", 'rb') as model_file:
-    model = pickle.load(model_file)
+begin_rerun('price')
 
 # Judul aplikasi
 st.title("Airbnb Price Prediction")
@@ -38,5 +37,9 @@ input_data = pd.DataFrame({
 # Tombol untuk prediksi
 if st.button("Predict Price"):
     # Prediksi harga menggunakan model yang telah dilatih
-    price_prediction = model.predict(input_data)
-    st.write(f"Predicted Price: ${price_prediction[0]:,.2f}")
+    # (hasil di-memoize lintas sesi lewat prediction_cache)
+    with span('inference'):
+        price_prediction = predict(input_data, 'ensemble')['price']
+    st.write(f"Predicted Price: ${price_prediction:,.2f}")
+
+end_rerun()
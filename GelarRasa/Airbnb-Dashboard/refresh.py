@@ -0,0 +1,371 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import aggregates
+from data_access import DATA_DIR, PARTITIONING, dataset_path, partitioned_dir, segment_dir
+from etl import (HOST_FIELDS, LISTING_FIELDS, MERGED_SCHEMA, REVIEW_FIELDS, add_date_fields, conform,
+                 listing_dimension, read_batches, read_table)
+from ingest import ingest_file
+from schema import compact, compact_table
+
+# Watermark refresh terakhir: review_id terbesar yang sudah masuk ke data gabungan.
+# review_id dari scrape baru selalu lebih besar, jadi review <= watermark dilewati
+STATE_FILE = os.path.join(DATA_DIR, 'refresh_state.json')
+# Refresh yang sedang berjalan: dicatat sebelum data apa pun ditulis ulang, dan dilanjutkan
+# oleh refresh berikutnya jika proses berhenti di tengah jalan
+JOURNAL_FILE = os.path.join(DATA_DIR, 'refresh_journal.json')
+BATCH_FILE = os.path.join(DATA_DIR, 'refresh_batch.parquet')
+# Distrik dengan file partisi lebih banyak dari ini ditulis ulang utuh (file tambahan kecil digabung)
+MAX_DISTRICT_FILES = int(os.environ.get('REFRESH_MAX_DISTRICT_FILES', 32))
+STEPS = ['upsert', 'partitions', 'reviews', 'aggregates', 'tiles']
+
+
+def _load_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_json(data, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_state():
+    return _load_json(STATE_FILE) or {}
+
+
+def _save_state(watermark, listings_changed=False):
+    state = load_state()
+    state.update({
+        'review_watermark': watermark,
+        'updated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    })
+    if listings_changed:
+        # Waktu upsert listing/host terakhir: data gabungan yang lebih tua belum memuat perubahannya
+        state['listings_updated_at'] = state['updated_at']
+    _save_json(state, STATE_FILE)
+
+
+def _max_review_id(path):
+    review_ids = ds.dataset(path, format='parquet').to_table(columns=['review_id']).column('review_id')
+    return pc.max(review_ids).as_py() or 0
+
+
+def _watermark(state):
+    if 'review_watermark' in state:
+        return state['review_watermark']
+    # Belum pernah refresh: watermark awal = review_id terbesar di data gabungan
+    review_ids = ds.dataset(partitioned_dir(), format='parquet', partitioning=PARTITIONING).to_table(
+        columns=['review_id']).column('review_id')
+    return pc.max(review_ids).as_py() or 0
+
+
+def check_source(source):
+    """Raise ValueError if the merged file ``source`` misses data that refreshes added.
+
+    Refreshes update the partitioned dataset, not all.parquet, so
+    partitioning ``source`` again would drop every refreshed review and
+    listing change unless it holds the reviews up to the watermark and was
+    written after the last listing/host upsert (rebuild it with ``etl.py``).
+    """
+    state = load_state()
+    missing = []
+    if 'review_watermark' in state and _max_review_id(source) < state['review_watermark']:
+        missing.append(f"the reviews up to review_id {state['review_watermark']}")
+    if 'listings_updated_at' in state and datetime.fromtimestamp(
+            os.path.getmtime(source), timezone.utc) < datetime.fromisoformat(state['listings_updated_at']):
+        missing.append(f"the listing/host changes of {state['listings_updated_at']}")
+    if missing:
+        raise ValueError(f"{source} predates the last refresh: it misses {' and '.join(missing)}. "
+                         f"Rebuild it with etl.py first; the partitioned dataset already holds this data")
+
+
+def _write_parquet(table, path):
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+def _fit(table, schema):
+    # Samakan kolom dan tipe dengan file tujuan; kolom yang tidak ada di sumber diisi null
+    columns = [table.column(field.name).cast(field.type) if field.name in table.column_names
+               else pa.nulls(table.num_rows, field.type) for field in schema]
+    return pa.table(columns, schema=schema)
+
+
+def changed_keys(name, dump_path, fields, key):
+    """Keys of the rows of ``dump_path`` that are new or differ from dataset ``name``."""
+    current = pq.read_table(dataset_path(name))
+    # Hash per baris (dalam tipe ringkas, jadi 't' dan True dianggap sama) sudah mencakup
+    # kolom kunci: hash yang belum dikenal = baris baru atau berubah
+    current_hashes = pd.util.hash_pandas_object(
+        compact_table(conform(current, fields)).to_pandas(), index=False).to_numpy()
+    dump_frame = compact_table(conform(read_table(dump_path), fields)).to_pandas()
+    dump_hashes = pd.util.hash_pandas_object(dump_frame, index=False).to_numpy()
+    return dump_frame[key][~np.isin(dump_hashes, current_hashes)].to_numpy()
+
+
+def upsert(name, dump_path, fields, key, keys):
+    """Replace the rows ``keys`` of dataset ``name`` by those of ``dump_path``.
+
+    Writing the same keys again gives the same file, so a resumed refresh
+    can repeat it.
+    """
+    if not len(keys):
+        return
+    path = dataset_path(name)
+    current = pq.read_table(path)
+    dump = compact_table(conform(read_table(dump_path), fields))
+    keys = pa.array(keys, current.schema.field(key).type)
+    kept = current.filter(pc.invert(pc.is_in(current.column(key), keys)))
+    _write_parquet(pa.concat_tables([kept, _fit(dump.filter(pc.is_in(dump.column(key), keys)), current.schema)]), path)
+
+
+def new_reviews(dump_path, watermark):
+    """Reviews of ``dump_path`` above the watermark, as one typed Arrow table."""
+    batches = []
+    for batch in read_batches(dump_path):
+        reviews = conform(pa.Table.from_batches([batch]), REVIEW_FIELDS)
+        batches.append(reviews.filter(pc.greater(reviews.column('review_id'), watermark)))
+    return add_date_fields(pa.concat_tables(batches)) if batches else None
+
+
+def _cells(table):
+    # Pasangan (district, year_month) yang tersentuh oleh baris-baris ``table``
+    pairs = table.select(['district', 'year_month']).group_by(['district', 'year_month']).aggregate([])
+    return {(district, year_month) for district, year_month in
+            zip(pairs.column('district').to_pylist(), pairs.column('year_month').to_pylist())
+            if district is not None and year_month is not None}
+
+
+def _listing_districts(listing_ids):
+    listings = pq.read_table(dataset_path('listings'), columns=['listing_id', 'district'])
+    listings = listings.filter(pc.is_in(listings.column('listing_id'), pa.array(listing_ids, pa.int64())))
+    return {str(district) for district in listings.column('district').to_pylist() if district is not None}
+
+
+def _join(reviews, dimension):
+    # Review digabung dengan data listing/host terbaru, dalam skema data gabungan
+    merged = add_date_fields(reviews).join(dimension, keys='listing_id', join_type='inner')
+    return _fit(compact_table(merged), MERGED_SCHEMA)
+
+
+def _batch():
+    return pq.read_table(BATCH_FILE) if os.path.exists(BATCH_FILE) else None
+
+
+def prepare(reviews_path=None, listings_path=None, hosts_path=None):
+    """Work out what a new scrape changes and record it in the journal, before anything is rewritten.
+
+    The new reviews (above the watermark) are staged in BATCH_FILE; the
+    journal holds the changed listing and host keys, the districts of the
+    changed listings before the upsert and the watermark after this
+    refresh. Returns the journal, or None when the scrape changes nothing.
+    """
+    watermark = _watermark(load_state())
+    reviews = new_reviews(reviews_path, watermark) if reviews_path else None
+    if reviews is not None and reviews.num_rows == 0:
+        reviews = None
+
+    listing_keys = changed_keys('listings', listings_path, LISTING_FIELDS, 'listing_id') if listings_path else []
+    host_keys = changed_keys('hosts', hosts_path, HOST_FIELDS, 'host_id') if hosts_path else []
+    changed_listings = set(np.asarray(listing_keys).tolist())
+    if len(host_keys):
+        # Listing milik host yang berubah juga harus digabung ulang
+        listings = pq.read_table(dataset_path('listings'), columns=['listing_id', 'host_id'])
+        hosted = listings.filter(pc.is_in(listings.column('host_id'), pa.array(host_keys, pa.int64())))
+        changed_listings |= set(hosted.column('listing_id').to_pylist())
+    if reviews is None and not changed_listings:
+        return None
+
+    if reviews is not None:
+        _write_parquet(reviews, BATCH_FILE)
+        watermark = max(watermark, pc.max(reviews.column('review_id')).as_py())
+    elif os.path.exists(BATCH_FILE):
+        os.remove(BATCH_FILE)
+    journal = {
+        'id': f'{time.time_ns():x}',
+        'reviews': reviews.num_rows if reviews is not None else 0,
+        'listings': listings_path,
+        'hosts': hosts_path,
+        'listing_keys': np.asarray(listing_keys).tolist(),
+        'host_keys': np.asarray(host_keys).tolist(),
+        'changed_listings': sorted(changed_listings),
+        'old_districts': sorted(_listing_districts(sorted(changed_listings))),
+        'watermark': watermark,
+        'done': [],
+    }
+    _save_json(journal, JOURNAL_FILE)
+    return journal
+
+
+def _rewrite_partitions(journal):
+    # Partisi distrik listing yang berubah (dan distrik dengan terlalu banyak file) ditulis ulang utuh;
+    # review baru distrik lain ditambahkan sebagai file baru. Sel yang terdampak dicatat di journal
+    # sebelum versi baru dipublikasikan, karena baris lama setelah itu sudah tidak ada
+    from partition_dataset import district_files, write_rows
+
+    batch = _batch()
+    changed = pa.array(journal['changed_listings'], pa.int64())
+    if 'rewrite' not in journal:
+        journal['rewrite'] = sorted(
+            set(journal['old_districts']) | _listing_districts(journal['changed_listings'])
+            | {district for district, files in district_files().items() if files > MAX_DISTRICT_FILES})
+    dimension = listing_dimension(dataset_path('listings'), dataset_path('hosts'))
+
+    pending = [] if batch is None else [conform(batch, REVIEW_FIELDS)]
+    kept = []
+    affected = set()
+    if journal['rewrite']:
+        current = ds.dataset(partitioned_dir(), format='parquet', partitioning=PARTITIONING).to_table(
+            filter=ds.field('district').isin(journal['rewrite']))
+        if batch is not None:
+            # Review batch ini yang sudah tertulis oleh percobaan sebelumnya tidak dihitung dua kali
+            current = current.filter(pc.invert(pc.is_in(current.column('review_id'), batch.column('review_id'))))
+        stale = pc.is_in(current.column('listing_id'), changed)
+        affected |= _cells(current.filter(stale))
+        pending.append(conform(current.filter(stale), REVIEW_FIELDS))
+        kept.append(_fit(current.filter(pc.invert(stale)), MERGED_SCHEMA))
+    merged = _join(pa.concat_tables(pending), dimension) if pending else None
+    if merged is not None:
+        affected |= _cells(merged)
+        kept.append(merged)
+
+    journal['affected'] = sorted([district, year_month] for district, year_month in affected)
+    _save_json(journal, JOURNAL_FILE)
+    write_rows(pa.concat_tables(kept) if kept else MERGED_SCHEMA.empty_table(), journal['rewrite'],
+               name=f"refresh-{journal['id']}")
+
+
+def _append_segment():
+    # reviews.parquet opsional (data gabungan sudah memuat kolom review); review baru menjadi
+    # file segmen tersendiri, nama file tetap per batch sehingga mengulang langkah ini menimpanya
+    path = dataset_path('reviews')
+    batch = _batch()
+    if batch is None or not os.path.exists(path):
+        return
+    ingest_file(path)
+    directory = segment_dir('reviews')
+    os.makedirs(directory, exist_ok=True)
+    ids = batch.column('review_id')
+    name = f'{pc.min(ids).as_py():020d}-{pc.max(ids).as_py():020d}.parquet'
+    _write_parquet(_fit(batch, pq.read_schema(path)), os.path.join(directory, name))
+
+
+def _update_aggregates(journal):
+    batch = _batch()
+    added = None
+    if batch is not None:
+        added = compact(_join(conform(batch, REVIEW_FIELDS), listing_dimension(dataset_path('listings'), dataset_path('hosts'))).to_pandas())
+    aggregates.update_tables({(district, year_month) for district, year_month in journal['affected']}, added)
+
+
+def _rebuild_tiles(journal):
+    # Pyramid tile peta (jika sudah pernah dibuat) digambar ulang dari listings.parquet yang baru
+    from tiles import TILES_DIR, build_pyramid
+    if journal['changed_listings'] and os.path.isdir(TILES_DIR):
+        build_pyramid()
+
+
+def apply(journal):
+    """Carry out the refresh recorded in ``journal``, skipping the steps it marks as done.
+
+    Every step can be repeated after a crash without counting reviews twice:
+    the upsert writes the recorded keys, the partitions and the review
+    segment are written under names fixed by the journal, and
+    listing_totals skips reviews it already counted. The watermark is saved
+    and the journal removed only after the last step.
+    """
+    steps = {
+        'upsert': lambda: (upsert('listings', journal['listings'], LISTING_FIELDS, 'listing_id', journal['listing_keys']),
+                           upsert('hosts', journal['hosts'], HOST_FIELDS, 'host_id', journal['host_keys'])),
+        'partitions': lambda: _rewrite_partitions(journal),
+        'reviews': _append_segment,
+        'aggregates': lambda: _update_aggregates(journal),
+        'tiles': lambda: _rebuild_tiles(journal),
+    }
+    for step in STEPS:
+        if step not in journal['done']:
+            steps[step]()
+            journal['done'].append(step)
+            _save_json(journal, JOURNAL_FILE)
+    _save_state(journal['watermark'], bool(journal['changed_listings']))
+    if os.path.exists(BATCH_FILE):
+        os.remove(BATCH_FILE)
+    os.remove(JOURNAL_FILE)
+
+
+def refresh(reviews_path=None, listings_path=None, hosts_path=None):
+    """Incrementally apply a new scrape: append new reviews, upsert listings and hosts.
+
+    The district-partitioned dataset is the merged data that gets updated
+    (it is built from all.parquet on the first refresh): only the partitions
+    of districts with changed listings are rewritten, and new reviews of the
+    other districts are added as new files. all.parquet and reviews.parquet
+    are not rewritten; new reviews are added to reviews.parquet as segment
+    files (data_access.segment_dir) that ``etl.py`` reads along with it, so
+    rebuild all.parquet with ``etl.py`` before partitioning it again
+    (partition_dataset.py refuses a source older than the last refresh,
+    see check_source). Without reviews.parquet the new reviews are kept in
+    the partitioned dataset only.
+    Aggregates are updated from the affected district-months only.
+
+    A refresh interrupted by a crash is finished first (see apply). Running
+    it again with the same dumps is a no-op. Returns a summary dict.
+    """
+    started = time.perf_counter()
+    # Data lama yang belum di-ingest (tanggal string, skema lama) dikonversi dulu
+    for name in ('listings', 'hosts'):
+        ingest_file(dataset_path(name))
+    if partitioned_dir() is None:
+        from partition_dataset import write_partitioned
+        ingest_file(dataset_path('all'))
+        write_partitioned()
+
+    resumed = _load_json(JOURNAL_FILE)
+    if resumed is not None:
+        apply(resumed)
+    journal = prepare(reviews_path, listings_path, hosts_path)
+    if journal is not None:
+        apply(journal)
+    else:
+        _save_state(_watermark(load_state()))
+    journal = journal or {}
+    return {
+        'resumed': resumed is not None,
+        'new_reviews': journal.get('reviews', 0),
+        'changed_listings': len(journal.get('changed_listings', [])),
+        'changed_hosts': len(journal.get('host_keys', [])),
+        'affected_cells': len(journal.get('affected', [])),
+        'watermark': load_state()['review_watermark'],
+        'seconds': time.perf_counter() - started,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Incrementally apply a new reviews/listings/hosts dump.")
+    parser.add_argument('--reviews', default=None, help="new reviews dump (Parquet/CSV)")
+    parser.add_argument('--listings', default=None, help="new listings dump (Parquet/CSV)")
+    parser.add_argument('--hosts', default=None, help="new hosts dump (Parquet/CSV)")
+    args = parser.parse_args()
+
+    summary = refresh(args.reviews, args.listings, args.hosts)
+    if summary['resumed']:
+        print("Finished the interrupted previous refresh first")
+    print(f"{summary['new_reviews']:,} new reviews, {summary['changed_listings']:,} changed listings, "
+          f"{summary['changed_hosts']:,} changed hosts, {summary['affected_cells']:,} district-months updated "
+          f"in {summary['seconds']:.1f}s (watermark {summary['watermark']})")
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Skema ringkas yang dipakai sejak ingest sampai data dimuat halaman:
+# string berulang -> dictionary/categorical, 't'/'f' -> boolean, angka -> lebar sekecil yang masih aman
+DICTIONARY = pa.dictionary(pa.int32(), pa.string())
+
+COMPACT_TYPES = {
+    # id listing Inside Airbnb sekarang sampai 18 digit: id tetap int64 (int32 akan terpotong diam-diam)
+    'review_id': pa.int64(),
+    'listing_id': pa.int64(),
+    'host_id': pa.int64(),
+    'city': DICTIONARY,
+    'district': DICTIONARY,
+    'neighbourhood': DICTIONARY,
+    'room_type': DICTIONARY,
+    'property_type': DICTIONARY,
+    'host_location': DICTIONARY,
+    'host_response_time': DICTIONARY,
+    'instant_bookable': pa.bool_(),
+    'host_is_superhost': pa.bool_(),
+    'host_has_profile_pic': pa.bool_(),
+    'host_identity_verified': pa.bool_(),
+    'accommodates': pa.int8(),
+    'bedrooms': pa.int8(),
+    'price': pa.int32(),
+    # Inside Airbnb mengizinkan minimum 1125 malam dan maximum s.d. 2^31 - 1
+    'minimum_nights': pa.int16(),
+    'maximum_nights': pa.int32(),
+    'host_total_listings_count': pa.int16(),
+    'host_response_rate': pa.float32(),
+    'host_acceptance_rate': pa.float32(),
+    'review_scores_rating': pa.float32(),
+    'review_scores_accuracy': pa.float32(),
+    'review_scores_cleanliness': pa.float32(),
+    'review_scores_checkin': pa.float32(),
+    'review_scores_communication': pa.float32(),
+    'review_scores_location': pa.float32(),
+    'review_scores_value': pa.float32(),
+    'year': pa.int16(),
+    'month': pa.int8(),
+    'year_month': pa.int32(),
+}
+CATEGORY_COLUMNS = [name for name, dtype in COMPACT_TYPES.items() if dtype == DICTIONARY]
+BOOLEAN_COLUMNS = [name for name, dtype in COMPACT_TYPES.items() if dtype == pa.bool_()]
+# Nilai 't'/'f' dari dump Inside Airbnb
+TRUE_VALUES = ('t', 'true', 'True', '1')
+
+
+def compact_array(values, dtype):
+    """Cast an Arrow array to its compact type; 't'/'f' strings become booleans."""
+    if pa.types.is_boolean(dtype) and (pa.types.is_string(values.type) or pa.types.is_large_string(values.type)):
+        flags = pc.is_in(values, pa.array(TRUE_VALUES))
+        return pc.if_else(pc.is_null(values), pa.scalar(None, pa.bool_()), flags)
+    if pa.types.is_dictionary(values.type) and pa.types.is_dictionary(dtype):
+        # Indeks/value dictionary bisa berbeda (mis. int8/large_string dari pandas)
+        values = values.cast(values.type.value_type)
+    return values.cast(dtype)
+
+
+def compact_table(table):
+    """Arrow table with every known column cast to COMPACT_TYPES (other columns unchanged)."""
+    changed = False
+    for i, name in enumerate(table.column_names):
+        dtype = COMPACT_TYPES.get(name)
+        if dtype is not None and table.schema.field(i).type != dtype:
+            table = table.set_column(i, pa.field(name, dtype), compact_array(table.column(i), dtype))
+            changed = True
+    if changed and table.schema.metadata and b'pandas' in table.schema.metadata:
+        # Metadata pandas lama akan mengembalikan tipe lama saat to_pandas()
+        metadata = {key: value for key, value in table.schema.metadata.items() if key != b'pandas'}
+        table = table.replace_schema_metadata(metadata or None)
+    return table
+
+
+def is_compact(schema):
+    return all(schema.field(name).type == dtype for name, dtype in COMPACT_TYPES.items() if name in schema.names)
+
+
+def _pandas_dtype(dtype, has_nulls):
+    if dtype == DICTIONARY:
+        return 'category'
+    if pa.types.is_boolean(dtype):
+        return 'boolean' if has_nulls else 'bool'
+    numpy_dtype = np.dtype(dtype.to_pandas_dtype())
+    if has_nulls and numpy_dtype.kind in 'iu':
+        # Integer dengan nilai kosong memakai tipe nullable pandas (Int8, Int16, ...)
+        return numpy_dtype.name.capitalize()
+    return numpy_dtype
+
+
+def compact(df):
+    """Return ``df`` with the compact pandas dtypes; already-compact columns are left alone.
+
+    Also converts frames read from files written before the compact schema
+    (object strings, 't'/'f' flags, int64/float64 counts).
+    """
+    changes = {}
+    for name in df.columns:
+        dtype = COMPACT_TYPES.get(name)
+        if dtype is None:
+            continue
+        column = df[name]
+        if name in BOOLEAN_COLUMNS and not pd.api.types.is_bool_dtype(column):
+            flags = column.isin(TRUE_VALUES) | column.isin([True])
+            changes[name] = flags.astype('boolean').mask(column.isna()) if column.hasnans else flags
+            continue
+        target = _pandas_dtype(dtype, column.hasnans)
+        if str(column.dtype) != str(target) and not (target == 'category' and isinstance(column.dtype, pd.CategoricalDtype)):
+            changes[name] = column.astype(target)
+    return df.assign(**changes) if changes else df
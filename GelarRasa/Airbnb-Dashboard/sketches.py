@@ -0,0 +1,171 @@
+import os
+
+import numpy as np
+
+# Akurasi relatif sketsa kuantil: setiap kuantil yang dilaporkan berada dalam +-ACCURACY (relatif)
+# dari nilai eksak. 0.005 = 0.5%, mis. median harga $63 -> $62.69..$63.32
+ACCURACY = float(os.environ.get('SKETCH_ACCURACY', 0.005))
+GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+_LOG_GAMMA = np.log(GAMMA)
+# Nilai <= 0 (mis. harga 0) masuk satu bucket khusus yang mewakili 0
+ZERO_KEY = np.iinfo(np.int16).min
+
+
+def bucket_keys(values):
+    """Bucket of each value: ``k`` covers ``(GAMMA**(k-1), GAMMA**k]``; NaN must be dropped first."""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        keys = np.ceil(np.log(values) / _LOG_GAMMA)
+    return np.where(values > 0, keys, ZERO_KEY).astype(np.int16)
+
+
+def bucket_values(keys):
+    """Representative value of each bucket, within ACCURACY of every value in it."""
+    keys = np.asarray(keys, dtype=np.float64)
+    return np.where(keys == ZERO_KEY, 0.0, 2 * GAMMA ** keys / (GAMMA + 1))
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with a relative error bound (DDSketch-style log buckets).
+
+    Values are counted per logarithmic bucket, so two sketches merge by
+    adding their counts and the result equals the sketch of the combined
+    values. ``quantile`` interpolates between order statistics like pandas;
+    for non-negative data it is within ``ACCURACY`` (relative) of the exact
+    ``Series.quantile``, independent of the number of values. Size grows
+    only with the value range: about ``log(max/min) / log(GAMMA)`` buckets.
+    """
+
+    def __init__(self, keys=(), counts=()):
+        # keys terurut dan unik
+        self.keys = np.asarray(keys, dtype=np.int16)
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+    @classmethod
+    def from_values(cls, values):
+        values = np.asarray(values, dtype=np.float64)
+        keys, counts = np.unique(bucket_keys(values[~np.isnan(values)]), return_counts=True)
+        return cls(keys, counts)
+
+    @classmethod
+    def from_buckets(cls, keys, counts):
+        """Sketch from (possibly repeated, unsorted) bucket keys and counts, e.g. rows of several cells."""
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(keys):
+            return cls()
+        # Key int16 -> bincount langsung atas offset key (tanpa sort)
+        offset = keys.min()
+        totals = np.bincount(keys - offset, weights=counts).astype(np.int64)
+        present = np.flatnonzero(totals)
+        return cls(present + offset, totals[present])
+
+    def merge(self, *others):
+        sketches = (self,) + others
+        return QuantileSketch.from_buckets(np.concatenate([s.keys for s in sketches]),
+                                           np.concatenate([s.counts for s in sketches]))
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def quantile(self, q):
+        """Estimate of ``Series.quantile(q)``; ``q`` may be a scalar or an array. NaN when empty."""
+        q = np.asarray(q, dtype=np.float64)
+        if not self.count:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+        # Peringkat (0-based) yang diinterpolasi seperti pandas: q * (n - 1)
+        rank = q * (self.count - 1)
+        lower, upper = np.floor(rank), np.ceil(rank)
+        cumulative = np.cumsum(self.counts)
+        values = bucket_values(self.keys)
+        low = values[np.searchsorted(cumulative, lower, side='right')]
+        high = values[np.searchsorted(cumulative, upper, side='right')]
+        result = low + (high - low) * (rank - lower)
+        return result if q.ndim else float(result)
+
+
+# Presisi HyperLogLog (maks. 15): 2**HLL_PRECISION register, galat baku 1.04 / sqrt(2**HLL_PRECISION) (1.6% untuk 12)
+HLL_PRECISION = int(os.environ.get('SKETCH_HLL_PRECISION', 12))
+
+
+def hash64(values):
+    """SplitMix64 hash of integer ids; the same in every process and backend."""
+    z = np.asarray(values).astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    with np.errstate(over='ignore'):
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _bit_length(values):
+    length = np.zeros(len(values), dtype=np.int64)
+    values = values.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = values >= (np.uint64(1) << np.uint64(shift))
+        length[big] += shift
+        values[big] >>= np.uint64(shift)
+    return length + (values > 0)
+
+
+def hll_registers(values, precision=HLL_PRECISION):
+    """HyperLogLog (register, rank) of each id.
+
+    The register is the top ``precision`` bits of the hash; the rank is the
+    number of leading zeros in the remaining bits plus one.
+    """
+    hashed = hash64(values)
+    width = 64 - precision
+    register = (hashed >> np.uint64(width)).astype(np.int32)
+    rest = hashed & ((np.uint64(1) << np.uint64(width)) - np.uint64(1))
+    return register, (width + 1 - _bit_length(rest)).astype(np.int8)
+
+
+class DistinctSketch:
+    """HyperLogLog distinct counter; merging two sketches takes the per-register maximum.
+
+    The merge of the sketches of several sets is exactly the sketch of
+    their union, so counts over any union of cells never double-count an
+    id. ``count`` has a standard error of ``1.04 / sqrt(2**precision)``
+    (1.6% at the default precision 12, so about 99% of estimates are within
+    5%); below ``2.5 * 2**precision`` ids it switches to linear counting,
+    which is much more accurate.
+    """
+
+    def __init__(self, registers=None, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.int8) if registers is None else np.asarray(registers, np.int8)
+
+    @classmethod
+    def from_values(cls, values, precision=HLL_PRECISION):
+        return cls.from_registers(*hll_registers(np.unique(values), precision), precision=precision)
+
+    @classmethod
+    def from_registers(cls, register, rank, precision=HLL_PRECISION):
+        """Sketch from (possibly repeated) register/rank pairs, e.g. the rows of several cells."""
+        sketch = cls(precision=precision)
+        np.maximum.at(sketch.registers, np.asarray(register, dtype=np.int64), np.asarray(rank, dtype=np.int8))
+        return sketch
+
+    @classmethod
+    def from_bytes(cls, blobs, precision=HLL_PRECISION):
+        """Union of serialized sketches (``to_bytes()`` of each cell)."""
+        sketch = cls(precision=precision)
+        if len(blobs):
+            sketch.registers = np.frombuffer(b''.join(blobs), dtype=np.int8).reshape(-1, 1 << precision).max(axis=0)
+        return sketch
+
+    def to_bytes(self):
+        return self.registers.tobytes()
+
+    def merge(self, *others):
+        return DistinctSketch(np.maximum.reduce([self.registers] + [other.registers for other in others]),
+                              self.precision)
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
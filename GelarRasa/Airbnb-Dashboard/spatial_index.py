@@ -0,0 +1,113 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_access import dataset_fingerprint, load_listings
+
+# Ukuran sel grid default dalam derajat (~1 km di New York)
+CELL_SIZE = 0.01
+
+
+class GridIndex:
+    """Uniform lat/lon grid over a set of points.
+
+    Points are sorted by cell id so that each grid row is one contiguous id
+    range; a bounding-box query reads one slice per row it overlaps and then
+    filters the candidates exactly. Query cost depends on the visible area,
+    not on the total number of points.
+    """
+
+    def __init__(self, latitude, longitude, cell_size=CELL_SIZE):
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        valid = np.flatnonzero(~(np.isnan(latitude) | np.isnan(longitude)))
+
+        self.cell_size = cell_size
+        self.lat0 = latitude[valid].min() if len(valid) else 0.0
+        self.lon0 = longitude[valid].min() if len(valid) else 0.0
+        rows = self._row(latitude[valid])
+        cols = self._col(longitude[valid])
+        self.n_rows = int(rows.max()) + 1 if len(valid) else 1
+        self.n_cols = int(cols.max()) + 1 if len(valid) else 1
+
+        cell_ids = rows * self.n_cols + cols
+        order = np.argsort(cell_ids, kind='stable')
+        self.positions = valid[order]
+        self.latitude = latitude[self.positions]
+        self.longitude = longitude[self.positions]
+        # offsets[c]..offsets[c + 1] = titik di sel c
+        self.offsets = np.searchsorted(cell_ids[order], np.arange(self.n_rows * self.n_cols + 1))
+
+    def _row(self, latitude):
+        return np.floor((latitude - self.lat0) / self.cell_size).astype(np.int64)
+
+    def _col(self, longitude):
+        return np.floor((longitude - self.lon0) / self.cell_size).astype(np.int64)
+
+    def query(self, south, west, north, east):
+        """Return the original row positions of the points inside the box, sorted."""
+        if south > north or west > east:
+            return np.empty(0, dtype=np.int64)
+        row0, row1 = np.clip(self._row(np.array([south, north])), 0, self.n_rows - 1)
+        col0, col1 = np.clip(self._col(np.array([west, east])), 0, self.n_cols - 1)
+
+        candidates = np.concatenate([
+            np.arange(self.offsets[row * self.n_cols + col0], self.offsets[row * self.n_cols + col1 + 1])
+            for row in range(row0, row1 + 1)
+        ])
+        lat = self.latitude[candidates]
+        lon = self.longitude[candidates]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(self.positions[candidates[inside]])
+
+
+_index_cache = {}
+_index_lock = threading.Lock()
+
+
+def listing_index(cell_size=CELL_SIZE):
+    """GridIndex over listings.parquet, built once per dataset version.
+
+    Positions returned by ``query`` are row labels of ``load_listings()``.
+    """
+    fingerprint = dataset_fingerprint('listings')
+    with _index_lock:
+        entry = _index_cache.get(cell_size)
+        if entry is None or entry[0] != fingerprint:
+            coords = load_listings(['latitude', 'longitude'])
+            entry = (fingerprint, GridIndex(coords['latitude'], coords['longitude'], cell_size))
+            _index_cache[cell_size] = entry
+    return entry[1]
+
+
+def parse_bounds(bounds):
+    """Convert st_folium's ``bounds`` dict into (south, west, north, east)."""
+    if not bounds or not bounds.get('_southWest') or bounds['_southWest'].get('lat') is None:
+        return None
+    south_west, north_east = bounds['_southWest'], bounds['_northEast']
+    return south_west['lat'], south_west['lng'], north_east['lat'], north_east['lng']
+
+
+def visible_listings(data, bounds):
+    """Rows of ``data`` (a filtered ``load_listings()`` frame) inside ``bounds``."""
+    positions = listing_index().query(*bounds)
+    return data.loc[data.index.intersection(positions)]
+
+
+def cell_size_for_zoom(zoom):
+    # Satu tile web-mercator selebar 360 / 2^zoom derajat; dibagi 8 sel per tile
+    return 360.0 / (2 ** zoom) / 8
+
+
+def cell_aggregates(data, cell_size):
+    """Per grid cell: listing count, median price and the cell's mean position."""
+    if data.empty:
+        return pd.DataFrame(columns=['latitude', 'longitude', 'count', 'median_price'])
+    keys = [np.floor(data['latitude'].to_numpy() / cell_size), np.floor(data['longitude'].to_numpy() / cell_size)]
+    return data.groupby(keys).agg(
+        latitude=('latitude', 'mean'),
+        longitude=('longitude', 'mean'),
+        count=('price', 'size'),
+        median_price=('price', 'median'),
+    ).reset_index(drop=True)
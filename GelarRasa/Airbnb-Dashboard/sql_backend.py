@@ -0,0 +1,276 @@
+import os
+import threading
+
+import pandas as pd
+
+from aggregates import (ALL, ALL_MONTHS, BASELINE, BASELINE_END, DISTINCT_CELL, DISTINCT_COLUMNS, PRICE_GROUPS,
+                        REVIEW_CATEGORIES, SCORE_COLUMNS, SKETCH_CELL, SKETCH_METRICS, SOURCE_COLUMNS, distinct_rows)
+from data_access import dataset_path, partitioned_dir
+from schema import TRUE_VALUES
+from sketches import GAMMA, ZERO_KEY
+
+# 0 = DuckDB memakai semua core. Di atas MEMORY_LIMIT DuckDB menulis sementara ke disk (out-of-core)
+THREADS = int(os.environ.get('SQL_THREADS', 0))
+MEMORY_LIMIT = os.environ.get('SQL_MEMORY_LIMIT', '')
+
+_connection = None
+_lock = threading.Lock()
+
+
+def connection():
+    """Cursor on the process-wide in-memory DuckDB database (one cursor per caller/thread)."""
+    global _connection
+    import duckdb
+
+    with _lock:
+        if _connection is None:
+            _connection = duckdb.connect()
+            if THREADS:
+                _connection.execute(f"SET threads = {THREADS}")
+            if MEMORY_LIMIT:
+                _connection.execute(f"SET memory_limit = '{MEMORY_LIMIT}'")
+        return _connection.cursor()
+
+
+def _literal(path):
+    return "'" + path.replace('\\', '/').replace("'", "''") + "'"
+
+
+def source(path=None):
+    """FROM clause over a Parquet file or hive-partitioned directory.
+
+    Defaults to the merged data: the district partitions if built, else all.parquet.
+    """
+    if path is None:
+        path = partitioned_dir() or dataset_path('all')
+    if os.path.isdir(path):
+        # Partisi hive: filter district dipangkas di tingkat direktori
+        return f"read_parquet({_literal(os.path.join(path, '**', '*.parquet'))}, hive_partitioning = true)"
+    return f"read_parquet({_literal(path)})"
+
+
+def relation(path=None):
+    """Subquery with the aggregate source columns, normalized to what the pandas builders see.
+
+    Float NaN becomes NULL (DuckDB sorts NaN above every number instead of
+    skipping it), string dates and superhost flags from files not yet
+    converted by ingest.py are parsed, and year_month is derived if missing.
+    Only the columns a query uses are read from the Parquet files.
+    """
+    src = source(path)
+    types = dict(connection().execute(f"SELECT column_name, column_type FROM (DESCRIBE SELECT * FROM {src})").fetchall())
+    columns = {name: name for name in SOURCE_COLUMNS if name in types}
+    for name in columns:
+        if types[name] in ('FLOAT', 'DOUBLE'):
+            columns[name] = f"CASE WHEN isnan({name}) THEN NULL ELSE {name} END"
+    if types.get('review_date') == 'VARCHAR':
+        columns['review_date'] = "coalesce(try_strptime(review_date, '%d/%m/%Y'), try_strptime(review_date, '%Y-%m-%d'))"
+    if types.get('host_is_superhost') == 'VARCHAR':
+        flags = ', '.join(f"'{value}'" for value in TRUE_VALUES)
+        columns['host_is_superhost'] = f"CASE WHEN host_is_superhost IS NULL THEN NULL ELSE host_is_superhost IN ({flags}) END"
+    review_date = columns['review_date']
+    columns['year_month'] = 'year_month' if 'year_month' in types else f'year({review_date}) * 100 + month({review_date})'
+    columns['baseline'] = f"coalesce({review_date} <= TIMESTAMP '{BASELINE_END}', FALSE)"
+    return f"(SELECT {', '.join(f'{expr} AS {name}' for name, expr in columns.items())} FROM {src})"
+
+
+def _district_filter(districts):
+    # Daftar distrik (tanpa ALL) sebagai kondisi WHERE dan parameternya; None = semua distrik
+    names = None if districts is None else [district for district in districts if district != ALL]
+    if names is None:
+        return 'district IS NOT NULL', []
+    if not names:
+        return 'FALSE', []
+    return f"district IN ({', '.join('?' for _ in names)})", names
+
+
+def _query(sql, params=()):
+    return connection().execute(sql, list(params)).df()
+
+
+def _measures():
+    scores = [f'review_scores_{cat}' for cat in REVIEW_CATEGORIES]
+    return ',\n'.join([
+        'count(review_id) AS reviews',
+        'count(DISTINCT listing_id) AS listings',
+        'count(DISTINCT host_id) AS hosts',
+        'sum(price) AS price_sum',
+        'count(price) AS price_count',
+        'median(price) AS price_median',
+        'avg(review_scores_rating) AS rating_mean',
+        'median(review_scores_rating) AS rating_median',
+        *[f'avg({score}) AS {cat}_mean' for cat, score in zip(REVIEW_CATEGORIES, scores)],
+        'sum(price) / count(price) AS price_mean',
+        'quantile_cont(price, 0.9) AS price_p90',
+        f'median(price) FILTER (WHERE host_is_superhost) AS superhost_price_median',
+        f'avg(review_scores_rating) FILTER (WHERE host_is_superhost) AS superhost_rating_mean',
+        *[f'avg({score}) FILTER (WHERE host_is_superhost) AS superhost_{cat}_mean'
+          for cat, score in zip(REVIEW_CATEGORIES, scores)],
+        *[f'avg({score}) FILTER (WHERE NOT host_is_superhost) AS non_superhost_{cat}_mean'
+          for cat, score in zip(REVIEW_CATEGORIES, scores)],
+    ])
+
+
+def build_cube(districts=None, path=None):
+    """Same table as aggregates.build_cube, computed by DuckDB directly over the Parquet files.
+
+    ``districts`` limits the cells to those districts (ALL for the roll-up
+    over every district); None builds every district and ALL. Each grouping
+    set is one GROUP BY query; only its small result comes back to pandas.
+    """
+    src = relation(path)
+    periods = [
+        # (kunci year_month, kondisi baris)
+        ('year_month', 'year_month IS NOT NULL'),
+        (str(ALL_MONTHS), 'TRUE'),
+        (str(BASELINE), f"review_date <= TIMESTAMP '{BASELINE_END}'"),
+    ]
+    selections = []
+    if districts is None or ALL in districts:
+        selections.append((f"'{ALL}'", 'TRUE', []))
+    where, params = _district_filter(districts)
+    if districts is None or params:
+        selections.append(('district', where, params))
+
+    frames = []
+    for district_key, district_where, params in selections:
+        for room_key, room_where in [('room_type', 'room_type IS NOT NULL'), (f"'{ALL}'", 'TRUE')]:
+            for period_key, period_where in periods:
+                frames.append(_query(f"""
+                    SELECT CAST({district_key} AS VARCHAR) AS district,
+                           CAST({period_key} AS INTEGER) AS year_month,
+                           CAST({room_key} AS VARCHAR) AS room_type,
+                           {_measures()}
+                    FROM {src} AS src
+                    WHERE {district_where} AND {room_where} AND {period_where}
+                    GROUP BY ALL""", params))
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_neighbourhoods(districts=None, path=None):
+    """Listings and median price per neighbourhood; ALL (or None) means every district."""
+    where, params = _district_filter(None if districts is None or ALL in districts else districts)
+    return _query(f"""
+        SELECT CAST(district AS VARCHAR) AS district, CAST(neighbourhood AS VARCHAR) AS neighbourhood,
+               count(DISTINCT listing_id) AS listings, median(price) AS price_median
+        FROM {relation(path)} AS src
+        WHERE {where} AND neighbourhood IS NOT NULL
+        GROUP BY ALL
+        ORDER BY district, neighbourhood""", params)
+
+
+def _selection_source(districts, select, src):
+    # Baris per seleksi: ALL = semua baris, lalu baris setiap distrik yang diminta
+    parts, params = [], []
+    if districts is None or ALL in districts:
+        parts.append(f"SELECT '*' AS district, {select} FROM {src} AS src")
+    where, district_params = _district_filter(districts)
+    if districts is None or district_params:
+        parts.append(f"SELECT CAST(district AS VARCHAR) AS district, {select} FROM {src} AS src WHERE {where}")
+        params += district_params
+    return ' UNION ALL '.join(parts), params
+
+
+def build_price_groups(districts=None, path=None):
+    """Mean review scores per price quintile of each selection, like ``pd.qcut(price, 5)``.
+
+    Bin edges are the 20/40/60/80% quantiles (linear interpolation) of the
+    selection's prices; a price on an edge falls in the lower group.
+    """
+    scores = [f'review_scores_{cat}' for cat in REVIEW_CATEGORIES]
+    selection, params = _selection_source(districts, ', '.join(['price'] + scores), relation(path))
+    bins = ' + '.join(f'CAST(price > edges[{i}] AS INTEGER)' for i in range(1, 5))
+    result = _query(f"""
+        WITH selection AS ({selection}),
+        edges AS (
+            SELECT district, quantile_cont(price, [0.2, 0.4, 0.6, 0.8]) AS edges
+            FROM selection WHERE price IS NOT NULL GROUP BY district
+        ),
+        grouped AS (
+            SELECT selection.district, 1 + {bins} AS price_group, {', '.join(scores)}
+            FROM selection JOIN edges USING (district) WHERE price IS NOT NULL
+        ),
+        cells AS (SELECT district, price_group FROM edges CROSS JOIN range(1, 6) AS groups(price_group))
+        SELECT cells.district, 'Group ' || cells.price_group AS price_group,
+               {', '.join(f'avg({score}) AS {score}' for score in scores)}
+        FROM cells LEFT JOIN grouped USING (district, price_group)
+        GROUP BY cells.district, cells.price_group
+        ORDER BY cells.district = '*' DESC, cells.district, cells.price_group""", params)
+    result['price_group'] = pd.Categorical(result['price_group'], categories=PRICE_GROUPS)
+    return result
+
+
+def build_hosts(districts=None, path=None):
+    """Per host and selection: mean response/acceptance rate and rating, and the superhost flag."""
+    selection, params = _selection_source(
+        districts, 'host_id, host_response_rate, host_acceptance_rate, review_scores_rating, host_is_superhost',
+        relation(path))
+    return _query(f"""
+        SELECT district, host_id,
+               avg(host_response_rate) AS host_response_rate,
+               avg(host_acceptance_rate) AS host_acceptance_rate,
+               avg(review_scores_rating) AS review_scores_rating,
+               any_value(host_is_superhost) AS host_is_superhost
+        FROM ({selection}) AS selection
+        WHERE host_id IS NOT NULL
+        GROUP BY district, host_id
+        ORDER BY district = '*' DESC, district, host_id""", params)
+
+
+def build_sketches(path=None):
+    """Same table as aggregates.build_sketches (bucket keys computed in SQL)."""
+    src = relation(path)
+    cell = ', '.join(SKETCH_CELL)
+    frames = [_query(f"""
+        SELECT {cell}, '{metric}' AS metric,
+               CAST(CASE WHEN {metric} > 0 THEN ceil(ln({metric}) / ln({GAMMA!r})) ELSE {ZERO_KEY} END AS SMALLINT) AS key,
+               CAST(count(*) AS INTEGER) AS count
+        FROM {src} AS src
+        WHERE {metric} IS NOT NULL
+        GROUP BY ALL""") for metric in SKETCH_METRICS]
+    table = pd.concat(frames, ignore_index=True)
+    table['metric'] = table['metric'].astype(pd.CategoricalDtype(SKETCH_METRICS))
+    return table
+
+
+def build_distinct(path=None):
+    """Same table as aggregates.build_distinct.
+
+    DuckDB reduces the reviews to the distinct ids per cell; they are hashed
+    in NumPy so both backends produce identical registers.
+    """
+    src = relation(path)
+    cell = ', '.join(DISTINCT_CELL)
+    table = pd.concat([distinct_rows(_query(f"""
+        SELECT DISTINCT {cell}, {column}
+        FROM {src} AS src
+        WHERE {column} IS NOT NULL"""), column) for column in DISTINCT_COLUMNS], ignore_index=True)
+    table['column'] = table['column'].astype(pd.CategoricalDtype(DISTINCT_COLUMNS))
+    return table
+
+
+def build_listing_totals(path=None):
+    """Same table as aggregates.build_listing_totals."""
+    sums = []
+    for prefix, where in [('', ''), ('baseline_', ' FILTER (WHERE baseline)')]:
+        sums.append(f'count(review_id){where} AS {prefix}reviews')
+        for column in SCORE_COLUMNS:
+            sums.append(f'coalesce(CAST(sum({column}){where} AS DOUBLE), 0) AS {prefix}{column}_sum')
+            sums.append(f'count({column}){where} AS {prefix}{column}_count')
+    return _query(f"""
+        SELECT listing_id, max(review_id) AS last_review_id, {', '.join(sums)}
+        FROM {relation(path)} AS src
+        WHERE listing_id IS NOT NULL
+        GROUP BY listing_id
+        ORDER BY listing_id""")
+
+
+BUILDERS = {
+    'cube': build_cube,
+    'neighbourhoods': build_neighbourhoods,
+    'price_groups': build_price_groups,
+    'hosts': build_hosts,
+    'sketches': build_sketches,
+    'distinct': build_distinct,
+    'listing_totals': build_listing_totals,
+}
@@ -0,0 +1,128 @@
+import argparse
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from data_access import dataset_path
+from etl import HOST_FIELDS, LISTING_FIELDS, REVIEW_FIELDS, build_merged, conform, read_table
+
+# Skala 1x = ukuran data asli (listings.parquet dan hosts.parquet di repo)
+BASE_LISTINGS = 11_849
+BASE_HOSTS = 7_401
+REVIEWS_PER_LISTING = 25
+# Review ditulis per potongan supaya skala 100x tidak perlu muat di memori sekaligus
+CHUNK_ROWS = 1_000_000
+REVIEW_START = np.datetime64('2009-01-01', 's')
+REVIEW_END = np.datetime64('2021-01-31', 's')
+SCORE_COLUMNS = [name for name, _ in REVIEW_FIELDS if name.startswith('review_scores_')]
+# Proporsi skor review yang kosong, seperti listing tanpa skor di data asli
+MISSING_SCORES = 0.02
+
+
+def _resample(table, rows, rng):
+    return table.take(pa.array(rng.integers(0, table.num_rows, rows)))
+
+
+def _set(table, name, values):
+    index = table.column_names.index(name)
+    return table.set_column(index, table.schema.field(index), pa.array(values, table.schema.field(index).type))
+
+
+def generate_hosts(rows, rng, template=None):
+    """``rows`` hosts resampled from hosts.parquet, with new ids 1..rows."""
+    template = template if template is not None else conform(read_table(dataset_path('hosts')), HOST_FIELDS)
+    hosts = _resample(template, rows, rng)
+    return _set(hosts, 'host_id', np.arange(1, rows + 1))
+
+
+def generate_listings(rows, hosts, rng, template=None):
+    """``rows`` listings resampled from listings.parquet, spread over ``hosts`` host ids.
+
+    Every host gets at least one listing; the rest are skewed towards low
+    host ids, so some hosts have many listings as in the real data.
+    Coordinates and prices are jittered so resampled rows are not duplicates.
+    """
+    template = template if template is not None else conform(read_table(dataset_path('listings')), LISTING_FIELDS)
+    listings = _resample(template, rows, rng)
+    extra = max(rows - hosts, 0)
+    host_ids = np.concatenate([np.arange(1, min(rows, hosts) + 1),
+                               (hosts * rng.random(extra) ** 3).astype(np.int64) + 1])
+    price = np.asarray(listings.column('price').to_numpy(zero_copy_only=False), dtype=np.float64)
+    listings = _set(listings, 'listing_id', np.arange(1, rows + 1))
+    listings = _set(listings, 'host_id', rng.permutation(host_ids))
+    listings = _set(listings, 'latitude', listings.column('latitude').to_numpy() + rng.normal(0, 0.002, rows))
+    listings = _set(listings, 'longitude', listings.column('longitude').to_numpy() + rng.normal(0, 0.002, rows))
+    return _set(listings, 'price', np.maximum(np.round(price * rng.lognormal(0, 0.1, rows)), 10))
+
+
+def _scores(rows, rng, mean, std, low, high):
+    values = np.clip(np.round(rng.normal(mean, std, rows)), low, high)
+    values[rng.random(rows) < MISSING_SCORES] = np.nan
+    return values
+
+
+def review_chunks(rows, listings, rng, chunk_rows=CHUNK_ROWS):
+    """Yield review tables of at most ``chunk_rows`` rows with increasing review ids.
+
+    Dates are dd/mm/yyyy strings as in the source dump and lean towards
+    recent years; popular listings get more reviews.
+    """
+    span = (REVIEW_END - REVIEW_START).astype(np.int64)
+    for start in range(0, rows, chunk_rows):
+        size = min(chunk_rows, rows - start)
+        seconds = (span * rng.beta(3, 1.5, size)).astype(np.int64)
+        dates = pa.array(REVIEW_START + seconds.astype('timedelta64[s]'), pa.timestamp('s'))
+        columns = {
+            'review_id': np.arange(start + 1, start + size + 1),
+            'listing_id': (listings * rng.random(size) ** 2).astype(np.int64) + 1,
+            'review_date': pc.strftime(dates, format='%d/%m/%Y'),
+            'review_scores_rating': _scores(size, rng, 93, 8, 20, 100),
+        }
+        for name in SCORE_COLUMNS[1:]:
+            columns[name] = _scores(size, rng, 9.5, 0.8, 2, 10)
+        schema = pa.schema([(name, pa.string() if name == 'review_date' else dtype) for name, dtype in REVIEW_FIELDS])
+        yield pa.table(columns, schema=schema)
+
+
+def generate(scale=1, dest='synthetic', seed=43, merged=True, chunk_rows=CHUNK_ROWS):
+    """Write listings/hosts/reviews Parquet files ``scale`` times the real size into ``dest``.
+
+    With ``merged`` also builds ``all.parquet`` there with the streaming
+    ETL. Returns a dict of row counts.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(dest, exist_ok=True)
+    counts = {
+        'hosts': int(BASE_HOSTS * scale),
+        'listings': int(BASE_LISTINGS * scale),
+        'reviews': int(BASE_LISTINGS * REVIEWS_PER_LISTING * scale),
+    }
+    paths = {name: os.path.join(dest, f'{name}.parquet') for name in ('listings', 'hosts', 'reviews', 'all')}
+
+    pq.write_table(generate_hosts(counts['hosts'], rng), paths['hosts'], compression='zstd')
+    pq.write_table(generate_listings(counts['listings'], counts['hosts'], rng), paths['listings'], compression='zstd')
+    writer = None
+    for chunk in review_chunks(counts['reviews'], counts['listings'], rng, chunk_rows):
+        writer = writer or pq.ParquetWriter(paths['reviews'], chunk.schema, compression='zstd')
+        writer.write_table(chunk)
+    if writer is not None:
+        writer.close()
+
+    if merged:
+        counts['all'] = build_merged(paths['listings'], paths['hosts'], paths['reviews'], paths['all'])
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate synthetic listings/hosts/reviews with the real schema.")
+    parser.add_argument('--scale', type=float, default=1, help="size relative to the real data (1, 10, 100, ...)")
+    parser.add_argument('--dest', default='synthetic', help="output directory")
+    parser.add_argument('--seed', type=int, default=43)
+    parser.add_argument('--no-merged', action='store_true', help="skip building all.parquet")
+    args = parser.parse_args()
+
+    counts = generate(args.scale, args.dest, args.seed, merged=not args.no_merged)
+    print(', '.join(f"{rows:,} {name}" for name, rows in counts.items()) + f" written to {args.dest}")
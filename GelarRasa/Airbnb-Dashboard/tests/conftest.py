@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul dashboard ada di folder induk (bukan paket), seperti saat streamlit run dijalankan dari sana
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,47 @@
+import base64
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from map_render import GRID_STEP, MARKER_DTYPE, pack_markers
+
+
+def _unpack(packed):
+    # Sama seperti listingDetails.unpack di browser
+    rows = np.frombuffer(base64.b64decode(packed['points']), dtype=MARKER_DTYPE)
+    latitude = packed['origin'][0] + rows['latitude'] * packed['step'][0]
+    longitude = packed['origin'][1] + rows['longitude'] * packed['step'][1]
+    return latitude, longitude, rows['listing_id']
+
+
+def test_pack_markers_round_trip():
+    rng = np.random.default_rng(3)
+    data = pd.DataFrame({
+        'latitude': rng.uniform(40.5, 40.9, 1_000),
+        'longitude': rng.uniform(-74.25, -73.7, 1_000),
+        # Id Inside Airbnb sampai 18 digit harus utuh (int32 akan terpotong)
+        'listing_id': pd.array(rng.integers(1, 10 ** 18, 1_000), dtype='Int64'),
+    })
+    data.loc[5, 'listing_id'] = pd.NA
+    packed = pack_markers(data)
+    assert packed['count'] == 1_000 and len(base64.b64decode(packed['points'])) == 12 * 1_000
+
+    latitude, longitude, listing_id = _unpack(packed)
+    expected = data['listing_id'].fillna(-1).to_numpy(np.int64)
+    np.testing.assert_array_equal(listing_id, expected)
+    assert listing_id[5] == -1
+    # Posisi dibulatkan ke langkah grid: galat paling banyak setengah langkah
+    np.testing.assert_allclose(latitude, data['latitude'], rtol=0, atol=packed['step'][0] / 2 + 1e-12)
+    np.testing.assert_allclose(longitude, data['longitude'], rtol=0, atol=packed['step'][1] / 2 + 1e-12)
+
+
+def test_pack_markers_small_area_and_empty():
+    data = pd.DataFrame({'latitude': [40.7, 40.70002], 'longitude': [-73.9, -73.9], 'listing_id': [1, 2]})
+    packed = pack_markers(data)
+    assert packed['step'] == [GRID_STEP, GRID_STEP]
+    latitude, _, _ = _unpack(packed)
+    assert latitude == pytest.approx([40.7, 40.70002], abs=GRID_STEP / 2)
+
+    empty = pack_markers(data.iloc[:0])
+    assert empty['count'] == 0 and empty['points'] == ''
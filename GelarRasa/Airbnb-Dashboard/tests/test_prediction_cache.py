@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+import prediction_cache
+from model_registry import MODEL_FEATURES
+from prediction_cache import PredictionCache, normalize
+
+FEATURES = {'accommodates': 2, 'bedrooms': 1, 'minimum_nights': 3, 'maximum_nights': 30, 'review_scores_rating': 95,
+            'review_scores_cleanliness': 10, 'review_scores_location': 9, 'host_total_listings_count': 1,
+            'host_response_rate': 0.987}
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # Model diganti fungsi palsu yang mencatat pemanggilannya; cache modul dikosongkan per uji
+    calls = {'price': 0, 'shap': 0}
+
+    def prices(keys, name, version):
+        calls['price'] += len(keys)
+        return [float(sum(key)) for key in keys]
+
+    def contributions(frame, name, version):
+        calls['shap'] += len(frame)
+        return np.ones((len(frame), len(MODEL_FEATURES))), 50.0
+
+    monkeypatch.setattr(prediction_cache, '_predict_prices', prices)
+    monkeypatch.setattr(prediction_cache, 'contributions', contributions)
+    monkeypatch.setattr(prediction_cache, 'model_info', lambda name: {'version': 'test'})
+    monkeypatch.setattr(prediction_cache, 'cache', PredictionCache())
+    return calls
+
+
+def test_lru_eviction_and_stats():
+    cache = PredictionCache(maxsize=2)
+    cache.put('a', {'price': 1})
+    cache.put('b', {'price': 2})
+    assert cache.get('a') == {'price': 1}
+    # 'b' paling lama tidak dipakai, jadi 'b' yang dibuang
+    cache.put('c', {'price': 3})
+    assert cache.get('b') is None
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 1, 'misses': 1, 'evictions': 1, 'hit_rate': 0.5}
+    cache.clear()
+    assert cache.stats()['size'] == cache.stats()['hits'] == 0
+
+
+def test_entry_without_requested_fields_is_a_miss():
+    cache = PredictionCache()
+    cache.put('a', {'price': 1})
+    assert cache.get('a', ('shap_values',)) == {'price': 1}
+    assert cache.get('a') == {'price': 1}
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+
+def test_predict_memoizes_price_and_explanation(calls):
+    first = prediction_cache.predict(FEATURES)
+    assert prediction_cache.predict(dict(FEATURES, host_response_rate=0.9871)) == first
+    assert calls == {'price': 1, 'shap': 0}
+
+    # Harga sudah ada tetapi SHAP belum: hanya SHAP yang dihitung, dan dihitung sebagai miss
+    explained = prediction_cache.predict(FEATURES, explain=True)
+    assert explained['price'] == first['price'] and len(explained['shap_values']) == len(MODEL_FEATURES)
+    assert prediction_cache.predict(FEATURES) is explained
+    assert prediction_cache.predict(FEATURES, explain=True) is explained
+    assert calls == {'price': 1, 'shap': 1}
+    stats = prediction_cache.cache.stats()
+    assert (stats['hits'], stats['misses']) == (3, 2)
+
+
+def test_normalize_rounds_inputs():
+    key = normalize(dict(FEATURES, accommodates=2.0))
+    assert key == normalize(FEATURES)
+    assert key[MODEL_FEATURES.index('host_response_rate')] == 0.99
+    assert all(isinstance(value, int) for name, value in zip(MODEL_FEATURES, key) if name != 'host_response_rate')
@@ -0,0 +1,201 @@
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+import aggregates
+from refresh import STEPS
+from schema import compact
+from sketches import ACCURACY
+from synthetic_data import generate
+
+# Semua path data diturunkan dari folder modul (data_access.DATA_DIR), jadi setiap tree uji adalah salinan
+# modul-modul dashboard di tmp_path dan langkah refresh dijalankan sebagai proses di sana
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Skala kecil: ~600 listing, ~15.000 review. Review di atas CUT datang dari scrape baru
+SCALE = 0.05
+CUT = 13_000
+CHANGED_PRICES = 10
+MOVED_LISTINGS = 3
+CHANGED_HOSTS = 5
+DUMPS = ['dump_reviews.parquet', 'dump_listings.parquet', 'dump_hosts.parquet']
+# Fungsi yang dijalankan refresh.apply untuk setiap langkah
+STEP_FUNCTIONS = {'upsert': 'upsert', 'partitions': '_rewrite_partitions', 'reviews': '_append_segment',
+                  'aggregates': '_update_aggregates'}
+# Kolom cube yang dijumlahkan/dihitung: harus sama persis dengan build ulang penuh
+EXACT_COLUMNS = ['reviews', 'listings', 'hosts', 'price_sum', 'price_count']
+# Median dan persentil sel roll-up berasal dari sketsa kuantil
+SKETCH_COLUMNS = ['price_median', 'price_p90', 'rating_median', 'superhost_price_median']
+# Rata-rata disimpan float32 (schema.py); roll-up menjumlahkan dengan urutan lain
+FLOAT_TOLERANCE = 1e-6
+CELL_KEYS = {
+    'cube': ['district', 'year_month', 'room_type'],
+    'neighbourhoods': ['district', 'neighbourhood'],
+    'price_groups': ['district', 'price_group'],
+    'hosts': ['district', 'host_id'],
+    'sketches': aggregates.SKETCH_CELL + ['metric', 'key'],
+    'distinct': aggregates.DISTINCT_CELL + ['column'],
+    'listing_totals': ['listing_id'],
+}
+
+
+def _run(tree, code):
+    # Kode dijalankan di tree uji; baris terakhir stdout berisi hasil JSON
+    result = subprocess.run([sys.executable, '-c', code], cwd=tree, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _refresh(tree, *dumps):
+    paths = ', '.join(repr(os.path.join(tree, dump)) for dump in dumps)
+    return _run(tree, f"import json, refresh; print(json.dumps(refresh.refresh({paths})))")
+
+
+@pytest.fixture(scope='module')
+def baseline(tmp_path_factory):
+    """A built tree (partitions and aggregates) holding the reviews up to CUT, plus the dumps of a new scrape."""
+    tree = str(tmp_path_factory.mktemp('baseline'))
+    for path in glob.glob(os.path.join(DASHBOARD_DIR, '*.py')):
+        shutil.copy(path, tree)
+    generate(SCALE, dest=tree, merged=False)
+
+    reviews = pq.read_table(os.path.join(tree, 'reviews.parquet'))
+    pq.write_table(reviews, os.path.join(tree, 'dump_reviews.parquet'))
+    pq.write_table(reviews.filter(pc.less_equal(reviews.column('review_id'), CUT)),
+                   os.path.join(tree, 'reviews.parquet'))
+
+    rng = np.random.default_rng(5)
+    listings = pd.read_parquet(os.path.join(tree, 'listings.parquet'))
+    picked = listings.index[rng.choice(len(listings), CHANGED_PRICES + MOVED_LISTINGS, replace=False)]
+    listings.loc[picked[:CHANGED_PRICES], 'price'] = listings.loc[picked[:CHANGED_PRICES], 'price'] * 2 + 7
+    districts = sorted(listings['district'].dropna().unique())
+    for index in picked[CHANGED_PRICES:]:
+        listings.at[index, 'district'] = next(d for d in districts if d != listings.at[index, 'district'])
+    listings.to_parquet(os.path.join(tree, 'dump_listings.parquet'), index=False)
+    hosts = pd.read_parquet(os.path.join(tree, 'hosts.parquet'))
+    flipped = hosts.index[rng.choice(len(hosts), CHANGED_HOSTS, replace=False)]
+    hosts.loc[flipped, 'host_is_superhost'] = hosts.loc[flipped, 'host_is_superhost'].map({'t': 'f', 'f': 't'})
+    hosts.to_parquet(os.path.join(tree, 'dump_hosts.parquet'), index=False)
+
+    _run(tree, "import etl, partition_dataset, aggregates; etl.build_merged(); "
+               "partition_dataset.write_partitioned(); aggregates.build_all(); print(0)")
+    return tree
+
+
+@pytest.fixture
+def tree(baseline, tmp_path):
+    # copy2 menjaga mtime, jadi versi segmen (data_access.segment_dir) tetap cocok
+    path = str(tmp_path / 'tree')
+    shutil.copytree(baseline, path)
+    return path
+
+
+def _tables(tree):
+    return {name: pd.read_parquet(os.path.join(tree, 'aggregates', f'{name}.parquet')) for name in aggregates.TABLES}
+
+
+def _merged_rows(tree):
+    return _run(tree, "import json, aggregates; df = aggregates.load_district(None, ['review_id']); "
+                      "print(json.dumps([len(df), int(df['review_id'].duplicated().sum())]))")
+
+
+def _assert_matches_rebuild(tree):
+    # Pembanding: all.parquet dibangun ulang oleh etl.py (reviews.parquet + segmen refresh) lalu semua tabel
+    # dihitung penuh dari sana
+    _run(tree, "import etl; print(etl.build_merged(dest='rebuilt.parquet'))")
+    rebuilt = compact(pd.read_parquet(os.path.join(tree, 'rebuilt.parquet'), columns=aggregates.SOURCE_COLUMNS))
+    assert _merged_rows(tree) == [len(rebuilt), 0]
+
+    for name, got in _tables(tree).items():
+        expected = aggregates.BUILDERS[name](rebuilt)
+        keys = CELL_KEYS[name]
+        assert len(got) == len(expected), name
+        merged = expected.assign(**{key: expected[key].astype(str) for key in keys}).merge(
+            got.assign(**{key: got[key].astype(str) for key in keys}), on=keys, how='outer',
+            indicator=True, suffixes=('_expected', '_got'))
+        assert (merged['_merge'] == 'both').all(), name
+        for column in expected.columns.drop(keys):
+            left, right = merged[f'{column}_expected'], merged[f'{column}_got']
+            if column == 'registers':
+                assert (left == right).all(), name
+                continue
+            left = pd.to_numeric(left, errors='coerce').astype(float).to_numpy()
+            right = pd.to_numeric(right, errors='coerce').astype(float).to_numpy()
+            tolerance = ACCURACY * (1 + 1e-6) if column in SKETCH_COLUMNS else FLOAT_TOLERANCE
+            np.testing.assert_allclose(right, left, rtol=tolerance, atol=0, equal_nan=True,
+                                       err_msg=f'{name}.{column}')
+        if name == 'cube':
+            for column in EXACT_COLUMNS:
+                assert (merged[f'{column}_expected'].astype(float) == merged[f'{column}_got'].astype(float)).all(), column
+
+
+def _new_reviews(tree):
+    dump = pq.read_table(os.path.join(tree, 'dump_reviews.parquet'), columns=['review_id'])
+    return int(pc.sum(pc.greater(dump.column('review_id'), CUT)).as_py())
+
+
+def test_refresh_matches_rebuild(tree):
+    summary = _refresh(tree, *DUMPS)
+    assert summary['new_reviews'] == _new_reviews(tree)
+    assert summary['changed_listings'] >= CHANGED_PRICES + MOVED_LISTINGS
+    assert summary['changed_hosts'] == CHANGED_HOSTS
+    _assert_matches_rebuild(tree)
+
+
+def test_refresh_is_idempotent(tree):
+    first = _refresh(tree, *DUMPS)
+    tables = _tables(tree)
+    rows = _merged_rows(tree)
+
+    again = _refresh(tree, *DUMPS)
+    assert again['new_reviews'] == again['changed_listings'] == again['changed_hosts'] == 0
+    assert again['watermark'] == first['watermark']
+    assert _merged_rows(tree) == rows
+    for name, table in _tables(tree).items():
+        pd.testing.assert_frame_equal(table, tables[name], obj=name)
+
+
+@pytest.mark.parametrize('step', ['upsert', 'partitions', 'reviews', 'aggregates'])
+def test_crash_resumes_from_journal(tree, step):
+    # Proses berhenti setelah fungsi langkah ``step`` menulis datanya, sebelum journal mencatatnya,
+    # jadi refresh berikutnya mengulang langkah itu (upsert berhenti di antara listings dan hosts)
+    paths = ', '.join(repr(os.path.join(tree, dump)) for dump in DUMPS)
+    done = _run(tree, f"""
+import json, os, refresh
+original = refresh.{STEP_FUNCTIONS[step]}
+def crash(*args):
+    original(*args)
+    raise SystemExit(3)
+refresh.{STEP_FUNCTIONS[step]} = crash
+try:
+    refresh.refresh({paths})
+except SystemExit:
+    pass
+print(json.dumps(json.load(open(refresh.JOURNAL_FILE))['done']))
+""")
+    assert done == STEPS[:STEPS.index(step)]
+
+    resumed = _refresh(tree)
+    assert resumed['resumed']
+    assert not os.path.exists(os.path.join(tree, 'refresh_journal.json'))
+    _assert_matches_rebuild(tree)
+
+
+def test_partitioning_refuses_source_older_than_refresh(tree):
+    _refresh(tree, *DUMPS)
+    code = "import partition_dataset; print(partition_dataset.write_partitioned() and 0)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=tree, capture_output=True, text=True)
+    assert result.returncode != 0 and 'predates the last refresh' in result.stderr
+
+    # all.parquet dibangun ulang oleh etl.py (dengan segmen review refresh): partisi ulang diterima tanpa kehilangan baris
+    rows = _merged_rows(tree)
+    _run(tree, "import etl; etl.build_merged(); " + code)
+    assert _merged_rows(tree) == rows
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import HLL_PRECISION, ACCURACY, ZERO_KEY, DistinctSketch, QuantileSketch, bucket_keys, bucket_values
+
+QUANTILES = [0.0, 0.1, 0.2, 0.5, 0.8, 0.9, 0.99, 1.0]
+# Galat baku HyperLogLog 1.04 / sqrt(2**12) = 1.6%; batas uji ~3 galat baku
+HLL_STANDARD_ERROR = 1.04 / np.sqrt(2 ** 12)
+
+
+def _values(kind, count, seed):
+    # Bentuk data seperti metrik dashboard: harga (lognormal, bulat), skor review (banyak nilai kembar), kontinu
+    rng = np.random.default_rng(seed)
+    if kind == 'price':
+        return np.maximum(np.round(rng.lognormal(4.3, 0.7, count)), 10)
+    if kind == 'score':
+        return np.clip(np.round(rng.normal(93, 8, count)), 20, 100)
+    return rng.uniform(0.5, 5_000, count)
+
+
+def _assert_same(left, right):
+    np.testing.assert_array_equal(left.keys, right.keys)
+    np.testing.assert_array_equal(left.counts, right.counts)
+
+
+def test_merge_is_associative_and_equals_sketch_of_union():
+    parts = [_values('price', count, seed) for count, seed in [(500, 1), (1, 2), (2_000, 3)]]
+    a, b, c = (QuantileSketch.from_values(part) for part in parts)
+    union = QuantileSketch.from_values(np.concatenate(parts))
+    _assert_same(a.merge(b).merge(c), a.merge(b.merge(c)))
+    _assert_same(a.merge(b, c), union)
+    _assert_same(c.merge(a, b), union)
+
+
+@pytest.mark.parametrize('kind', ['price', 'score', 'uniform'])
+@pytest.mark.parametrize('count', [1, 2, 7, 1_000, 50_000])
+def test_quantile_within_relative_accuracy(kind, count):
+    values = _values(kind, count, seed=count)
+    exact = pd.Series(values).quantile(QUANTILES).to_numpy()
+    estimate = QuantileSketch.from_values(values).quantile(QUANTILES)
+    # Sedikit kelonggaran untuk pembulatan float pada batas bucket
+    assert np.all(np.abs(estimate - exact) <= ACCURACY * exact * (1 + 1e-9))
+
+
+def test_bucket_values_are_within_accuracy_of_their_bucket():
+    values = np.geomspace(1e-3, 1e6, 10_000)
+    represented = bucket_values(bucket_keys(values))
+    assert np.all(np.abs(represented - values) <= ACCURACY * values * (1 + 1e-9))
+
+
+def test_zero_bucket():
+    # Nilai <= 0 masuk satu bucket khusus yang mewakili 0
+    assert np.all(bucket_keys([0.0, -3.0]) == ZERO_KEY)
+    assert bucket_values([ZERO_KEY])[0] == 0.0
+    sketch = QuantileSketch.from_values([0, 0, 0, 40, 80])
+    assert sketch.keys[0] == ZERO_KEY and sketch.counts[0] == 3
+    assert sketch.quantile(0.0) == sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == pytest.approx(80, rel=ACCURACY)
+    # Bucket nol dan bucket biasa tetap dijumlahkan dengan benar saat digabung
+    _assert_same(sketch.merge(QuantileSketch.from_values([0, 40])), QuantileSketch.from_values([0, 0, 0, 0, 40, 40, 80]))
+
+
+def test_empty_sketch():
+    empty = QuantileSketch()
+    assert empty.count == 0
+    assert np.isnan(empty.quantile(0.5))
+    assert np.isnan(empty.quantile([0.2, 0.8])).all() and empty.quantile([0.2, 0.8]).shape == (2,)
+    # NaN diabaikan, jadi sketsa dari nilai kosong saja juga kosong
+    assert QuantileSketch.from_values([np.nan, np.nan]).count == 0
+    assert QuantileSketch.from_buckets([], []).count == 0
+
+    sketch = QuantileSketch.from_values(_values('score', 100, seed=4))
+    _assert_same(sketch.merge(empty), sketch)
+    _assert_same(empty.merge(sketch), sketch)
+
+
+def _ids(count, seed):
+    # Id unik acak sampai 18 digit, seperti id listing Inside Airbnb terbaru
+    rng = np.random.default_rng(seed)
+    return np.unique(rng.integers(1, 10 ** 18, int(count * 1.01)))[:count]
+
+
+def test_distinct_error_at_precision_12():
+    assert HLL_PRECISION == 12
+    errors = []
+    for count in [20_000, 50_000, 200_000]:
+        for seed in range(5):
+            ids = _ids(count, seed)
+            errors.append(abs(DistinctSketch.from_values(ids).count() - count) / count)
+    assert max(errors) <= 3 * HLL_STANDARD_ERROR
+    assert np.mean(errors) <= 1.5 * HLL_STANDARD_ERROR
+
+
+@pytest.mark.parametrize('count', [0, 1, 10, 100, 1_000, 7_000])
+def test_distinct_small_sets_use_linear_counting(count):
+    # Di bawah 2.5 * 2**12 id dipakai linear counting; galat bakunya sqrt(m (e^t - t - 1)) dengan t = n / m
+    # (~1.1% sampai 1.000 id, 1.5% di 7.000)
+    m = 2 ** HLL_PRECISION
+    standard_error = np.sqrt(m * (np.exp(count / m) - count / m - 1))
+    estimate = DistinctSketch.from_values(_ids(count, seed=count)).count()
+    assert abs(estimate - count) <= max(1, 3 * standard_error)
+
+
+def test_distinct_merge_is_union():
+    a, b = _ids(30_000, seed=1), _ids(30_000, seed=2)
+    overlap = np.concatenate([a, b[:10_000]])
+    left, right = DistinctSketch.from_values(overlap), DistinctSketch.from_values(b)
+    union = DistinctSketch.from_values(np.concatenate([a, b]))
+    # Id yang ada di kedua sisi tidak dihitung dua kali: gabungan sama persis dengan sketsa union
+    np.testing.assert_array_equal(left.merge(right).registers, union.registers)
+    np.testing.assert_array_equal(DistinctSketch.from_bytes([left.to_bytes(), right.to_bytes()]).registers,
+                                  union.registers)
+    # Id berulang dalam satu sisi juga tidak mengubah sketsa
+    np.testing.assert_array_equal(DistinctSketch.from_values(np.repeat(a, 3)).registers,
+                                  DistinctSketch.from_values(a).registers)
+
+
+def test_distinct_empty_sketch():
+    assert DistinctSketch().count() == 0
+    assert DistinctSketch.from_bytes([]).count() == 0
+    assert DistinctSketch.from_values(np.array([], dtype=np.int64)).count() == 0
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spatial_index import GridIndex, cell_aggregates, parse_bounds
+
+
+def _points(count, seed, missing=0.0):
+    # Titik acak di sekitar New York; ``missing`` = proporsi koordinat kosong
+    rng = np.random.default_rng(seed)
+    latitude = rng.uniform(40.5, 40.9, count)
+    longitude = rng.uniform(-74.25, -73.7, count)
+    latitude[rng.random(count) < missing] = np.nan
+    longitude[rng.random(count) < missing] = np.nan
+    return latitude, longitude
+
+
+def _brute_force(latitude, longitude, south, west, north, east):
+    with np.errstate(invalid='ignore'):
+        inside = (latitude >= south) & (latitude <= north) & (longitude >= west) & (longitude <= east)
+    return np.flatnonzero(inside)
+
+
+@pytest.mark.parametrize('cell_size', [0.005, 0.01, 0.5])
+@pytest.mark.parametrize('missing', [0.0, 0.1])
+def test_query_matches_brute_force(cell_size, missing):
+    latitude, longitude = _points(5_000, seed=3, missing=missing)
+    index = GridIndex(latitude, longitude, cell_size)
+    rng = np.random.default_rng(11)
+    for _ in range(200):
+        south, north = np.sort(rng.uniform(40.4, 41.0, 2))
+        west, east = np.sort(rng.uniform(-74.4, -73.6, 2))
+        np.testing.assert_array_equal(index.query(south, west, north, east),
+                                      _brute_force(latitude, longitude, south, west, north, east))
+
+
+def test_query_edges_and_outside():
+    latitude, longitude = _points(1_000, seed=5)
+    index = GridIndex(latitude, longitude)
+    # Titik tepat di tepi kotak ikut terpilih
+    np.testing.assert_array_equal(index.query(latitude[7], longitude[7], latitude[7], longitude[7]), [7])
+    # Kotak yang mencakup semua titik, kotak di luar grid, dan kotak terbalik
+    np.testing.assert_array_equal(index.query(-90, -180, 90, 180), np.arange(1_000))
+    assert len(index.query(10, 10, 11, 11)) == 0
+    assert len(index.query(40.9, -74.0, 40.5, -73.8)) == 0
+
+
+def test_empty_and_missing_points():
+    assert len(GridIndex([], []).query(-90, -180, 90, 180)) == 0
+    assert len(GridIndex([np.nan], [np.nan]).query(-90, -180, 90, 180)) == 0
+
+
+def test_parse_bounds():
+    bounds = {'_southWest': {'lat': 40.6, 'lng': -74.1}, '_northEast': {'lat': 40.8, 'lng': -73.9}}
+    assert parse_bounds(bounds) == (40.6, -74.1, 40.8, -73.9)
+    assert parse_bounds(None) is None
+    assert parse_bounds({'_southWest': {'lat': None}, '_northEast': {}}) is None
+
+
+def test_cell_aggregates():
+    data = pd.DataFrame({'latitude': [40.701, 40.702, 40.751], 'longitude': [-73.951, -73.952, -73.901],
+                         'price': [100, 200, 80]})
+    cells = cell_aggregates(data, 0.01).sort_values('count', ignore_index=True)
+    assert cells['count'].tolist() == [1, 2]
+    assert cells['median_price'].tolist() == [80, 150]
+    assert cells.loc[1, 'latitude'] == pytest.approx(40.7015)
+    assert cell_aggregates(data.iloc[:0], 0.01).empty
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model_registry import MODEL_FEATURES, get_model
+from tree_predictor import compile_model, get_predictor
+
+# Selisih maksimum yang diterima terhadap predict() model aslinya. XGBoost menjumlahkan leaf dalam float32,
+# compiled predictor dalam float64. Selisih terukur pada data uji ini: model di repo xgb 2.0e-3, ensemble 1.0e-3;
+# model kecil di bawah xgb 6.9e-4, ensemble 3.4e-4. LightGBM membandingkan dan menjumlahkan dalam float64: identik
+COMMITTED_TOLERANCE = {'xgb': 4e-3, 'ensemble': 2e-3}
+TRAINED_TOLERANCE = {'xgb': 1.5e-3, 'lgbm': 1e-9, 'ensemble': 1e-3}
+SINGLE_ROWS = 20
+
+
+def _rows(count, seed, missing=0.0):
+    # Baris acak dalam rentang input halaman prediksi; ``missing`` = proporsi nilai kosong
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'accommodates': rng.integers(0, 17, count),
+        'bedrooms': rng.integers(0, 11, count),
+        'minimum_nights': rng.integers(0, 31, count),
+        'maximum_nights': rng.integers(0, 1126, count),
+        'review_scores_rating': rng.integers(0, 101, count),
+        'review_scores_cleanliness': rng.integers(0, 11, count),
+        'review_scores_location': rng.integers(0, 11, count),
+        'host_total_listings_count': rng.integers(0, 101, count),
+        'host_response_rate': rng.integers(0, 101, count) / 100,
+    }, columns=MODEL_FEATURES).astype('float64')
+    return X.mask(rng.random(X.shape) < missing)
+
+
+def _assert_matches(model, predictor, X, tolerance):
+    expected = np.asarray(model.predict(X), dtype=np.float64)
+    actual = predictor.predict(X.to_numpy())
+    assert actual.shape == (len(X),)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=tolerance)
+
+    # Satu baris: predict_row dan batch berisi satu baris, dibandingkan dengan predict() atas frame satu baris
+    for i in range(min(SINGLE_ROWS, len(X))):
+        row = X.iloc[[i]]
+        single = float(model.predict(row)[0])
+        assert isinstance(predictor.predict_row(row.iloc[0].to_numpy()), float)
+        assert predictor.predict_row(row.iloc[0].to_numpy()) == pytest.approx(single, rel=0, abs=tolerance)
+        assert predictor.predict(row.iloc[0].to_numpy()).shape == (1,)
+        assert predictor.predict(row.to_numpy())[0] == pytest.approx(single, rel=0, abs=tolerance)
+
+
+def _training_data(count=2_000, seed=7):
+    X = _rows(count, seed, missing=0.05)
+    rng = np.random.default_rng(seed)
+    y = (40 + 25 * X['accommodates'].fillna(2) + 15 * X['bedrooms'].fillna(1)
+         - 0.8 * X['minimum_nights'].fillna(3) + rng.normal(0, 20, count))
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def trained():
+    pytest.importorskip('xgboost')
+    pytest.importorskip('lightgbm')
+    from sklearn.ensemble import VotingRegressor
+
+    from train import _estimator
+
+    X, y = _training_data()
+    params = {'max_depth': 6, 'learning_rate': 0.1, 'subsample': 0.85, 'colsample_bytree': 0.85}
+    xgb = _estimator('xgb', params, 150, 1).fit(X, y)
+    lgbm = _estimator('lgbm', {'num_leaves': 31, 'learning_rate': 0.1}, 150, 1).fit(X, y)
+    return {'xgb': xgb, 'lgbm': lgbm, 'ensemble': VotingRegressor([('xgb', xgb), ('lgbm', lgbm)]).fit(X, y)}
+
+
+@pytest.mark.parametrize('name', ['xgb', 'ensemble'])
+@pytest.mark.parametrize('missing', [0.0, 0.2])
+def test_committed_models(name, missing):
+    pytest.importorskip('xgboost')
+    _assert_matches(get_model(name), get_predictor(name), _rows(2_000, seed=43, missing=missing),
+                    COMMITTED_TOLERANCE[name])
+
+
+@pytest.mark.parametrize('name', ['xgb', 'ensemble'])
+def test_committed_models_all_missing(name):
+    pytest.importorskip('xgboost')
+    X = pd.DataFrame(np.nan, index=range(3), columns=MODEL_FEATURES)
+    _assert_matches(get_model(name), get_predictor(name), X, COMMITTED_TOLERANCE[name])
+
+
+@pytest.mark.parametrize('name', ['xgb', 'lgbm', 'ensemble'])
+@pytest.mark.parametrize('missing', [0.0, 0.2])
+def test_trained_models(trained, name, missing):
+    model = trained[name]
+    _assert_matches(model, compile_model(model), _rows(2_000, seed=11, missing=missing), TRAINED_TOLERANCE[name])
+
+
+def test_early_stopping_uses_best_iteration():
+    pytest.importorskip('xgboost')
+    from train import _estimator
+
+    X, y = _training_data()
+    model = _estimator('xgb', {'max_depth': 6, 'learning_rate': 0.3}, 500, 1, early_stopping=True)
+    model.fit(X[:1_500], y[:1_500], eval_set=[(X[1_500:], y[1_500:])], verbose=False)
+    assert model.best_iteration < 499
+    _assert_matches(model, compile_model(model), _rows(1_000, seed=5, missing=0.1), TRAINED_TOLERANCE['xgb'])
@@ -0,0 +1,182 @@
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+
+from data_access import STATIC_DIR, STATIC_URL, load_listings, publish_version, published_manifest, static_version
+
+# Zoom 9 = seluruh NYC dalam 1-2 tile; mulai zoom 14 (map_render.DETAIL_ZOOM) peta menampilkan listing
+MIN_ZOOM = int(os.environ.get('TILE_MIN_ZOOM', 9))
+MAX_ZOOM = int(os.environ.get('TILE_MAX_ZOOM', 13))
+TILE_SIZE = 256
+# Lebar satu sel heatmap dalam piksel tile
+BIN_PIXELS = int(os.environ.get('TILE_BIN_PIXELS', 4))
+LAYERS = ['density', 'price']
+ALL = 'all'
+TILES_NAME = 'tiles'
+TILES_DIR = os.path.join(STATIC_DIR, TILES_NAME)
+ALPHA = 190
+
+# Skala warna (RGB) dari nilai rendah ke tinggi
+DENSITY_COLORS = np.array([[255, 237, 160], [254, 178, 76], [240, 59, 32], [128, 0, 38]])
+PRICE_COLORS = np.array([[49, 54, 149], [116, 173, 209], [254, 224, 144], [244, 109, 67], [165, 0, 38]])
+# Rentang skala harga: persentil ini dari harga semua listing (skala log)
+PRICE_PERCENTILES = (5, 95)
+
+
+def pixel_coordinates(latitude, longitude, zoom):
+    """Global Web Mercator pixel coordinates at ``zoom``, as used by Leaflet's z/x/y tiles."""
+    scale = TILE_SIZE * 2 ** zoom
+    x = (np.asarray(longitude, dtype=np.float64) + 180) / 360 * scale
+    lat = np.radians(np.clip(np.asarray(latitude, dtype=np.float64), -85.0511, 85.0511))
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * scale
+    return x, y
+
+
+def bin_listings(latitude, longitude, price, zoom):
+    """Listing count and median price per heatmap bin at ``zoom``.
+
+    Returns ``(bin_x, bin_y, count, median_price)`` for every non-empty bin;
+    bins are BIN_PIXELS wide in global pixel coordinates. The median skips
+    missing prices (NaN when a bin has none).
+    """
+    x, y = pixel_coordinates(latitude, longitude, zoom)
+    width = TILE_SIZE // BIN_PIXELS * 2 ** zoom
+    key = (x // BIN_PIXELS).astype(np.int64) * width + (y // BIN_PIXELS).astype(np.int64)
+    keys, count = np.unique(key, return_counts=True)
+
+    # Median per bin: urutkan (bin, harga) sekali, lalu ambil elemen tengah setiap kelompok
+    price = np.asarray(price, dtype=np.float64)
+    valid = ~np.isnan(price)
+    order = np.lexsort((price[valid], key[valid]))
+    sorted_keys, sorted_price = key[valid][order], price[valid][order]
+    priced_keys, start, priced = np.unique(sorted_keys, return_index=True, return_counts=True)
+    medians = (sorted_price[start + (priced - 1) // 2] + sorted_price[start + priced // 2]) / 2
+    median_price = np.full(len(keys), np.nan)
+    median_price[np.searchsorted(keys, priced_keys)] = medians
+    return keys // width, keys % width, count, median_price
+
+
+def colorize(values, colors):
+    """RGB of each value in [0, 1] on the linear color scale ``colors`` (NaN = transparent)."""
+    stops = np.linspace(0, 1, len(colors))
+    values = np.clip(values, 0, 1)
+    return np.stack([np.interp(values, stops, colors[:, channel]) for channel in range(3)], axis=-1).astype(np.uint8)
+
+
+def _write_tiles(directory, bin_x, bin_y, rgb, zoom):
+    from PIL import Image
+
+    bins = TILE_SIZE // BIN_PIXELS
+    tile_x, tile_y = bin_x // bins, bin_y // bins
+    # Kelompokkan bin per tile; setiap tile diisi sekali lewat fancy indexing
+    order = np.lexsort((tile_y, tile_x))
+    tile_key = tile_x[order] * (1 << 32) + tile_y[order]
+    starts = np.flatnonzero(np.r_[True, tile_key[1:] != tile_key[:-1]])
+    written = 0
+    for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+        rows = order[start:end]
+        image = np.zeros((bins, bins, 4), dtype=np.uint8)
+        image[bin_y[rows] % bins, bin_x[rows] % bins, :3] = rgb[rows]
+        image[bin_y[rows] % bins, bin_x[rows] % bins, 3] = ALPHA
+        image = image.repeat(BIN_PIXELS, axis=0).repeat(BIN_PIXELS, axis=1)
+        path = os.path.join(directory, str(zoom), str(tile_x[rows[0]]))
+        os.makedirs(path, exist_ok=True)
+        Image.fromarray(image, 'RGBA').save(os.path.join(path, f'{tile_y[rows[0]]}.png'), optimize=True)
+        written += 1
+    return written
+
+
+def _slug(name):
+    return re.sub(r'[^0-9A-Za-z]+', '_', name).strip('_').lower()
+
+
+def build_pyramid(data=None, dest=TILES_DIR, version=None, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+    """Render the density and median-price tile pyramid of every listing, city-wide and per district.
+
+    Tiles go to ``dest/<version>/<selection>/<layer>/<z>/<x>/<y>.png``;
+    only tiles containing listings are written. Density is log-scaled
+    against the densest city-wide bin of each zoom, so district tiles use
+    the same colors as the city-wide ones; median price is log-scaled
+    between the PRICE_PERCENTILES of all listing prices. Returns the
+    manifest.
+    """
+    version = version or static_version('listings')
+    if data is None:
+        data = load_listings(['district', 'latitude', 'longitude', 'price'])
+    data = data.dropna(subset=['latitude', 'longitude'])
+    prices = data['price'].to_numpy(np.float64)
+    low, high = np.nanpercentile(prices[prices > 0], PRICE_PERCENTILES)
+
+    selections = {ALL: data}
+    selections.update({district: part for district, part in data.groupby('district', observed=True)})
+    manifest = {
+        'version': version,
+        'min_zoom': min_zoom,
+        'max_zoom': max_zoom,
+        'price_range': [float(low), float(high)],
+        'selections': {
+            name: {'path': _slug(name), 'bounds': [float(part['latitude'].min()), float(part['longitude'].min()),
+                                                   float(part['latitude'].max()), float(part['longitude'].max())]}
+            for name, part in selections.items()
+        },
+    }
+
+    def write(directory):
+        started = time.perf_counter()
+        tiles = 0
+        for zoom in range(min_zoom, max_zoom + 1):
+            densest = None
+            for name, part in selections.items():
+                bin_x, bin_y, count, median_price = bin_listings(
+                    part['latitude'], part['longitude'], part['price'], zoom)
+                if densest is None:
+                    densest = count.max()
+                root = os.path.join(directory, manifest['selections'][name]['path'])
+                density = colorize(np.log1p(count) / np.log1p(densest), DENSITY_COLORS)
+                tiles += _write_tiles(os.path.join(root, 'density'), bin_x, bin_y, density, zoom)
+                priced = ~np.isnan(median_price)
+                with np.errstate(divide='ignore'):
+                    scaled = (np.log(median_price[priced]) - np.log(low)) / (np.log(high) - np.log(low))
+                price = colorize(scaled, PRICE_COLORS)
+                tiles += _write_tiles(os.path.join(root, 'price'), bin_x[priced], bin_y[priced], price, zoom)
+        manifest['tiles'] = tiles
+        manifest['seconds'] = round(time.perf_counter() - started, 3)
+
+    return publish_version(dest, version, write, manifest)
+
+
+def tile_layer(selection, layer):
+    """Tile layer of ``selection`` (a district or ALL) for the current listings.parquet.
+
+    Returns ``{'url', 'min_zoom', 'max_zoom', 'bounds', 'price_range'}``,
+    where ``url`` ends in ``{z}/{x}/{y}.png``, or None when the pyramid has
+    not been built for this version of the data (run ``python tiles.py``).
+    """
+    if layer not in LAYERS:
+        raise ValueError(f"Unknown tile layer '{layer}'. Use one of: {', '.join(LAYERS)}")
+    manifest = published_manifest(TILES_DIR)
+    if manifest is None or manifest['version'] != static_version('listings'):
+        return None
+    entry = manifest['selections'].get(selection)
+    if entry is None:
+        return None
+    return {
+        'url': f"{STATIC_URL}/{TILES_NAME}/{manifest['version']}/{entry['path']}/{layer}/{{z}}/{{x}}/{{y}}.png",
+        'min_zoom': manifest['min_zoom'],
+        'max_zoom': manifest['max_zoom'],
+        'bounds': entry['bounds'],
+        'price_range': manifest['price_range'],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render the static density/median-price tile pyramid of listings.parquet.")
+    parser.add_argument('--min-zoom', type=int, default=MIN_ZOOM)
+    parser.add_argument('--max-zoom', type=int, default=MAX_ZOOM)
+    args = parser.parse_args()
+    manifest = build_pyramid(min_zoom=args.min_zoom, max_zoom=args.max_zoom)
+    print(f"{manifest['tiles']:,} tiles (zoom {manifest['min_zoom']}-{manifest['max_zoom']}) written to "
+          f"{os.path.join(TILES_DIR, manifest['version'])} in {manifest['seconds']:.1f}s")
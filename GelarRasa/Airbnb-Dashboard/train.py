@@ -0,0 +1,196 @@
+import argparse
+import inspect
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import ParameterSampler, train_test_split
+
+from data_access import load_district
+from model_registry import MODEL_FEATURES, register_model
+
+TARGET = 'price'
+# Sama dengan model3.ipynb: 20% data uji, random_state 43
+TEST_SIZE = 0.2
+VALIDATION_SIZE = 0.1
+SEED = 43
+
+# Jumlah pohon maksimum; jumlah sebenarnya ditentukan early stopping pada data validasi
+MAX_ROUNDS = 2000
+EARLY_STOPPING_ROUNDS = 50
+# Pencarian memakai sampel data latih supaya dataset 10x tetap muat di jadwal malam;
+# model akhir tetap dilatih ulang dengan seluruh data latih
+SEARCH_SAMPLE = 200_000
+
+SEARCH_SPACES = {
+    'xgb': {
+        'max_depth': [4, 6, 8, 10],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'min_child_weight': [1, 3, 5, 10],
+        'subsample': [0.7, 0.85, 1.0],
+        'colsample_bytree': [0.7, 0.85, 1.0],
+    },
+    'lgbm': {
+        'num_leaves': [15, 31, 63, 127],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'min_child_samples': [10, 20, 50],
+        'subsample': [0.7, 0.85, 1.0],
+        'colsample_bytree': [0.7, 0.85, 1.0],
+    },
+}
+TRIALS = 12
+
+
+def _estimator(kind, params, n_estimators, n_jobs, early_stopping=False):
+    if kind == 'xgb':
+        from xgboost import XGBRegressor
+        return XGBRegressor(
+            tree_method='hist', n_estimators=n_estimators, random_state=SEED, n_jobs=n_jobs,
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS if early_stopping else None, **params)
+    from lightgbm import LGBMRegressor
+    # subsample LightGBM hanya aktif jika subsample_freq > 0
+    return LGBMRegressor(n_estimators=n_estimators, random_state=SEED, n_jobs=n_jobs, subsample_freq=1,
+                         verbose=-1, **params)
+
+
+# Data fit/validasi dikirim sekali per proses worker lewat initializer, bukan per trial
+_split = {}
+
+
+def _init_worker(X_fit, y_fit, X_val, y_val):
+    _split.update(X_fit=X_fit, y_fit=y_fit, X_val=X_val, y_val=y_val)
+
+
+def _run_trial(kind, params, n_jobs):
+    """Fit one configuration with early stopping; returns its validation score and timings."""
+    X_fit, y_fit, X_val, y_val = _split['X_fit'], _split['y_fit'], _split['X_val'], _split['y_val']
+    model = _estimator(kind, params, MAX_ROUNDS, n_jobs, early_stopping=True)
+    started = time.perf_counter()
+    if kind == 'xgb':
+        model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+        rounds = model.best_iteration + 1
+    else:
+        from lightgbm import early_stopping
+        # LightGBM >= 4.6 memakai eval_X/eval_y, versi lama hanya eval_set
+        if 'eval_X' in inspect.signature(model.fit).parameters:
+            eval_data = {'eval_X': (X_val,), 'eval_y': (y_val,)}
+        else:
+            eval_data = {'eval_set': [(X_val, y_val)]}
+        model.fit(X_fit, y_fit, callbacks=[early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)], **eval_data)
+        rounds = model.best_iteration_
+    seconds = time.perf_counter() - started
+    return {
+        'model': kind,
+        'params': params,
+        'rounds': int(rounds),
+        'val_rmse': float(np.sqrt(mean_squared_error(y_val, model.predict(X_val)))),
+        'seconds': seconds,
+        'rows_per_second': len(X_fit) / seconds,
+    }
+
+
+def load_training_data(path=None):
+    """Model features and price, from ``path`` (Parquet) or the merged dataset; rows with gaps dropped."""
+    columns = MODEL_FEATURES + [TARGET]
+    data = pd.read_parquet(path, columns=columns) if path else load_district(None, columns)
+    # Tipe ringkas (float32, int8, ...) dinaikkan ke float64 sekali di sini, sama untuk kedua library
+    return data.dropna().astype('float64')
+
+
+def search(X_fit, y_fit, X_val, y_val, trials=TRIALS, workers=None, seed=SEED):
+    """Random search over SEARCH_SPACES, ``trials`` configurations per model, in a process pool.
+
+    Each worker trains with ``cpu_count // workers`` threads so the pool
+    uses every core without oversubscribing. Returns the trial records.
+    """
+    candidates = [(kind, params) for kind, space in SEARCH_SPACES.items()
+                  for params in ParameterSampler(space, n_iter=trials, random_state=seed)]
+    cpus = os.cpu_count() or 1
+    workers = workers or min(len(candidates), cpus)
+    n_jobs = max(1, cpus // workers)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(X_fit, y_fit, X_val, y_val)) as pool:
+        futures = [pool.submit(_run_trial, kind, params, n_jobs) for kind, params in candidates]
+        return [future.result() for future in futures]
+
+
+def _evaluate(model, X_test, y_test):
+    predictions = model.predict(X_test)
+    return {'mse': round(float(mean_squared_error(y_test, predictions)), 2),
+            'r2': round(float(r2_score(y_test, predictions)), 4)}
+
+
+def train(path=None, trials=TRIALS, workers=None, register=True, search_sample=SEARCH_SAMPLE):
+    """Search, refit and (optionally) register the ``xgb`` and ``ensemble`` models.
+
+    The best configuration per library is refit on the full training split
+    with the number of rounds found by early stopping; the ensemble is the
+    VotingRegressor of both. Returns a summary with metrics and timings.
+    """
+    started = time.perf_counter()
+    data = load_training_data(path)
+    X, y = data[MODEL_FEATURES], data[TARGET]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=SEED)
+    X_search, y_search = X_train, y_train
+    if len(X_train) > search_sample:
+        X_search = X_train.sample(search_sample, random_state=SEED)
+        y_search = y_train.loc[X_search.index]
+    X_fit, X_val, y_fit, y_val = train_test_split(X_search, y_search, test_size=VALIDATION_SIZE, random_state=SEED)
+
+    search_started = time.perf_counter()
+    results = search(X_fit, y_fit, X_val, y_val, trials, workers)
+    search_seconds = time.perf_counter() - search_started
+    best = {kind: min((r for r in results if r['model'] == kind), key=lambda r: r['val_rmse'])
+            for kind in SEARCH_SPACES}
+
+    from sklearn.ensemble import VotingRegressor
+
+    n_jobs = os.cpu_count() or 1
+    refit = {kind: _estimator(kind, best[kind]['params'], best[kind]['rounds'], n_jobs) for kind in SEARCH_SPACES}
+    # VotingRegressor meng-clone estimator-nya, jadi objek xgb yang sama boleh dipakai dua kali
+    models = {'xgb': refit['xgb'], 'ensemble': VotingRegressor(estimators=list(refit.items()))}
+
+    summary = {'rows': len(data), 'train_rows': len(X_train), 'trials': results,
+               'search_seconds': search_seconds, 'models': {}}
+    for name in ('xgb', 'ensemble'):
+        fit_started = time.perf_counter()
+        models[name].fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - fit_started
+        training = {
+            'rows': len(X_train),
+            'fit_seconds': round(fit_seconds, 3),
+            'rows_per_second': round(len(X_train) / fit_seconds),
+            'search_seconds': round(search_seconds, 3),
+            'best': {kind: best[kind] for kind in (['xgb'] if name == 'xgb' else SEARCH_SPACES)},
+            'trials': [r for r in results if name == 'ensemble' or r['model'] == 'xgb'],
+        }
+        metrics = _evaluate(models[name], X_test, y_test)
+        params = best['xgb']['params'] | {'n_estimators': best['xgb']['rounds']} if name == 'xgb' else {
+            kind: best[kind]['params'] | {'n_estimators': best[kind]['rounds']} for kind in SEARCH_SPACES}
+        version = register_model(name, models[name], metrics, params=params, training=training) if register else None
+        summary['models'][name] = {'version': version, 'metrics': metrics, 'fit_seconds': fit_seconds,
+                                   'rows_per_second': len(X_train) / fit_seconds}
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train and register the price models (replaces model3.ipynb).")
+    parser.add_argument('--data', default=None, help="Parquet file with the model features and price "
+                                                     "(default: the merged dataset)")
+    parser.add_argument('--trials', type=int, default=TRIALS, help="configurations tried per model")
+    parser.add_argument('--workers', type=int, default=None, help="search processes (default: one per core)")
+    parser.add_argument('--search-sample', type=int, default=SEARCH_SAMPLE,
+                        help="training rows used for the search (final fit uses all)")
+    parser.add_argument('--dry-run', action='store_true', help="train and report without registering")
+    args = parser.parse_args()
+
+    summary = train(args.data, args.trials, args.workers, register=not args.dry_run, search_sample=args.search_sample)
+    print(f"{summary['rows']:,} rows, {len(summary['trials'])} trials searched in {summary['search_seconds']:.1f}s")
+    for name, result in summary['models'].items():
+        print(f"  {name:<9} {result['version'] or '(not registered)':<16} mse={result['metrics']['mse']:<10} "
+              f"r2={result['metrics']['r2']:<7} fit {result['fit_seconds']:.1f}s "
+              f"({result['rows_per_second']:,.0f} rows/s)")
+    print(f"Total {summary['seconds']:.1f}s")
@@ -0,0 +1,273 @@
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from model_registry import MODEL_FEATURES, get_model, model_info
+
+
+class Forest:
+    """Boosted trees flattened into NumPy arrays, evaluated for all trees at once.
+
+    Node ``i`` splits on ``feature[i]``: a row goes to the left child
+    ``left[i]`` when its value is below ``threshold[i]`` (or, if missing,
+    when ``default_left[i]``), otherwise to ``left[i] + 1`` (children are
+    stored as adjacent pairs). Leaves point to themselves with an infinite
+    threshold and carry ``value[i]``. ``roots`` holds the root of every
+    tree. Inputs are compared as ``dtype`` (XGBoost compares in float32,
+    LightGBM in float64).
+    """
+
+    # Setiap beberapa level dicek apakah semua pohon sudah sampai di leaf
+    EXIT_CHECK = 4
+
+    def __init__(self, feature, threshold, left, default_left, value, roots, is_leaf,
+                 base_score=0.0, dtype=np.float64, zero_missing=None):
+        self.is_leaf = np.asarray(is_leaf, dtype=bool)
+        index = np.arange(len(self.is_leaf), dtype=np.int32)
+        self.feature = np.where(self.is_leaf, 0, feature).astype(np.int32)
+        self.threshold = np.where(self.is_leaf, np.inf, threshold).astype(dtype)
+        self.left = np.where(self.is_leaf, index, left).astype(np.int32)
+        self.default_left = np.where(self.is_leaf, True, default_left).astype(bool)
+        self.value = np.where(self.is_leaf, value, 0).astype(np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.base_score = float(base_score)
+        self.dtype = dtype
+        # Node LightGBM dengan missing_type 'Zero' juga menganggap 0 sebagai nilai kosong
+        zero_missing = None if zero_missing is None else np.asarray(zero_missing, dtype=bool) & ~self.is_leaf
+        self.zero_missing = zero_missing if zero_missing is not None and zero_missing.any() else None
+        self.depth = _max_depth(self.left, self.is_leaf, self.roots)
+
+    def _step(self, node, values):
+        go_right = values >= self.threshold[node]
+        missing = np.isnan(values)
+        if self.zero_missing is not None:
+            missing |= self.zero_missing[node] & (values == 0)
+        if missing.any():
+            go_right = np.where(missing, ~self.default_left[node], go_right)
+        return self.left[node] + go_right
+
+    def predict_one(self, x):
+        """Prediction for a single 1-D row, without building a batch."""
+        x = np.asarray(x, dtype=self.dtype)
+        node = self.roots
+        exact = self.zero_missing is None and not np.isnan(x).any()
+        for level in range(self.depth):
+            values = x[self.feature[node]]
+            # Jalur cepat (tanpa nilai kosong): satu perbandingan per pohon per level
+            node = self.left[node] + (values >= self.threshold[node]) if exact else self._step(node, values)
+            if level % self.EXIT_CHECK == self.EXIT_CHECK - 1 and self.is_leaf[node].all():
+                break
+        return self.base_score + self.value[node].sum()
+
+    def predict(self, X):
+        """Predictions for a 2-D array of rows (features in MODEL_FEATURES order)."""
+        X = np.asarray(X, dtype=self.dtype)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for level in range(self.depth):
+            node = self._step(node, X[rows, self.feature[node]])
+            if level % self.EXIT_CHECK == self.EXIT_CHECK - 1 and self.is_leaf[node].all():
+                break
+        return self.base_score + self.value[node].sum(axis=1)
+
+
+def _max_depth(left, is_leaf, roots):
+    depth = 0
+    level = np.asarray(roots)[~is_leaf[roots]]
+    while len(level):
+        depth += 1
+        children = np.concatenate([left[level], left[level] + 1])
+        level = children[~is_leaf[children]]
+    return depth
+
+
+def _parse_base_score(text):
+    # XGBoost >= 3 menyimpan base_score sebagai array, mis. '[1.1929029E2]'
+    return float(str(text).strip('[]').split(',')[0])
+
+
+def from_xgboost(model):
+    """Flatten an XGBRegressor (or Booster) trained with reg:squarederror."""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    trees = learner['gradient_booster']['model']['trees']
+    best_iteration = booster.attr('best_iteration')
+    if best_iteration is not None:
+        # Sama dengan predict() sklearn: hanya pohon sampai iterasi terbaik early stopping
+        trees = trees[:int(best_iteration) + 1]
+
+    arrays = {name: [] for name in ('feature', 'threshold', 'left', 'default_left', 'value', 'is_leaf')}
+    roots = []
+    offset = 0
+    for tree in trees:
+        left = np.asarray(tree['left_children'], dtype=np.int32)
+        right = np.asarray(tree['right_children'], dtype=np.int32)
+        leaf = left == -1
+        # XGBoost selalu menaruh anak kanan tepat setelah anak kiri
+        if not np.array_equal(right[~leaf], left[~leaf] + 1):
+            raise NotImplementedError("XGBoost tree without adjacent children")
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        arrays['feature'].append(tree['split_indices'])
+        # Pada leaf, split_conditions berisi bobot leaf
+        arrays['threshold'].append(conditions)
+        arrays['left'].append(left + offset)
+        arrays['default_left'].append(tree['default_left'])
+        arrays['value'].append(conditions.astype(np.float64))
+        arrays['is_leaf'].append(leaf)
+        roots.append(offset)
+        offset += len(left)
+    flat = {name: np.concatenate(parts) for name, parts in arrays.items()}
+    return Forest(roots=roots, base_score=_parse_base_score(learner['learner_model_param']['base_score']),
+                  dtype=np.float32, **flat)
+
+
+def from_lightgbm(model):
+    """Flatten an LGBMRegressor (or Booster) with numerical splits."""
+    booster = model.booster_ if hasattr(model, 'booster_') else model
+    dump = booster.dump_model()
+    nodes = {name: [] for name in ('feature', 'threshold', 'left', 'default_left', 'value', 'is_leaf', 'zero_missing')}
+
+    def new_node():
+        for name in nodes:
+            nodes[name].append(0)
+        return len(nodes['feature']) - 1
+
+    roots = []
+    for tree in dump['tree_info']:
+        roots.append(new_node())
+        stack = [(tree['tree_structure'], roots[-1])]
+        while stack:
+            node, index = stack.pop()
+            if 'leaf_value' in node:
+                nodes['is_leaf'][index] = True
+                nodes['value'][index] = node['leaf_value']
+                continue
+            if node['decision_type'] != '<=':
+                raise NotImplementedError(f"LightGBM split '{node['decision_type']}' is not supported")
+            threshold = node['threshold']
+            nodes['feature'][index] = node['split_feature']
+            # LightGBM ke kiri jika x <= threshold; dijadikan x < nextafter(threshold) seperti XGBoost
+            nodes['threshold'][index] = np.nextafter(threshold, np.inf)
+            if node['missing_type'] == 'None':
+                # Tanpa penanganan missing, NaN diperlakukan sebagai 0
+                nodes['default_left'][index] = 0 <= threshold
+            else:
+                nodes['default_left'][index] = node['default_left']
+                nodes['zero_missing'][index] = node['missing_type'] == 'Zero'
+            # Anak kiri dan kanan dialokasikan berdampingan
+            left, right = new_node(), new_node()
+            nodes['left'][index] = left
+            stack += [(node['left_child'], left), (node['right_child'], right)]
+    return Forest(roots=roots, dtype=np.float64, **nodes)
+
+
+class Predictor:
+    """Weighted average of flattened forests (one forest for a single boosted model)."""
+
+    def __init__(self, forests, weights=None):
+        self.forests = forests
+        weights = np.ones(len(forests)) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.weights = weights / weights.sum()
+
+    def predict(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        return sum(weight * forest.predict(X) for weight, forest in zip(self.weights, self.forests))
+
+    def predict_row(self, values):
+        """Prediction for one row given as a sequence of the nine feature values."""
+        values = np.asarray(values, dtype=np.float64)
+        return float(sum(weight * forest.predict_one(values) for weight, forest in zip(self.weights, self.forests)))
+
+
+def _forest(estimator):
+    if hasattr(estimator, 'get_booster'):
+        return from_xgboost(estimator)
+    if hasattr(estimator, 'booster_'):
+        return from_lightgbm(estimator)
+    raise TypeError(f"Cannot compile {type(estimator).__name__}")
+
+
+def compile_model(model):
+    """Predictor for an XGBoost/LightGBM regressor or a VotingRegressor of them."""
+    if hasattr(model, 'estimators_'):
+        return Predictor([_forest(estimator) for estimator in model.estimators_], getattr(model, 'weights', None))
+    return Predictor([_forest(model)])
+
+
+_predictors = {}
+_lock = threading.Lock()
+
+
+def get_predictor(name='xgb', version=None):
+    """Compiled predictor for a registry model, built once per process per version.
+
+    Returns None when the model cannot be compiled (callers then use the
+    model's own ``predict``).
+    """
+    key = (name, model_info(name, version)['version'])
+    with _lock:
+        if key not in _predictors:
+            try:
+                _predictors[key] = compile_model(get_model(name, key[1]))
+            except (TypeError, NotImplementedError):
+                _predictors[key] = None
+        return _predictors[key]
+
+
+def parity_check(name='xgb', version=None, X=None, rows=10_000, seed=43):
+    """Compare the compiled predictor with ``model.predict`` and return the largest differences.
+
+    ``X`` defaults to random rows over the page's input ranges, with some
+    missing values. Returns a dict with ``max_abs_diff`` and ``max_rel_diff``.
+    """
+    if X is None:
+        rng = np.random.default_rng(seed)
+        X = pd.DataFrame({
+            'accommodates': rng.integers(0, 17, rows),
+            'bedrooms': rng.integers(0, 11, rows),
+            'minimum_nights': rng.integers(0, 31, rows),
+            'maximum_nights': rng.integers(0, 1126, rows),
+            'review_scores_rating': rng.integers(0, 101, rows),
+            'review_scores_cleanliness': rng.integers(0, 11, rows),
+            'review_scores_location': rng.integers(0, 11, rows),
+            'host_total_listings_count': rng.integers(0, 101, rows),
+            'host_response_rate': rng.integers(0, 101, rows) / 100,
+        }, columns=MODEL_FEATURES).astype('float64')
+        X = X.mask(rng.random(X.shape) < 0.02)
+    X = X[MODEL_FEATURES]
+    expected = np.asarray(get_model(name, version).predict(X), dtype=np.float64)
+    actual = get_predictor(name, version).predict(X.to_numpy(dtype=np.float64))
+    diff = np.abs(actual - expected)
+    return {
+        'rows': len(X),
+        'max_abs_diff': float(diff.max()),
+        'max_rel_diff': float((diff / np.maximum(np.abs(expected), 1.0)).max()),
+    }
+
+
+def _latency(func, repeat=2000):
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the compiled tree predictor against the original models.")
+    parser.add_argument('--model', action='append', help="model name (default: xgb and ensemble)")
+    parser.add_argument('--rows', type=int, default=10_000)
+    args = parser.parse_args()
+
+    row = [2, 1, 2, 30, 95, 9, 9, 1, 0.9]
+    frame = pd.DataFrame([row], columns=MODEL_FEATURES)
+    for name in args.model or ['xgb', 'ensemble']:
+        result = parity_check(name, rows=args.rows)
+        model, predictor = get_model(name), get_predictor(name)
+        print(f"{name}: max |diff| {result['max_abs_diff']:.2e} (rel {result['max_rel_diff']:.2e}) over {result['rows']:,} rows; "
+              f"single row {_latency(lambda: predictor.predict_row(row)):.0f} us compiled vs "
+              f"{_latency(lambda: model.predict(frame), repeat=200):.0f} us predict()")
@@ -1,12 +1,21 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import os
+from data_access import load_listings, load_reviews
+from model_registry import preload
+from prediction_cache import warm_in_background
+from instrumentation import begin_rerun, end_rerun, span
 
-# Load the data (gunakan os.path untuk mengelola path file lebih fleksibel)
-listings = pd.read_parquet('GelarRasa/Airbnb-Dashboard/listings.parquet')
-reviews = pd.read_parquet('GelarRasa/Airbnb-Dashboard/reviews.parquet')
-hosts = pd.read_parquet('GelarRasa/Airbnb-Dashboard/hosts.parquet')
+begin_rerun('home')
+
+# Load the data (di-cache sekali per proses lewat data_access)
+with span('load'):
+    listings = load_listings(['listing_id', 'district', 'neighbourhood'])
+    reviews = load_reviews(['review_id'])
+
+# Model prediksi dimuat dan di-warm-up di background agar halaman Price Prediction langsung siap
+preload()
+# Opsional: isi cache prediksi dengan kombinasi input yang paling umum (PREDICTION_CACHE_PRECOMPUTE)
+warm_in_background()
 
 st.sidebar.title("Airbnb Dashboard Analysis")
 st.sidebar.success("Select Page Above")
@@ -29,10 +38,11 @@ st.subheader("📂 Dataset Overview")
 st.write("This dataset includes Airbnb listings, reviews, and host data.")
 
 # Key metrics
-total_areas = listings['district'].nunique()  # Unique cities
-total_listings = listings['listing_id'].nunique()  # Unique listings
-total_neighborhoods = listings['neighbourhood'].nunique()
-total_reviews = reviews['review_id'].nunique()
+with span('aggregate'):
+    total_areas = listings['district'].nunique()  # Unique cities
+    total_listings = listings['listing_id'].nunique()  # Unique listings
+    total_neighborhoods = listings['neighbourhood'].nunique()
+    total_reviews = reviews['review_id'].nunique()
 
 col1, col2, col3, col4 = st.columns(4)
 col1.metric("Total Districts", total_areas)
@@ -42,16 +52,20 @@ col4.metric("Total Reviews", total_reviews)
 
 # Listings by City
 st.write("### 🌆 Listings by District")
-city_counts = listings['district'].value_counts().reset_index()
-city_counts.columns = ['district', 'Number of Listings']
+with span('aggregate'):
+    city_counts = listings['district'].value_counts().reset_index()
+    city_counts.columns = ['district', 'Number of Listings']
 
 # Plotly bar chart for listings by city
-fig = px.bar(
-    city_counts.head(10),  # Menampilkan 10 distrik teratas
-    x='district',
-    y='Number of Listings',
-    title="Airbnb Listings by District in New York",
-    color='Number of Listings',
-    color_continuous_scale=["#ffc0cb", "#ffb3b3", "#ff8080", "#ff4d4d", "#ff0000"]
-)
-st.plotly_chart(fig, use_container_width=True)
+with span('figure'):
+    fig = px.bar(
+        city_counts.head(10),  # Menampilkan 10 distrik teratas
+        x='district',
+        y='Number of Listings',
+        title="Airbnb Listings by District in New York",
+        color='Number of Listings',
+        color_continuous_scale=["#ffc0cb", "#ffb3b3", "#ff8080", "#ff4d4d", "#ff0000"]
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+end_rerun()